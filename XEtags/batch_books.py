@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Batch Book Builder
+
+Runs the e-book pipeline (create_ebook_from_print.py) and/or citation linking
+(link_citations.py) on many manuscripts at once. Every (manuscript, step) pair is
+a separate job in a process pool, so rebuilding a whole series uses every core.
+Each job runs in its own scratch directory - it is the job's working directory
+and temp directory - so concurrent jobs never share temporary files. Each job
+returns a summary of its book; the console output of a job is kept in the
+summary instead of being interleaved with the other jobs.
+
+Usage:
+  python batch_books.py <manuscript or glob> ... [--steps ebook,link] [--jobs N] [--stats] [--summary FILE]
+
+Example: python batch_books.py "../mybooks/*8x10.docx" --steps ebook,link --summary batch.json
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+STEPS = ("ebook", "link")
+
+def expand_manuscripts(patterns):
+    """Absolute paths of the manuscripts named by `patterns` (file names or globs), in order, without repeats.
+
+    A file name that doesn't exist is kept, so its job reports the missing file."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def _build_ebook(path, stats, incremental):
+    from book import build_ebook
+    return build_ebook(path, incremental=incremental, stats=stats)
+
+
+def _link_citations(path, stats, incremental):
+    from book import link_citations
+    return link_citations(path)
+
+
+STEP_FUNCTIONS = {"ebook": _build_ebook, "link": _link_citations}
+
+
+def run_job(path, step, stats=False, incremental=False):
+    """Run `step` on the manuscript at absolute `path` in a private scratch directory.
+
+    Returns the step's summary plus 'step', 'ok', 'seconds', 'log' (captured
+    console output) and, on failure, 'error'. Never raises."""
+    summary = {"input": path, "step": step}
+    log = io.StringIO()
+    started = time.perf_counter()
+    cwd, saved_tempdir = os.getcwd(), tempfile.tempdir
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"book_{step}_") as scratch:
+            os.chdir(scratch)
+            tempfile.tempdir = scratch
+            try:
+                with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    summary.update(STEP_FUNCTIONS[step](path, stats, incremental))
+                summary["ok"] = True
+            except Exception as e:
+                summary["ok"] = False
+                summary["error"] = f"{type(e).__name__}: {e}"
+                log.write(traceback.format_exc())
+            finally:
+                os.chdir(cwd)
+                tempfile.tempdir = saved_tempdir
+    except OSError as e:  # scratch directory couldn't be created or removed
+        summary.setdefault("ok", False)
+        summary.setdefault("error", f"{type(e).__name__}: {e}")
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    summary["log"] = log.getvalue()
+    return summary
+
+
+def build_books(manuscripts, steps=("ebook",), max_workers=None, stats=False, incremental=False):
+    """Run every step in `steps` on every manuscript; return the job summaries in (manuscript, step) order.
+
+    `max_workers` defaults to the number of CPUs; 1 runs the jobs in this process."""
+    for step in steps:
+        if step not in STEP_FUNCTIONS:
+            raise ValueError(f"Unknown step '{step}' (choose from {', '.join(STEPS)})")
+    jobs = [(os.path.abspath(path), step) for path in manuscripts for step in steps]
+    if max_workers == 1 or len(jobs) <= 1:
+        return [run_job(path, step, stats, incremental) for path, step in jobs]
+    with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(jobs))) as pool:
+        futures = [pool.submit(run_job, path, step, stats, incremental) for path, step in jobs]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build e-books and/or link citations for many manuscripts in parallel.")
+    parser.add_argument("manuscripts", nargs="+", help="manuscript .docx files or glob patterns")
+    parser.add_argument("--steps", default="ebook",
+                        help=f"comma-separated steps to run on each manuscript: {', '.join(STEPS)} (default ebook)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild what changed since each e-book's last build (see create_ebook_from_print.py)")
+    parser.add_argument("--stats", action="store_true", help="write a per-step stats report next to each e-book")
+    parser.add_argument("--summary", help="write the per-book summaries, with each job's log, as JSON to this file")
+    args = parser.parse_args()
+
+    manuscripts = expand_manuscripts(args.manuscripts)
+    if not manuscripts:
+        print("Error: no manuscripts matched.")
+        sys.exit(1)
+    steps = [step.strip() for step in args.steps.split(",") if step.strip()]
+
+    started = time.perf_counter()
+    try:
+        summaries = build_books(manuscripts, steps, max_workers=args.jobs, stats=args.stats,
+                                incremental=args.incremental)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for summary in summaries:
+        name = os.path.basename(summary["input"])
+        if summary["ok"]:
+            build = f", {summary['build']}" if summary.get("build", "full") != "full" else ""
+            print(f"OK     {summary['step']:<6} {name} -> {os.path.basename(summary['output'])} "
+                  f"({summary['seconds']:.1f}s{build})")
+        else:
+            print(f"FAILED {summary['step']:<6} {name}: {summary['error']}")
+    failed = sum(not summary["ok"] for summary in summaries)
+    print(f"\n{len(summaries) - failed} of {len(summaries)} jobs succeeded in {time.perf_counter() - started:.1f}s")
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+        print(f"Summary saved as: {args.summary}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Book Tools
+
+One command for the book tools, and the library API behind it. Each
+subcommand imports its tool (python-docx, lxml, ...) only when it runs, so
+`book count-xe` starts without loading python-docx, and --help is instant:
+
+  python book.py ebook <8x10.docx> [--incremental] [--compact] [--max-image-size PIXELS] [--epub] [--stats]
+                       [--per-run-fonts]
+  python book.py link <8x10.docx> [--output <file>]
+  python book.py count-xe <docx>
+  python book.py count-bookmarks <docx>
+
+With --json (before the subcommand) the result is printed as JSON instead.
+Exits with status 1 if the operation fails.
+
+The same operations can be called in-process, without the command line; each
+returns a dict of results and raises on failure:
+
+  import book
+  summary = book.build_ebook("../mybooks/superArchItelligence Vol1 8x10.docx", epub=True)
+  book.count_xe_tags(summary["output"])   # {"input": ..., "xe_tags": 0}
+
+Example: python book.py --json count-bookmarks "../mybooks/superArchItelligence Vol1 e-book.docx"
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+LINKCITATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'linkcitations')
+
+
+def build_ebook(filename, incremental=False, compact=False, max_image_size=None, epub=False, stats=False,
+                per_run_fonts=False):
+    """Create the e-book of a print manuscript (see create_ebook_from_print.build_ebook)."""
+    from create_ebook_from_print import build_ebook as build
+    return build(filename, incremental=incremental, compact=compact, max_image_size=max_image_size,
+                 epub=epub, stats=stats, per_run_fonts=per_run_fonts)
+
+
+def link_citations(filename, output=None):
+    """Link the citations of a manuscript to their references' URLs (see link_citations.link_citations)."""
+    if LINKCITATIONS_DIR not in sys.path:
+        sys.path.append(LINKCITATIONS_DIR)
+    from link_citations import link_citations as link
+    return link(filename, output)
+
+
+def count_xe_tags(filename):
+    """Count the XE tags of a .docx: {"input", "xe_tags", "xe_fields"}."""
+    report = _inspect(filename)
+    return {"input": filename, "xe_tags": report.xe_tags, "xe_fields": report.xe_fields}
+
+
+def count_bookmarks(filename):
+    """Count the bookmarks of a .docx: {"input", "point_bookmarks", "range_bookmarks"}."""
+    report = _inspect(filename)
+    return {"input": filename, "point_bookmarks": report.point_bookmarks, "range_bookmarks": report.range_bookmarks}
+
+
+def _inspect(filename):
+    from inspect_docx import inspect_docx
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"Input file not found: {filename}")
+    return inspect_docx(filename)
+
+
+def add_ebook_arguments(parser):
+    """The e-book build options, shared with create_ebook_from_print.py."""
+    parser.add_argument("input_filename")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the results of the previous build (kept in '<e-book>.cache.json') "
+                             "for the parts of the book that did not change")
+    parser.add_argument("--stats", action="store_true",
+                        help="record wall time, CPU time, peak memory and work counts per step "
+                             "in a JSON report next to the e-book")
+    parser.add_argument("--compact", action="store_true",
+                        help="merge runs with the same formatting and drop revision ids, proofing marks "
+                             "and empty runs, for a smaller e-book")
+    parser.add_argument("--max-image-size", type=int, metavar="PIXELS",
+                        help="scale images down to at most PIXELS on the longer side for e-readers "
+                             "(e.g. 1600; needs Pillow)")
+    parser.add_argument("--epub", action="store_true",
+                        help="also write an EPUB with one XHTML file per chapter (see epub_export.py)")
+    parser.add_argument("--per-run-fonts", action="store_true",
+                        help="set Georgia on every run, as earlier versions did, instead of once in the "
+                             "styles and theme")
+
+
+def _run_ebook(args):
+    summary = build_ebook(args.input_filename, incremental=args.incremental, compact=args.compact,
+                          max_image_size=args.max_image_size, epub=args.epub, stats=args.stats,
+                          per_run_fonts=args.per_run_fonts)
+    from create_ebook_from_print import format_ebook_summary
+    return summary, format_ebook_summary(summary)
+
+
+def _run_link(args):
+    summary = link_citations(args.input_filename, args.output)
+    return summary, [f"Created {summary['links']} citation links from {summary['citations']} references "
+                     f"with URLs: {summary['output']}"]
+
+
+def _run_count_xe(args):
+    result = count_xe_tags(args.input_filename)
+    return result, [f"Number of XE tags found in '{args.input_filename}': {result['xe_tags']}"]
+
+
+def _run_count_bookmarks(args):
+    result = count_bookmarks(args.input_filename)
+    return result, [f"Number of point bookmarks found in '{args.input_filename}': {result['point_bookmarks']}"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="book", description="Build e-books and inspect book manuscripts.")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    ebook = commands.add_parser("ebook", help="create the e-book version of a print (8x10) .docx book")
+    add_ebook_arguments(ebook)
+    ebook.set_defaults(run=_run_ebook)
+
+    link = commands.add_parser("link", help="link citations to the URLs of their references")
+    link.add_argument("input_filename")
+    link.add_argument("--output", help="linked document to write (default: '8x10' replaced with 'linked')")
+    link.set_defaults(run=_run_link)
+
+    count_xe = commands.add_parser("count-xe", help="count the XE (index entry) tags of a .docx")
+    count_xe.add_argument("input_filename")
+    count_xe.set_defaults(run=_run_count_xe)
+
+    count_bookmarks_ = commands.add_parser("count-bookmarks", help="count the point bookmarks of a .docx")
+    count_bookmarks_.add_argument("input_filename")
+    count_bookmarks_.set_defaults(run=_run_count_bookmarks)
+    return parser
+
+
+def main(argv=None):
+    """Run the `book` command line; return the exit status."""
+    args = build_parser().parse_args(argv)
+    try:
+        # With --json, stdout is kept for the result; the tools' progress messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+            result, lines = args.run(args)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print("\n".join(lines))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Bookmark registry for WordprocessingML trees.
+
+Bookmark names must be unique across the whole document - body, headers, footers,
+footnotes, endnotes and comments - and so must ids: ECMA-376 makes a bookmark id
+unique among the document's annotations, not within one part. The registry
+collects every w:bookmarkStart/w:bookmarkEnd of those trees in one pass, indexes
+them by name and by (part, id), and hands out fresh ids and names that can't
+collide with any bookmark already in the book. The elements are held per part,
+so equal ids left in two parts by another tool don't overwrite each other:
+
+    registry = BookmarkRegistry.from_document(doc)
+    bookmark_id, name = registry.add_point(run, registry.allocate_name("xe_bookmark_"))
+    registry.is_point(name)  # True
+
+For books too large to hold as trees, `reserved_from_docx` streams the package and
+keeps only the ids and names; `release` drops the elements registered since, so a
+streaming converter can register a paragraph's bookmarks and let them go.
+"""
+
+import zipfile
+
+from lxml import etree
+
+from docx_fields import W, P
+from docx_stories import DOCUMENT_MEMBER, is_story_member, story_parts
+
+BOOKMARK_START = W + 'bookmarkStart'
+BOOKMARK_END = W + 'bookmarkEnd'
+ID = W + 'id'
+NAME = W + 'name'
+TBL = W + 'tbl'
+
+MAX_NAME_LENGTH = 40  # Word truncates bookmark names to 40 characters
+
+
+class BookmarkRegistry:
+    """Bookmarks of one or more WordprocessingML trees, indexed by id and by name."""
+
+    def __init__(self):
+        self.starts = {}  # (part root, id) -> bookmarkStart element
+        self.ends = {}  # (part root, id) -> bookmarkEnd element
+        self.names = {}  # name -> (part root, id)
+        self.used_ids = set()  # ids in use in any part, including those whose elements were released
+        self._next_id = 0
+        self._next_suffix = {}  # name prefix -> next number to try
+
+    @classmethod
+    def from_tree(cls, *roots):
+        """Registry of the bookmarks under the given root elements."""
+        registry = cls()
+        for root in roots:
+            registry.scan(root)
+        return registry
+
+    @classmethod
+    def from_document(cls, doc):
+        """Registry of a python-docx Document: its body and every header, footer, note and comment part."""
+        return cls.from_tree(doc.element, *(part.element for part in story_parts(doc)))
+
+    @classmethod
+    def from_docx(cls, path, document_root=None):
+        """Registry of the .docx at `path`. Pass `document_root` to register an already
+        parsed word/document.xml (e.g. one about to be modified) instead of reading it."""
+        roots = []
+        with zipfile.ZipFile(path) as package:
+            for name in package.namelist():
+                if name == DOCUMENT_MEMBER:
+                    if document_root is None:
+                        roots.append(etree.fromstring(package.read(name)))
+                elif is_story_member(name):
+                    roots.append(etree.fromstring(package.read(name)))
+        if document_root is not None:
+            roots.insert(0, document_root)
+        return cls.from_tree(*roots)
+
+    @classmethod
+    def reserved_from_docx(cls, path):
+        """Registry reserving the ids and names of every bookmark in the .docx at `path`,
+        read in one streaming pass; no element is kept, so is_point and start don't apply."""
+        registry = cls()
+        with zipfile.ZipFile(path) as package:
+            for name in package.namelist():
+                if name == DOCUMENT_MEMBER or is_story_member(name):
+                    with package.open(name) as stream:
+                        registry.reserve_stream(stream)
+        return registry
+
+    def reserve_stream(self, stream):
+        """Reserve the ids and names of the bookmarks in the XML read from the binary file
+        object `stream`, discarding the tree as it is parsed."""
+        for _, element in etree.iterparse(stream, tag=(BOOKMARK_START, BOOKMARK_END, P, TBL), huge_tree=True):
+            if element.tag in (BOOKMARK_START, BOOKMARK_END):
+                self.register(element, stream)
+                self.release()
+            else:
+                # Paragraphs and tables are the bulk of a story; drop each one once read
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    def release(self):
+        """Drop the registered elements but keep their ids and names reserved."""
+        self.starts.clear()
+        self.ends.clear()
+
+    def scan(self, root):
+        """Register every bookmark start and end under `root`."""
+        for element in root.iter(BOOKMARK_START, BOOKMARK_END):
+            self.register(element, root)
+
+    def register(self, element, part=None):
+        """Register one bookmarkStart or bookmarkEnd element of `part` (by default the root of its tree)."""
+        bookmark_id = element.get(ID)
+        if bookmark_id is None:
+            return
+        key = (element.getroottree().getroot() if part is None else part, bookmark_id)
+        self.used_ids.add(bookmark_id)
+        if element.tag == BOOKMARK_START:
+            self.starts[key] = element
+            name = element.get(NAME)
+            if name:
+                self.names[name] = key
+        else:
+            self.ends[key] = element
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.starts)
+
+    def start(self, name):
+        """The bookmarkStart element of the bookmark called `name`, or None."""
+        key = self.names.get(name)
+        return None if key is None else self.starts.get(key)
+
+    def is_point(self, name):
+        """True if the start of the bookmark called `name` is immediately followed by its own end."""
+        key = self.names.get(name)
+        start = None if key is None else self.starts.get(key)
+        return start is not None and start.getnext() is not None and start.getnext() is self.ends.get(key)
+
+    def allocate_id(self):
+        """A bookmark id (as a string) not used in any part of the book; it is reserved."""
+        while str(self._next_id) in self.used_ids:
+            self._next_id += 1
+        bookmark_id = str(self._next_id)
+        self._next_id += 1
+        return bookmark_id
+
+    def allocate_name(self, prefix):
+        """The first unused name `prefix` + number, counting up from the last one handed out."""
+        number = self._next_suffix.get(prefix, 0)
+        while f"{prefix}{number}" in self.names:
+            number += 1
+        self._next_suffix[prefix] = number + 1
+        name = f"{prefix}{number}"
+        if len(name) > MAX_NAME_LENGTH:
+            raise ValueError(f"Bookmark name '{name}' is longer than {MAX_NAME_LENGTH} characters")
+        return name
+
+    def add_point(self, anchor, name):
+        """Insert a point bookmark called `name` with a fresh id just before `anchor`; return (id, name)."""
+        if name in self.names:
+            raise ValueError(f"Bookmark name '{name}' is already in use")
+        bookmark_id = self.allocate_id()
+        start = anchor.makeelement(BOOKMARK_START)
+        start.set(ID, bookmark_id)
+        start.set(NAME, name)
+        end = anchor.makeelement(BOOKMARK_END)
+        end.set(ID, bookmark_id)
+        anchor.addprevious(start)
+        anchor.addprevious(end)
+        part = anchor.getroottree().getroot()
+        self.register(start, part)
+        self.register(end, part)
+        return bookmark_id, name
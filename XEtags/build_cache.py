@@ -0,0 +1,160 @@
+"""
+Persistent incremental-build cache for the e-book pipeline.
+
+The cache is a JSON file next to the e-book ('<e-book>.cache.json') holding what
+the last build of a manuscript started from and produced:
+
+- a content hash of every member of the input package,
+- the output file's size and modification time when it was written,
+- the members the writer copied through unchanged,
+- the text of every XE bookmark, by content key (see xe_content_key), and
+- the fuzzy-match decision for every index term, with its score.
+
+With it, a rebuild can tell that nothing changed (skip the build), that only
+members the pipeline passes through changed (patch them into the existing e-book),
+or which bookmark texts changed (re-score only index terms that could be affected;
+see CachedBookmarkMatcher). Bookmarks are keyed by content, not by their
+sequential names, so an XE field added near the start of the book does not make
+every later bookmark look changed.
+
+A build is checkpointed twice before the e-book is in place: after matching (so
+a failed build of the same manuscript reuses every decision) and after writing
+the e-book next to its final name (so a failed move into place, e.g. with the
+e-book open in Word, is finished by the next run without building again).
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+
+CACHE_VERSION = 2
+
+
+def cache_filename(output_path):
+    """The cache file for the e-book at `output_path`."""
+    return os.path.splitext(output_path)[0] + ".cache.json"
+
+
+def pending_filename(output_path):
+    """Where an incremental build writes the e-book at `output_path` before moving it into place."""
+    return os.path.splitext(output_path)[0] + ".pending.docx"
+
+
+def package_member_hashes(path):
+    """{member name: sha256 of its uncompressed content} for the zip package at `path`."""
+    hashes = {}
+    with zipfile.ZipFile(path) as package:
+        for info in package.infolist():
+            digest = hashlib.sha256()
+            with package.open(info) as member:
+                for block in iter(lambda: member.read(1 << 20), b''):
+                    digest.update(block)
+            hashes[info.filename] = digest.hexdigest()
+    return hashes
+
+
+def file_signature(path):
+    """[size, mtime_ns] of `path`, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class BuildCache:
+    """The cached state of one manuscript's last e-book build."""
+
+    def __init__(self, path, data=None):
+        self.path = path
+        self.data = data if data is not None else {"version": CACHE_VERSION}
+
+    @classmethod
+    def load(cls, path):
+        """Load the cache at `path`; a missing, unreadable or outdated cache loads empty."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self):
+        """Write the cache atomically, so an interrupted write leaves the previous one."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(temp_path, self.path)
+
+    @property
+    def bookmark_texts(self):
+        """{content key: bookmark text} of the last build's XE bookmarks, in document order."""
+        return self.data.get("bookmark_texts", {})
+
+    @property
+    def match_decisions(self):
+        """{index term: [bookmark content key or None, score]} from the last link step."""
+        return self.data.get("match_decisions", {})
+
+    @property
+    def summary(self):
+        return self.data.get("summary", {})
+
+    def output_is_current(self, output_path):
+        """True if the e-book at `output_path` is the file the last build wrote."""
+        signature = self.data.get("output_signature")
+        return signature is not None and file_signature(output_path) == signature
+
+    def pending_is_current(self, pending_path):
+        """True if the e-book the last build wrote at `pending_path` is still there, not yet moved into place."""
+        signature = self.data.get("pending_signature")
+        return signature is not None and file_signature(pending_path) == signature
+
+    def changed_members(self, member_hashes):
+        """Names of the members whose content differs from the last build's input, or
+        None if members were added or removed (which changes the package structure)."""
+        previous = self.data.get("members")
+        if previous is None or previous.keys() != member_hashes.keys():
+            return None
+        return sorted(name for name, digest in member_hashes.items() if previous[name] != digest)
+
+    def can_patch(self, changed):
+        """True if every changed member is one the last build copied through unchanged."""
+        copied = set(self.data.get("copied_members", ()))
+        return all(name in copied for name in changed)
+
+    def record_build(self, member_hashes, bookmark_texts, match_decisions, threshold, summary):
+        """Checkpoint the results of a build; the output is not current until record_output."""
+        self.data.update({
+            "members": member_hashes,
+            "bookmark_texts": bookmark_texts,
+            "match_decisions": match_decisions,
+            "match_threshold": threshold,
+            "summary": summary,
+            "output_signature": None,
+            "pending_signature": None,
+        })
+
+    def record_pending(self, pending_path, copied_members):
+        """Checkpoint the e-book written at `pending_path` and the members copied into it unchanged."""
+        self.data["pending_signature"] = file_signature(pending_path)
+        self.data["copied_members"] = sorted(copied_members)
+
+    def record_output(self, output_path):
+        """Record that the pending e-book was moved to `output_path`."""
+        self.data["output_signature"] = file_signature(output_path)
+        self.data["pending_signature"] = None
+
+    def record_patch(self, member_hashes, output_path):
+        """Record that the e-book was brought up to date by patching in changed pass-through members."""
+        self.data["members"] = member_hashes
+        self.data["output_signature"] = file_signature(output_path)
+
+    def decisions_for(self, threshold):
+        """The cached match decisions, if they were made with the same threshold."""
+        if self.data.get("match_threshold") != threshold:
+            return {}
+        return self.match_decisions
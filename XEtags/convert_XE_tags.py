@@ -1,10 +1,14 @@
 import os
 import shutil
+import tempfile
 from zipfile import ZipFile
 from lxml import etree
 import unittest
 import re
 
+from bookmark_registry import BookmarkRegistry
+from inspect_docx import inspect_docx
+
 # Define input and output file paths
 INPUT_FILE = "../mybooks/superArchItelligence Vol1 8x10.docm"
 OUTPUT_FILE = "../mybooks/superArchItelligence Vol1 e-book.docm"
@@ -29,12 +33,9 @@ def repackage_docx_from_dir(temp_dir, output_path):
 def convert_xe_tags_to_bookmarks(input_path, output_path):
     """Convert XE tags to point bookmarks in a DOCX/DOCM file."""
     NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-    temp_dir = "temp_convert_xe"
+    temp_dir = tempfile.mkdtemp(prefix="temp_convert_xe_")
     
     try:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
         with ZipFile(input_path, 'r') as zip_ref:
             zip_ref.extractall(temp_dir)
         
@@ -45,7 +46,8 @@ def convert_xe_tags_to_bookmarks(input_path, output_path):
             tree = etree.parse(f, parser)
         
         root = tree.getroot()
-        bookmark_id = 0
+        # Existing bookmarks in every story, so new ids and names can't collide with them
+        registry = BookmarkRegistry.from_docx(input_path, document_root=root)
         
         # Find all XE-related field parts and collect them for deletion
         xe_runs_to_delete = set()
@@ -70,20 +72,8 @@ def convert_xe_tags_to_bookmarks(input_path, output_path):
                     break
             
             if text_run is not None:
-                # Create bookmark with sequential name
-                bookmark_name = f"xe_bookmark_{bookmark_id}"
-                bookmark_start = etree.Element('{%s}bookmarkStart' % NS['w'])
-                bookmark_start.set('{%s}id' % NS['w'], str(bookmark_id))
-                bookmark_start.set('{%s}name' % NS['w'], bookmark_name)
-                
-                bookmark_end = etree.Element('{%s}bookmarkEnd' % NS['w'])
-                bookmark_end.set('{%s}id' % NS['w'], str(bookmark_id))
-                
-                bookmark_id += 1
-                
-                # Create point bookmark by placing start and end adjacent to each other
-                text_run.addprevious(bookmark_start)
-                text_run.addprevious(bookmark_end)  # Both before the text run, making them adjacent
+                # Create point bookmark with sequential name, start and end adjacent before the text run
+                registry.add_point(text_run, registry.allocate_name("xe_bookmark_"))
             
             # Mark this run for deletion
             xe_runs_to_delete.add(run)
@@ -121,50 +111,7 @@ def convert_xe_tags_to_bookmarks(input_path, output_path):
 
 def count_point_bookmarks(docx_path):
     """Count the instances of point bookmarks in a DOCX/DOCM file."""
-    NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-    temp_dir = "temp_count_bookmarks"
-    
-    try:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
-        with ZipFile(docx_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        xml_path = os.path.join(temp_dir, 'word', 'document.xml')
-        parser = etree.XMLParser(ns_clean=True)
-        
-        with open(xml_path, 'rb') as f:
-            tree = etree.parse(f, parser)
-        
-        root = tree.getroot()
-        
-        # Find all bookmarkStart elements
-        bookmark_starts = root.xpath('//w:bookmarkStart', namespaces=NS)
-        
-        point_bookmark_count = 0
-        for bookmark_start in bookmark_starts:
-            bookmark_id = bookmark_start.get(f'{{{NS["w"]}}}id')
-            if bookmark_id:
-                # Find the corresponding bookmarkEnd with the same id
-                bookmark_end = root.xpath(f'//w:bookmarkEnd[@w:id="{bookmark_id}"]', namespaces=NS)
-                if bookmark_end:
-                    # Check if this is a point bookmark (start and end are adjacent)
-                    parent = bookmark_start.getparent()
-                    if parent is not None:
-                        children = list(parent)
-                        start_index = children.index(bookmark_start)
-                        # Check if the next element is the corresponding bookmarkEnd
-                        if (start_index + 1 < len(children) and 
-                            children[start_index + 1].tag == f'{{{NS["w"]}}}bookmarkEnd' and
-                            children[start_index + 1].get(f'{{{NS["w"]}}}id') == bookmark_id):
-                            point_bookmark_count += 1
-        
-        return point_bookmark_count
-    
-    finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    return inspect_docx(docx_path).point_bookmarks
 
 def main():
     if not os.path.exists(INPUT_FILE):
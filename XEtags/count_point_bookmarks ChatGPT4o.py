@@ -1,5 +1,6 @@
 import os
 import shutil
+import tempfile
 from zipfile import ZipFile
 from lxml import etree
 import unittest
@@ -7,12 +8,9 @@ import unittest
 def count_point_bookmarks(docx_path):
     """Count the instances of point bookmarks in a DOCX file."""
     NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-    temp_dir = "temp_count_bookmarks"
+    temp_dir = tempfile.mkdtemp(prefix="temp_count_bookmarks_")
     
     try:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
         with ZipFile(docx_path, 'r') as zip_ref:
             zip_ref.extractall(temp_dir)
         
@@ -6,8 +6,22 @@ from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.enum.section import WD_SECTION_START
+from docx.opc.constants import CONTENT_TYPE as CT
 import tempfile
 import shutil
+from docx_package import save_document, write_package
+from document_view import DocumentView
+from index_model import is_group_header, parse_index
+from pipeline_stats import PipelineStats, count
+from build_cache import BuildCache, cache_filename, package_member_hashes, pending_filename
+from bookmark_registry import BookmarkRegistry
+from docx_stories import DOCUMENT_MEMBER, load_document, story_members, story_parts
+from docx_compact import compact_document
+from docx_media import media_cache_dirname, optimize_images
+
+# Parts python-docx loads as opaque blobs that the e-book steps edit, besides the
+# notes: the theme (its fonts, see set_font_georgia_styles). load_docx loads them as XML parts.
+EBOOK_XML_CONTENT_TYPES = (CT.OFC_THEME,)
 
 # --- E-Book Creation Functions Scaffold ---
 
@@ -39,96 +53,134 @@ def set_font_georgia(doc: Document) -> None:
         if hasattr(style, 'font'):
             style.font.name = "Georgia"
 
-def adjust_title_page(doc: Document) -> None:
+def set_font_georgia_styles(doc: Document, font_name: str = "Georgia") -> None:
+    """Make 'Georgia' the document font through docDefaults, the style table and the theme,
+        instead of stamping it on every run. Run-level font overrides in the body, headers
+        and footers are stripped only where they name a different font.
+        The theme is rewritten if it was loaded as an XML part, as load_docx does."""
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.opc.part import XmlPart
+
+    font_attrs = (qn('w:ascii'), qn('w:hAnsi'))
+    theme_attrs = (qn('w:asciiTheme'), qn('w:hAnsiTheme'))
+
+    def names_other_font(r_fonts):
+        return (any(r_fonts.get(attr) not in (None, font_name) for attr in font_attrs)
+                or any(r_fonts.get(attr) is not None for attr in theme_attrs))
+
+    def set_georgia(r_fonts):
+        for attr in theme_attrs:
+            r_fonts.attrib.pop(attr, None)
+        for attr in font_attrs:
+            r_fonts.set(attr, font_name)
+
+    # docDefaults: the base font every style and run inherits from
+    styles = doc.styles.element
+    doc_defaults = styles.find(qn('w:docDefaults'))
+    if doc_defaults is None:
+        doc_defaults = OxmlElement('w:docDefaults')
+        styles.insert(0, doc_defaults)
+    rpr_default = doc_defaults.find(qn('w:rPrDefault'))
+    if rpr_default is None:
+        rpr_default = OxmlElement('w:rPrDefault')
+        doc_defaults.insert(0, rpr_default)
+    rpr = rpr_default.find(qn('w:rPr'))
+    if rpr is None:
+        rpr = OxmlElement('w:rPr')
+        rpr_default.append(rpr)
+    r_fonts = rpr.find(qn('w:rFonts'))
+    if r_fonts is None:
+        r_fonts = OxmlElement('w:rFonts')
+        rpr.insert(0, r_fonts)
+    set_georgia(r_fonts)
+
+    # Style table: rewrite only the styles that name some other font
+    for style in styles.iterchildren(qn('w:style')):
+        for r_fonts in style.iter(qn('w:rFonts')):
+            if names_other_font(r_fonts):
+                set_georgia(r_fonts)
+
+    # Theme: point the major (headings) and minor (body) Latin fonts at Georgia too
+    for rel in doc.part.rels.values():
+        if rel.is_external or rel.reltype != RT.THEME or not isinstance(rel.target_part, XmlPart):
+            continue
+        ns = {'a': 'http://schemas.openxmlformats.org/drawingml/2006/main'}
+        for latin in rel.target_part.element.xpath('//a:fontScheme/*/a:latin', namespaces=ns):
+            latin.set('typeface', font_name)
+
+    # Run-level overrides in the body, headers and footers
+    stories = [doc.element]
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.HEADER, RT.FOOTER):
+            stories.append(rel.target_part.element)
+    for story in stories:
+        run_fonts = list(story.iter(qn('w:rFonts')))
+        count("rfonts_visited", len(run_fonts))
+        for r_fonts in run_fonts:
+            if not names_other_font(r_fonts):
+                continue
+            for attr in font_attrs + theme_attrs:
+                r_fonts.attrib.pop(attr, None)
+            if not r_fonts.attrib:
+                r_fonts.getparent().remove(r_fonts)
+
+def adjust_title_page(doc: Document, view: DocumentView = None) -> None:
     """Change 'superArchItelligence' on the title page to size 28, 
         'Redesigning the real world' and 'for artificial intelligence' to size 20, 
         and ensure only one blank line above 'Alan G Street'. 
         Raise an error if 'superArchItelligence' is not found."""
+    view = view or DocumentView(doc)
+    paragraphs, texts = view.paragraphs, view.texts
     found_title = False
     # Change font size of 'superArchItelligence' on title page from 36 to 28
-    for paragraph in doc.paragraphs[:10]:  # Assume title is in the first 10 paragraphs
-        if "superArchItelligence" in paragraph.text:
+    for i in range(view.sections.title_page_end):
+        if "superArchItelligence" in texts[i]:
             found_title = True
-            for run in paragraph.runs:
+            for run in paragraphs[i].runs:
                 run.font.size = Pt(28)
-        if "Redesigning the real world" in paragraph.text or "for artificial intelligence" in paragraph.text:
-            for run in paragraph.runs:
+        if "Redesigning the real world" in texts[i] or "for artificial intelligence" in texts[i]:
+            for run in paragraphs[i].runs:
                 run.font.size = Pt(20)
     if not found_title:
         raise ValueError("'superArchItelligence' not found in the first 10 paragraphs of the document.")
     # Remove one blank line above 'Alan G Street'
-    for i, paragraph in enumerate(doc.paragraphs):
-        if "Alan G Street" in paragraph.text:
-            if i > 1 and doc.paragraphs[i - 1].text == "" and doc.paragraphs[i - 2].text == "":
-                p = doc.paragraphs[i - 2]._element
-                p.getparent().remove(p)
-            break
-
-def adjust_copyright_page(doc: Document) -> None:
-    """Remove blank line at the top of the copyright page."""
-    for i, paragraph in enumerate(doc.paragraphs):
-        if "Copyright © 2025" in paragraph.text:
-            if i > 0 and doc.paragraphs[i - 1].text.strip() == "":
-                p = doc.paragraphs[i - 1]._element
-                p.getparent().remove(p)
-            break
-
-def convert_index_to_static_text(doc: Document) -> None:
-    """Convert the index field to static text by clearing and replacing index paragraphs with their plain text content."""
+    i = view.sections.author
+    if i is not None and i > 1 and texts[i - 1] == "" and texts[i - 2] == "":
+        view.remove_paragraph(i - 2)
 
-    # Locate the Index section
-    index_start = None
-    for i, para in enumerate(doc.paragraphs):
-        if is_index_heading(para):
-            index_start = i
-            break
+def adjust_copyright_page(doc: Document, view: DocumentView = None) -> None:
+    """Remove blank line at the top of the copyright page."""
+    view = view or DocumentView(doc)
+    i = view.sections.copyright
+    if i is not None and i > 0 and view.texts[i - 1].strip() == "":
+        view.remove_paragraph(i - 1)
 
-    # Extract index paragraphs preserving their content
-    index_paragraphs = []
-    for i, para in enumerate(doc.paragraphs[index_start + 1:], start=index_start + 1):
-        if para.text.strip().upper() in ["ACKNOWLEDGEMENTS", "ABOUT THE AUTHOR"]:
-            break
-        index_paragraphs.append((i, para.text))
+def convert_index_to_static_text(doc: Document, view: DocumentView = None) -> None:
+    """Convert the index field to static text by clearing and replacing index paragraphs with their plain text content."""
+    view = view or DocumentView(doc)
 
-    # Replace index field paragraphs with static versions
-    for i, text in index_paragraphs:
-        doc.paragraphs[i].clear()  # Clear all content (including field codes)
-        doc.paragraphs[i].add_run(text)  # Add back the plain text content
+    # Replace index field paragraphs with static versions, preserving their text
+    for i in view.index_range():
+        text = view.texts[i]
+        paragraph = view.paragraphs[i]
+        paragraph.clear()  # Clear all content (including field codes)
+        paragraph.add_run(text)  # Add back the plain text content
 
 
 # Helper function to detect index section
 def is_index_heading(paragraph):
     return paragraph.text.strip().upper() == "INDEX"
 
-def check_index_entries_single_page_number(doc: Document) -> None:
-    """Ensure no index entry has more than one simple integer page number (after static conversion)."""
-    # Locate the Index section
-    index_start = None
-    for i, para in enumerate(doc.paragraphs):
-        if para.text.strip().upper() == "INDEX":
-            index_start = i
-            break
-    if index_start is None:
-        raise ValueError("No index section found in the document.")
-    # Extract index paragraphs (static text)
-    index_paragraphs = []
-    for para in doc.paragraphs[index_start + 1:]:
-        text = para.text.strip()
-        if text.upper() in ["ACKNOWLEDGEMENTS", "ABOUT THE AUTHOR"]:
-            break
-        if text:
-            index_paragraphs.append(text)
-    # Check for multiple simple integer page numbers after static conversion
-    for entry in index_paragraphs:
-        if ',' in entry:
-            # Get everything after the first comma
-            after_first_comma = entry.split(',', 1)[1]
-            # Remove parenthetical expressions (e.g., (1.4))
-            after_first_comma = re.sub(r'\([^)]*\)', '', after_first_comma)
-            # Find all simple integer tokens
-            numbers = re.findall(r'\b\d+\b', after_first_comma)
-            if len(numbers) > 1:
-                raise ValueError(f"Index entry '{entry}' has more than one page number after static conversion.")
+def check_index_entries_single_page_number(doc: Document, view: DocumentView = None, index: list = None) -> None:
+    """Ensure no index entry has more than one simple integer page number (after static conversion).
+
+    `index` is the parsed index (see index_model.parse_index), by default parsed from `view`."""
+    view = view or DocumentView(doc)
+    if index is None:
+        index = parse_index(view)
+    for entry in index:
+        if len(entry.pages) > 1:
+            raise ValueError(f"Index entry '{entry.text}' has more than one page number after static conversion.")
 
 def sanitize_bookmark_name(name):
     import re
@@ -138,270 +190,286 @@ def sanitize_bookmark_name(name):
         name = 'B_' + name
     return name[:40]  # Bookmark names must be ≤ 40 characters
 
-def repackage_docx_from_dir(temp_dir, output_path):
-    import zipfile
-    import os
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as docx_zip:
-        for foldername, subfolders, filenames in os.walk(temp_dir):
-            for filename in filenames:
-                file_path = os.path.join(foldername, filename)
-                arcname = os.path.relpath(file_path, temp_dir)
-                print(f"Adding to zip: {arcname}")
-                docx_zip.write(file_path, arcname)
-
-def convert_xe_tags_to_bookmarks(docx_path, output_path):
-    import os
-    import shutil
-    import re
-    from zipfile import ZipFile
-    from lxml import etree
-    
-    NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+def xe_content_key(paragraph_text, term, ordinal):
+    """Identity of an XE bookmark that survives renumbering: a hash of its paragraph's text,
+    its index term and its position among the paragraph's XE fields."""
+    import hashlib
+    return hashlib.sha1(f"{paragraph_text}\x00{term}\x00{ordinal}".encode('utf-8')).hexdigest()[:20]
+
+def convert_xe_tags_in_tree(root, registry: BookmarkRegistry = None, bookmark_keys: dict = None):
+    """Convert the XE fields under a parsed document.xml root to point bookmarks, in place.
+
+    Each paragraph is scanned once with a begin/separate/end field state machine, so XE
+    fields whose instruction is split across runs are recognized whole and exactly their
+    runs are removed. The point bookmark goes where the XE field was. Bookmark ids and
+    names come from `registry` (by default the bookmarks under `root`), so they never
+    collide with bookmarks already in the book. With `bookmark_keys`, the xe_content_key
+    of every new bookmark is added to it by bookmark name.
+
+    Returns (index_term_to_bookmark, bookmark_to_text)."""
+    from docx_fields import P, scan_paragraph_fields, run_text, remove_field
+    if registry is None:
+        registry = BookmarkRegistry.from_tree(root)
     
     # Dictionary to store mapping of index terms to bookmark names
     index_term_to_bookmark = {}
     # Dictionary to store mapping of bookmark names to their surrounding text
     bookmark_to_text = {}
     
-    temp_dir = "temp_docx"
-    try:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        
-        with ZipFile(docx_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        xml_path = os.path.join(temp_dir, 'word', 'document.xml')
-        
-        parser = etree.XMLParser(ns_clean=True)
-        with open(xml_path, 'rb') as f:
-            tree = etree.parse(f, parser)
-        
-        root = tree.getroot()
-        bookmark_id = 0
-        
-        # Find all XE-related field parts and collect them for deletion
-        xe_runs_to_delete = set()
+    paragraphs = list(root.iter(P))
+    count("paragraphs_scanned", len(paragraphs))
+    for paragraph in paragraphs:
+        runs, fields = scan_paragraph_fields(paragraph)
+        count("runs_scanned", len(runs))
+        xe_fields = sorted((f for f in fields if f.field_type == 'XE'), key=lambda f: f.start)
+        if xe_fields and bookmark_keys is not None:
+            paragraph_text = "".join(run_text(run) for run in runs)
         
-        # Find all instrText elements containing "XE" (complete or partial)
-        instr_texts = root.xpath('//w:instrText[contains(text(), "XE")]', namespaces=NS)
-        
-        for instr in instr_texts:
-            field_text = instr.text or ""
-            
-            # Try to extract index term from complete XE tags
-            match = re.search(r'\s*XE "([^"]+)"', field_text)
-            index_term = None
-            if match:
-                index_term = match.group(1)
-            
-            # Create a bookmark for this XE field (even if fragmented)
-            run = instr.getparent()
-            paragraph = run.getparent()
+        for ordinal, field in enumerate(xe_fields):
+            if field.anchor.getparent() is None:
+                continue  # Nested in an XE field that was already removed
             
-            # Try to find a nearby run with display text
-            text_run = None
-            surrounding_text = ""
-            run_index = paragraph.index(run)
+            # Display text around the field: up to five runs before it and the run after it,
+            # plus any text sharing a run with the end marker
+            nearby_runs = runs[max(0, field.start - 5):field.start]
+            if field.end >= field.start:
+                nearby_runs.append(runs[field.end])
+            nearby_runs += runs[field.end + 1:field.end + 2]
+            surrounding_text = " ".join(filter(None, (run_text(run).strip() for run in nearby_runs)))
             
-            # Look for display text in nearby runs (broader search)
-            for i in range(max(0, run_index-5), min(len(paragraph), run_index+2)):
-                check_run = paragraph[i]
-                if check_run.tag.endswith('r'):
-                    text_elements = check_run.xpath('.//w:t', namespaces=NS)
-                    if text_elements:
-                        run_text = ''.join([t.text or '' for t in text_elements])
-                        surrounding_text += run_text + " "
-                        if text_run is None and i < run_index:  # Use the last text run before XE
-                            text_run = check_run
+            # Create point bookmark (start and end adjacent) where the XE field was
+            _, bookmark_name = registry.add_point(field.anchor, registry.allocate_name("xe_bookmark_"))
             
-            surrounding_text = surrounding_text.strip()
+            # Store the mapping if we found an index term
+            index_term = field.xe_term()
+            if index_term:
+                index_term_to_bookmark[index_term] = bookmark_name
+            if bookmark_keys is not None:
+                bookmark_keys[bookmark_name] = xe_content_key(paragraph_text, index_term, ordinal)
             
-            if text_run is not None:
-                # Create bookmark with sequential name
-                bookmark_name = f"xe_bookmark_{bookmark_id}"
-                bookmark_start = etree.Element('{%s}bookmarkStart' % NS['w'])
-                bookmark_start.set('{%s}id' % NS['w'], str(bookmark_id))
-                bookmark_start.set('{%s}name' % NS['w'], bookmark_name)
-                
-                bookmark_end = etree.Element('{%s}bookmarkEnd' % NS['w'])
-                bookmark_end.set('{%s}id' % NS['w'], str(bookmark_id))
-                
-                bookmark_id += 1
-                
-                # Store the mapping if we found an index term
-                if index_term:
-                    index_term_to_bookmark[index_term] = bookmark_name
-                
-                # Also store the surrounding text for fuzzy matching
-                if surrounding_text:
-                    bookmark_to_text[bookmark_name] = surrounding_text
-                
-                # Create point bookmark by placing start and end adjacent to each other
-                text_run.addprevious(bookmark_start)
-                text_run.addprevious(bookmark_end)  # Both before the text run, making them adjacent
-            
-            # Mark this run for deletion
-            xe_runs_to_delete.add(run)
-        
-        # Also find any runs that contain XE field characters or related content
-        # Look for fldChar elements that might be part of XE fields
-        for fld_char in root.xpath('//w:fldChar', namespaces=NS):
-            run = fld_char.getparent()
-            # Check if this run or nearby runs contain XE-related content
-            paragraph = run.getparent()
-            run_index = paragraph.index(run)
+            # Also store the surrounding text for fuzzy matching
+            if surrounding_text:
+                bookmark_to_text[bookmark_name] = surrounding_text
             
-            # Check runs around this fldChar for XE content
-            for i in range(max(0, run_index-2), min(len(paragraph), run_index+3)):
-                check_run = paragraph[i]
-                if check_run.tag.endswith('r'):
-                    # Check for XE in instrText or regular text
-                    for text_elem in check_run.xpath('.//w:instrText | .//w:t', namespaces=NS):
-                        if text_elem.text and 'XE' in text_elem.text:
-                            xe_runs_to_delete.add(check_run)
-                            break
-        
-        # Delete all identified XE-related runs
-        for run in xe_runs_to_delete:
-            parent = run.getparent()
-            if parent is not None:
-                parent.remove(run)
-        
-        tree.write(xml_path, encoding='utf-8', xml_declaration=True)
-        repackage_docx_from_dir(temp_dir, output_path)
-        
-        # Return both mappings
-        return index_term_to_bookmark, bookmark_to_text
-        
-    finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+            remove_field(field, runs)
+    
+    # Return both mappings
+    return index_term_to_bookmark, bookmark_to_text
+
+def convert_xe_tags_in_stories(roots, registry: BookmarkRegistry, bookmark_keys: dict = None):
+    """Convert the XE fields of several story trees (notes, headers, ..., body) on one registry.
+
+    The trees are converted in the given order, so bookmark names and ids don't depend
+    on how the parts were loaded. Returns (index_term_to_bookmark, bookmark_to_text,
+    converted), `converted` being the indexes of the trees that got bookmarks.
+    `bookmark_keys` is filled as in convert_xe_tags_in_tree."""
+    index_term_to_bookmark = {}
+    bookmark_to_text = {}
+    converted = []
+    for i, root in enumerate(roots):
+        bookmarks_before = len(registry.names)
+        tree_terms, tree_texts = convert_xe_tags_in_tree(root, registry, bookmark_keys)
+        index_term_to_bookmark.update(tree_terms)
+        bookmark_to_text.update(tree_texts)
+        if len(registry.names) > bookmarks_before:
+            converted.append(i)
+    return index_term_to_bookmark, bookmark_to_text, converted
+
+def convert_xe_tags_in_document(doc: Document, registry: BookmarkRegistry = None, bookmark_keys: dict = None):
+    """Convert XE tags to bookmarks on the already loaded document, with no save/reload round trip.
+
+    Footnotes, endnotes, headers, footers and comments are converted too, before the
+    body. `registry` defaults to the bookmarks of all of them; footnotes and endnotes
+    are converted if the document was loaded with load_docx (docx_stories.load_document).
+    `bookmark_keys` is filled as in convert_xe_tags_in_tree."""
+    if registry is None:
+        registry = BookmarkRegistry.from_document(doc)
+    roots = [part.element for part in story_parts(doc)] + [doc.element]
+    index_term_to_bookmark, bookmark_to_text, _ = convert_xe_tags_in_stories(roots, registry, bookmark_keys)
+    return index_term_to_bookmark, bookmark_to_text
+
+def _parse_part(xml_bytes):
+    from lxml import etree
+    return etree.fromstring(xml_bytes, etree.XMLParser(ns_clean=True))
+
+def _serialize_part(root):
+    from lxml import etree
+    return etree.tostring(root, encoding='utf-8', xml_declaration=True)
+
+def convert_xe_tags_to_bookmarks(docx_path, output_path, streaming=False):
+    """Convert XE tags to bookmarks in a .docx file, writing the result to output_path.
+
+    XE fields in footnotes, endnotes, headers, footers and comments are converted
+    too, in a fixed order on one bookmark registry. word/document.xml is always
+    rewritten, other parts only if they had XE fields; every other member is copied
+    raw. With `streaming`, the document is converted one body block at a time and
+    never held whole in memory (see stream_xe_tags_to_bookmarks)."""
+    from zipfile import ZipFile
+    
+    if streaming:
+        return stream_xe_tags_to_bookmarks(docx_path, output_path)
+    
+    with ZipFile(docx_path, 'r') as zip_ref:
+        root = _parse_part(zip_ref.read(DOCUMENT_MEMBER))
+        story_names = story_members(zip_ref.namelist())
+        story_roots = [_parse_part(zip_ref.read(name)) for name in story_names]
+    
+    registry = BookmarkRegistry.from_tree(root, *story_roots)
+    index_term_to_bookmark, bookmark_to_text, converted = convert_xe_tags_in_stories(
+        story_roots + [root], registry)
+    
+    replacements = {story_names[i]: _serialize_part(story_roots[i]) for i in converted if i < len(story_roots)}
+    replacements[DOCUMENT_MEMBER] = _serialize_part(root)
+    write_package(docx_path, output_path, replacements)
+    
+    # Return both mappings
+    return index_term_to_bookmark, bookmark_to_text
+
+def stream_xe_tags_to_bookmarks(docx_path, output_path):
+    """Convert XE tags to bookmarks like convert_xe_tags_to_bookmarks, with memory bounded
+    by the largest paragraph or table instead of the book.
+
+    The existing bookmark ids and names are reserved in a first streaming pass. The
+    story parts (notes, headers, ...) are small and converted in memory first; then
+    document.xml is streamed from the input package into the output one, converting
+    each body block as it is read. The output is the same as the in-memory converter's.
+
+    Returns (index_term_to_bookmark, bookmark_to_text)."""
+    from zipfile import ZipFile
+    from docx_stream import stream_transform_docx
+    from docx_fields import FLD_SIMPLE, INSTR_TEXT
+    
+    registry = BookmarkRegistry.reserved_from_docx(docx_path)
+    with ZipFile(docx_path, 'r') as zip_ref:
+        story_names = story_members(zip_ref.namelist())
+        story_roots = [_parse_part(zip_ref.read(name)) for name in story_names]
+    index_term_to_bookmark, bookmark_to_text, converted = convert_xe_tags_in_stories(story_roots, registry)
+    registry.release()
+    replacements = {story_names[i]: _serialize_part(story_roots[i]) for i in converted}
+    del story_roots
+    
+    def convert_block(block):
+        if next(block.iter(INSTR_TEXT, FLD_SIMPLE), None) is None:
+            return  # No field instruction, so no XE field to convert
+        block_terms, block_texts = convert_xe_tags_in_tree(block, registry)
+        index_term_to_bookmark.update(block_terms)
+        bookmark_to_text.update(block_texts)
+        registry.release()
+    
+    stream_transform_docx(docx_path, output_path, convert_block, replacements=replacements)
+    return index_term_to_bookmark, bookmark_to_text
+
+def ebook_modified_partnames(doc: Document) -> set:
+    """Partnames of the parts the e-book steps rewrite: the main document, styles, theme, headers,
+    footers, and the notes and comments parts (their XE fields are converted)."""
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    partnames = {doc.part.partname}
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.STYLES, RT.THEME):
+            partnames.add(rel.target_part.partname)
+    partnames.update(part.partname for part in story_parts(doc))
+    return partnames
 
 def verify_no_xe_tags(doc: Document) -> None:
-    """Ensure no {XE} tags remain in the document."""
-    pass
+    """Ensure no XE fields remain in the body, notes, headers, footers or comments."""
+    from inspect_docx import FieldCounter
+    from docx_fields import FLD_CHAR, FLD_SIMPLE, INSTR_TEXT
+    xe_fields = 0
+    for root in [doc.element] + [part.element for part in story_parts(doc)]:
+        fields = FieldCounter()
+        for element in root.iter(FLD_CHAR, INSTR_TEXT, FLD_SIMPLE):
+            fields.feed(element)
+        xe_fields += fields.fields.get('XE', 0)
+    if xe_fields:
+        raise ValueError(f"{xe_fields} XE fields remain after conversion to bookmarks.")
 
-def link_index_entries_to_bookmarks(doc: Document, index_term_to_bookmark: dict, bookmark_to_text: dict) -> None:
-    """Create hyperlinks from index entries to their corresponding bookmarks."""
+def link_index_entries_to_bookmarks(doc: Document, index_term_to_bookmark: dict, bookmark_to_text: dict,
+                                    view: DocumentView = None, matcher=None,
+                                    registry: BookmarkRegistry = None, index: list = None) -> None:
+    """Create hyperlinks from index entries to their corresponding bookmarks.
+
+    `matcher` replaces the BookmarkTextMatcher used for fuzzy matching (e.g. a CachedBookmarkMatcher).
+    With `registry`, exact matches whose bookmark is not in the document are skipped, so
+    no hyperlink points at a missing bookmark. `index` is the parsed index (see
+    index_model.parse_index), by default parsed from `view`."""
+    view = view or DocumentView(doc)
     
     # Find the index section
-    index_start = None
-    for i, para in enumerate(doc.paragraphs):
-        if is_index_heading(para):
-            index_start = i
-            break
-    
-    if index_start is None:
+    if view.sections.index_heading is None:
         print("Warning: No index section found")
         return
-    
-    # Process index paragraphs
-    index_end = len(doc.paragraphs)
-    for i in range(index_start + 1, len(doc.paragraphs)):
-        para = doc.paragraphs[i]
-        if para.text.strip().upper() in ["ACKNOWLEDGEMENTS", "ABOUT THE AUTHOR"]:
-            index_end = i
-            break
+    if index is None:
+        index = parse_index(view)
     
     matched_count = 0
+    style_id = hyperlink_style(doc)
+    exact_matcher = ExactTermMatcher(index_term_to_bookmark, registry)
+    fuzzy_matcher = None
     
-    # Go through each index paragraph and create hyperlinks
-    for i in range(index_start + 1, index_end):
-        para = doc.paragraphs[i]
-        text = para.text.strip()
-        
-        if not text:
-            continue
-            
-        # Parse the index entry to extract the main term
-        # Format is typically: "Term, page_number" or "Term, Subterm, page_number"
-        if ',' in text:
-            main_term = text.split(',')[0].strip()
-        else:
-            main_term = text.strip()
+    # Go through each index entry and create hyperlinks
+    for entry in index:
+        count("index_entries")
         
         # Skip single letters (section headers)
-        if len(main_term) == 1:
+        if is_group_header(entry):
             continue
         
         # Find corresponding bookmark
         bookmark_name = None
         
-        # Method 1: Exact match with extracted index terms
-        for index_term, bm_name in index_term_to_bookmark.items():
-            if index_term == main_term or main_term in index_term:
-                bookmark_name = bm_name
-                break
+        # Method 1: Exact match with extracted index terms (the first one equal to or containing the main term)
+        bookmark_name = exact_matcher.first_containing(entry.term)
         
         # Method 2: Fuzzy matching with surrounding text
         if not bookmark_name:
-            best_match_score = 0
-            best_bookmark = None
-            
-            for bm_name, surrounding_text in bookmark_to_text.items():
-                # Calculate similarity score
-                score = calculate_text_similarity(main_term, surrounding_text)
-                if score > best_match_score and score > 0.25:  # Lowered threshold from 0.3 to 0.25
-                    best_match_score = score
-                    best_bookmark = bm_name
-            
-            if best_bookmark:
-                bookmark_name = best_bookmark
+            if fuzzy_matcher is None:
+                fuzzy_matcher = matcher or BookmarkTextMatcher(bookmark_to_text, threshold=0.25)  # Lowered threshold from 0.3 to 0.25
+            bookmark_name = fuzzy_matcher.best_match(entry.term)
         
+        para = view.paragraphs[entry.paragraph]
         if bookmark_name:
             matched_count += 1
-            # Clear the paragraph and recreate it with hyperlink
-            original_text = para.text
+            # Recreate the paragraph as a hyperlink on the term part only (no page number)
             para.clear()
-            
-            # Split text into term part and page number part
-            if ',' in original_text:
-                parts = original_text.rsplit(',', 1)  # Split on last comma
-                term_part = parts[0].strip()
-                # page_part = parts[1].strip() if len(parts) > 1 else ""
-                
-                # Create hyperlink for the term part only (no page number)
-                add_hyperlink_to_paragraph(para, term_part, bookmark_name)
-                
-                # Don't add the page number part back - remove this section:
-                # if page_part:
-                #     para.add_run(f", {page_part}")
-            else:
-                # No page number, just make the whole thing a hyperlink
-                add_hyperlink_to_paragraph(para, original_text, bookmark_name)
-        else:
+            add_hyperlink_to_paragraph(para, entry.label, bookmark_name, style_id)
+            view.refresh_text(entry.paragraph)
+        elif entry.locator is not None:
             # For unlinked entries, also remove page numbers
-            original_text = para.text
-            if ',' in original_text:
-                parts = original_text.rsplit(',', 1)  # Split on last comma
-                term_part = parts[0].strip()
-                # Replace the paragraph text with just the term (no page number)
-                para.clear()
-                para.add_run(term_part)
+            para.clear()
+            para.add_run(entry.label)
+            view.refresh_text(entry.paragraph)
     
     print(f"Created hyperlinks for {matched_count} index entries")
 
 
+# Words that don't help with matching index terms to bookmark text
+COMMON_WORDS = frozenset({'the', 'and', 'or', 'of', 'in', 'to', 'for', 'with', 'a', 'an'})
+_PARENTHETICAL_RE = re.compile(r'\s*\([^)]*\)\s*')
+_PUNCTUATION_RE = re.compile(r'[&/-]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def clean_index_term(term_lower):
+    """Normalize a lowercased index term for matching."""
+    # Remove common parenthetical content like (3.4.6), (1.1), etc.
+    clean_term = _PARENTHETICAL_RE.sub(' ', term_lower).strip()
+    # Remove common punctuation that might not appear in surrounding text
+    clean_term = _PUNCTUATION_RE.sub(' ', clean_term)
+    # Normalize whitespace
+    return _WHITESPACE_RE.sub(' ', clean_term)
+
+def clean_bookmark_text(text_lower):
+    """Normalize lowercased bookmark surrounding text the same way as index terms."""
+    return _WHITESPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', text_lower))
+
 def calculate_text_similarity(term, text):
     """Calculate a simple similarity score between an index term and surrounding text."""
+    count("similarity_calls")
     term_lower = term.lower()
     text_lower = text.lower()
     
-    # Clean up the term for better matching
-    # Remove common parenthetical content like (3.4.6), (1.1), etc.
-    import re
-    clean_term = re.sub(r'\s*\([^)]*\)\s*', ' ', term_lower).strip()
-    
-    # Remove common punctuation that might not appear in surrounding text
-    clean_term = re.sub(r'[&/-]', ' ', clean_term)
-    
-    # Normalize whitespace
-    clean_term = re.sub(r'\s+', ' ', clean_term)
-    
-    # Also clean the text similarly
-    clean_text = re.sub(r'[&/-]', ' ', text_lower)
-    clean_text = re.sub(r'\s+', ' ', clean_text)
+    # Clean up the term and the text for better matching
+    clean_term = clean_index_term(term_lower)
+    clean_text = clean_bookmark_text(text_lower)
     
     # Exact match on cleaned versions
     if clean_term in clean_text:
@@ -411,14 +479,9 @@ def calculate_text_similarity(term, text):
     if term_lower in text_lower:
         return 1.0
     
-    # Word overlap on cleaned versions
-    term_words = set(clean_term.split())
-    text_words = set(clean_text.split())
-    
-    # Remove very common words that don't help with matching
-    common_words = {'the', 'and', 'or', 'of', 'in', 'to', 'for', 'with', 'a', 'an'}
-    term_words = term_words - common_words
-    text_words = text_words - common_words
+    # Word overlap on cleaned versions, ignoring very common words
+    term_words = set(clean_term.split()) - COMMON_WORDS
+    text_words = set(clean_text.split()) - COMMON_WORDS
     
     if not term_words:
         return 0.0
@@ -436,7 +499,11 @@ def calculate_text_similarity(term, text):
             if re.search(acronym_pattern, clean_text):
                 acronym_boost += 0.3
     
-    # Boost score for partial matches of multi-word terms
+    final_score = min(1.0, base_score + acronym_boost + _partial_match_boost(term_words, text_words))
+    return final_score
+
+def _partial_match_boost(term_words, text_words):
+    """Boost score for partial matches of multi-word terms."""
     partial_boost = 0
     if len(term_words) > 1:
         # Check if key words from the term appear in the text
@@ -445,12 +512,292 @@ def calculate_text_similarity(term, text):
             key_overlap = len(set(key_words).intersection(text_words))
             if key_overlap > 0:
                 partial_boost = (key_overlap / len(key_words)) * 0.2
+    return partial_boost
+
+class ExactTermMatcher:
+    """Exact matcher from index entries to bookmarks, built once over index_term_to_bookmark.
+
+    Finds the bookmark of the first XE term (in dict order) equal to or containing an
+    entry's main term, like testing `main_term in index_term` against every term. The
+    terms are compiled into a generalized suffix automaton: every substring of every
+    term is a path from the root, and each state knows the first term containing the
+    substrings it stands for, so a lookup walks the main term once, in time linear in
+    its length however many terms there are. With `registry`, terms whose bookmark is
+    not in the document are left out."""
+
+    def __init__(self, index_term_to_bookmark: dict, registry: BookmarkRegistry = None):
+        self.bookmarks = [bm_name for bm_name in index_term_to_bookmark.values()
+                          if registry is None or bm_name in registry]
+        terms = [index_term for index_term, bm_name in index_term_to_bookmark.items()
+                 if registry is None or bm_name in registry]
+        none = len(terms)
+        # Per state: transitions, suffix link, length of its longest substring, first term containing it
+        self._next = [{}]
+        self._link = [-1]
+        self._length = [0]
+        self._first = [none]
+        for position, term in enumerate(terms):
+            self._add(term, position)
+        # A state's substrings also occur wherever those of the states linking to it do
+        for state in sorted(range(1, len(self._length)), key=self._length.__getitem__, reverse=True):
+            parent = self._link[state]
+            if self._first[state] < self._first[parent]:
+                self._first[parent] = self._first[state]
+
+    def _new_state(self, length, link=-1, transitions=None):
+        self._next.append(transitions if transitions is not None else {})
+        self._link.append(link)
+        self._length.append(length)
+        self._first.append(len(self.bookmarks))
+        return len(self._length) - 1
+
+    def _clone(self, p, q, char):
+        """Split state q so the substrings reached from p by `char` get a state of their own."""
+        clone = self._new_state(self._length[p] + 1, self._link[q], dict(self._next[q]))
+        while p != -1 and self._next[p].get(char) == q:
+            self._next[p][char] = clone
+            p = self._link[p]
+        self._link[q] = clone
+        return clone
+
+    def _add(self, term, position):
+        nxt, length = self._next, self._length
+        last = 0
+        if position < self._first[0]:
+            self._first[0] = position  # the empty string, even for an empty term
+        for char in term:
+            q = nxt[last].get(char)
+            if q is not None:
+                # The prefix so far is already a substring of an earlier term
+                last = q if length[last] + 1 == length[q] else self._clone(last, q, char)
+            else:
+                cur = self._new_state(length[last] + 1)
+                p = last
+                while p != -1 and char not in nxt[p]:
+                    nxt[p][char] = cur
+                    p = self._link[p]
+                if p == -1:
+                    self._link[cur] = 0
+                else:
+                    q = nxt[p][char]
+                    self._link[cur] = q if length[p] + 1 == length[q] else self._clone(p, q, char)
+                last = cur
+            if position < self._first[last]:
+                self._first[last] = position
+
+    def first_containing(self, main_term):
+        """The bookmark of the first term equal to or containing `main_term`, or None."""
+        state = 0
+        for char in main_term:
+            state = self._next[state].get(char)
+            if state is None:
+                return None
+        first = self._first[state]
+        return self.bookmarks[first] if first < len(self.bookmarks) else None
+
+class BookmarkTextMatcher:
+    """Fuzzy matcher from index terms to bookmarks, built once over bookmark_to_text.
+
+    Gives the same answer as scoring every bookmark with calculate_text_similarity and
+    keeping the first best score above the threshold, but the bookmark texts are
+    normalized and tokenized once, and only bookmarks sharing a word with the term (or
+    containing it verbatim, which scores 1.0) are scored."""
+
+    def __init__(self, bookmark_to_text: dict, threshold: float = 0.25):
+        self.threshold = threshold
+        self.names = list(bookmark_to_text)
+        self.text_words = []
+        self.postings = {}  # word -> ascending bookmark positions
+        lower_texts = []
+        clean_texts = []
+        for position, text in enumerate(bookmark_to_text.values()):
+            text_lower = text.lower()
+            clean_text = clean_bookmark_text(text_lower)
+            lower_texts.append(text_lower)
+            clean_texts.append(clean_text)
+            words = set(clean_text.split()) - COMMON_WORDS
+            self.text_words.append(words)
+            for word in words:
+                self.postings.setdefault(word, []).append(position)
+        # Verbatim containment is answered by one str.find over all texts joined with a
+        # separator that cannot occur in XML text; the first hit is the earliest bookmark.
+        self._lower_corpus, self._lower_starts = self._join(lower_texts)
+        self._clean_corpus, self._clean_starts = self._join(clean_texts)
+
+    @staticmethod
+    def _join(texts):
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        return '\x00'.join(texts), starts
+
+    @staticmethod
+    def _first_containing(corpus, starts, needle):
+        import bisect
+        found_at = corpus.find(needle)
+        if found_at < 0:
+            return None
+        return bisect.bisect_right(starts, found_at) - 1
+
+    def best_match(self, term):
+        """Return the bookmark name best matching `term`, or None below the threshold."""
+        if not self.names:
+            return None
+        term_lower = term.lower()
+        clean_term = clean_index_term(term_lower)
+        term_words = set(clean_term.split()) - COMMON_WORDS
+
+        exact_hits = [hit for hit in (self._first_containing(self._clean_corpus, self._clean_starts, clean_term),
+                                      self._first_containing(self._lower_corpus, self._lower_starts, term_lower))
+                      if hit is not None]
+        first_exact = min(exact_hits) if exact_hits else None
+
+        candidates = set()
+        for word in term_words:
+            candidates.update(self.postings.get(word, ()))
+        if first_exact is not None:
+            # Nothing after the first verbatim hit can beat its 1.0
+            candidates = {position for position in candidates if position < first_exact}
+            candidates.add(first_exact)
+
+        best_match_score = 0
+        best_position = None
+        count("similarity_calls", len(candidates) - (first_exact is not None))
+        for position in sorted(candidates):
+            if position == first_exact:
+                score = 1.0
+            else:
+                text_words = self.text_words[position]
+                base_score = len(term_words.intersection(text_words)) / len(term_words)
+                score = min(1.0, base_score + _partial_match_boost(term_words, text_words))
+            if score > best_match_score and score > self.threshold:
+                best_match_score = score
+                best_position = position
+        return None if best_position is None else self.names[best_position]
+
+def _kept_in_order(names, previous_position):
+    """The largest set of `names` whose previous_position(name) still increases along `names`."""
+    import bisect
+    tails, tail_names, predecessor = [], [], {}
+    for name in names:
+        position = previous_position(name)
+        i = bisect.bisect_left(tails, position)
+        predecessor[name] = tail_names[i - 1] if i else None
+        if i == len(tails):
+            tails.append(position)
+            tail_names.append(name)
+        else:
+            tails[i] = position
+            tail_names[i] = name
+    kept = set()
+    name = tail_names[-1] if tail_names else None
+    while name is not None:
+        kept.add(name)
+        name = predecessor[name]
+    return kept
+
+class CachedBookmarkMatcher:
+    """Fuzzy matcher that reuses the decisions of the previous build where they still hold.
+
+    Bookmarks are known across builds by their content key (`bookmark_keys`, see
+    xe_content_key; without it, by name), so an XE field added near the start of the
+    book, which renumbers every later bookmark, changes only its own bookmark. A
+    bookmark is changed if its key is new or not unique, its text changed, or it moved
+    relative to the other bookmarks (the first best score wins, so order matters).
+    A previous decision for a term (winning bookmark and score, or no match) still
+    holds if the winner is unchanged and no changed bookmark scores higher - or the
+    same and earlier. So only the changed bookmarks are scored for such a term; other
+    terms go to a BookmarkTextMatcher. `previous_bookmark_texts` ({key: text}, in
+    document order) and the decisions ({term: [key or None, score]}) are what
+    keyed_texts() and `decisions` held after the previous build."""
+
+    def __init__(self, bookmark_to_text: dict, previous_bookmark_texts: dict, previous_decisions: dict,
+                 threshold: float = 0.25, bookmark_keys: dict = None):
+        from collections import Counter
+        self.bookmark_to_text = bookmark_to_text
+        self.threshold = threshold
+        self.previous_decisions = previous_decisions
+        self.decisions = {}
+        self._winners = {}
+        bookmark_keys = bookmark_keys or {}
+        self.keys = {name: bookmark_keys.get(name, name) for name in bookmark_to_text}
+        self.positions = {name: position for position, name in enumerate(bookmark_to_text)}
+        key_counts = Counter(self.keys.values())
+        self.names_by_key = {key: name for name, key in self.keys.items() if key_counts[key] == 1}
+        previous_positions = {key: position for position, key in enumerate(previous_bookmark_texts)}
+        unchanged = [name for name, text in bookmark_to_text.items()
+                     if self.keys[name] in self.names_by_key and previous_bookmark_texts.get(self.keys[name]) == text]
+        kept = _kept_in_order(unchanged, lambda name: previous_positions[self.keys[name]])
+        self.changed = [name for name in bookmark_to_text if name not in kept]
+        self._changed_names = set(self.changed)
+        # Past this many changed texts, re-scoring them per term costs more than matching afresh
+        self.revalidate = len(self.changed) <= len(bookmark_to_text) // 2
+        self._matcher = None
+
+    def keyed_texts(self):
+        """{content key: bookmark text} of this build, for the next build's previous_bookmark_texts."""
+        return {self.keys[name]: text for name, text in self.bookmark_to_text.items()}
+
+    def best_match(self, term):
+        """Return the bookmark name best matching `term`, or None below the threshold."""
+        if term not in self._winners:
+            decision = self.previous_decisions.get(term)
+            if decision is not None and self.revalidate and self._still_holds(term, *decision):
+                count("match_cache_hits")
+                winner = None if decision[0] is None else self.names_by_key[decision[0]]
+            else:
+                count("match_cache_misses")
+                winner, decision = self._match(term)
+            self._winners[term] = winner
+            self.decisions[term] = decision
+        return self._winners[term]
+
+    def _still_holds(self, term, bookmark_key, score):
+        if bookmark_key is not None:
+            bookmark_name = self.names_by_key.get(bookmark_key)
+            if bookmark_name is None or bookmark_name in self._changed_names:
+                return False
+            position = self.positions[bookmark_name]
+        for name in self.changed:
+            changed_score = calculate_text_similarity(term, self.bookmark_to_text[name])
+            if bookmark_key is None:
+                if changed_score > self.threshold:
+                    return False
+            elif changed_score > score or (changed_score == score and self.positions[name] < position):
+                return False
+        return True
+
+    def _match(self, term):
+        if self._matcher is None:
+            self._matcher = BookmarkTextMatcher(self.bookmark_to_text, self.threshold)
+        bookmark_name = self._matcher.best_match(term)
+        if bookmark_name is None:
+            return None, [None, 0]
+        return bookmark_name, [self.keys[bookmark_name],
+                               calculate_text_similarity(term, self.bookmark_to_text[bookmark_name])]
+
+HYPERLINK_STYLE = "Hyperlink"
+
+def hyperlink_style(doc: Document) -> str:
+    """The style id of the document's Hyperlink character style, added (blue, underlined) if missing."""
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shared import RGBColor
     
-    final_score = min(1.0, base_score + acronym_boost + partial_boost)
-    return final_score
+    try:
+        style = doc.styles[HYPERLINK_STYLE]
+    except KeyError:
+        style = doc.styles.add_style(HYPERLINK_STYLE, WD_STYLE_TYPE.CHARACTER, builtin=True)
+        style.font.color.rgb = RGBColor(0x00, 0x00, 0xFF)
+        style.font.underline = True
+        style.priority = 99
+        style.unhide_when_used = True
+    return style.style_id
 
-def add_hyperlink_to_paragraph(paragraph, text, bookmark_name):
-    """Add a hyperlink to a bookmark within a paragraph."""
+def add_hyperlink_to_paragraph(paragraph, text, bookmark_name, style_id=HYPERLINK_STYLE):
+    """Add a hyperlink to a bookmark within a paragraph, formatted by the character style `style_id`
+    (see hyperlink_style) rather than by colour and underline on every link."""
     from docx.oxml.shared import qn
     from docx.oxml import OxmlElement
     
@@ -461,18 +808,11 @@ def add_hyperlink_to_paragraph(paragraph, text, bookmark_name):
     # Create run for the hyperlink text
     run = OxmlElement('w:r')
     
-    # Create run properties for hyperlink styling (blue, underlined)
+    # Run properties: just the shared hyperlink style
     rPr = OxmlElement('w:rPr')
-    
-    # Set color to blue
-    color = OxmlElement('w:color')
-    color.set(qn('w:val'), '0000FF')
-    rPr.append(color)
-    
-    # Set underline
-    underline = OxmlElement('w:u')
-    underline.set(qn('w:val'), 'single')
-    rPr.append(underline)
+    run_style = OxmlElement('w:rStyle')
+    run_style.set(qn('w:val'), style_id)
+    rPr.append(run_style)
     
     run.append(rPr)
     
@@ -486,9 +826,36 @@ def add_hyperlink_to_paragraph(paragraph, text, bookmark_name):
     # Add hyperlink to paragraph
     paragraph._p.append(hyperlink)
 
-def validate_index(doc: Document) -> None:
-    """Ensure all index entries are linked and have no page numbers."""
-    pass
+def validate_index(doc: Document, view: DocumentView = None, registry: BookmarkRegistry = None,
+                   index: list = None) -> None:
+    """Ensure no index entry has a page number and every index hyperlink targets an existing
+    bookmark (one of `registry`, by default the document's). Unlinked entries are reported.
+
+    The entries are those of `index` (see index_model.parse_index), by default parsed
+    from `view`; their paragraphs are checked as the index steps rewrote them."""
+    from validate_ebook import has_page_number
+    view = view or DocumentView(doc)
+    if registry is None:
+        registry = BookmarkRegistry.from_document(doc)
+    if index is None:
+        index = parse_index(view)
+    anchor_attribute = qn('w:anchor')
+    
+    unlinked = 0
+    for entry in index:
+        text = view.texts[entry.paragraph].strip()
+        if has_page_number(text):
+            raise ValueError(f"Index entry '{text}' still has a page number.")
+        anchors = [hyperlink.get(anchor_attribute)
+                   for hyperlink in view.paragraphs[entry.paragraph]._p.iter(qn('w:hyperlink'))]
+        anchors = [anchor for anchor in anchors if anchor is not None]
+        for anchor in anchors:
+            if anchor not in registry:
+                raise ValueError(f"Index entry '{text}' links to missing bookmark '{anchor}'.")
+        if not anchors and not is_group_header(entry):
+            unlinked += 1
+    if unlinked:
+        print(f"Warning: {unlinked} index entries are not linked")
 # --- End E-Book Creation Functions Scaffold ---
 
 
@@ -500,78 +867,226 @@ def load_docx(filename: str) -> Document:
     if "8x10" not in filename:
         raise ValueError("Filename must contain '8x10'")
     
-    doc = Document(filename)
+    doc = load_document(filename, EBOOK_XML_CONTENT_TYPES)
     return doc
 
 
+def ebook_filename(filename: str) -> str:
+    """The e-book file name for a print manuscript: '8x10' replaced by 'e-book', saved as .docx."""
+    base_name = os.path.splitext(filename)[0]
+    return base_name.replace("8x10", "e-book") + ".docx"
+
+
+def create_ebook(filename: str, stats: PipelineStats = None, incremental: bool = False,
+                 compact: bool = False, max_image_size: int = None, per_run_fonts: bool = False) -> dict:
+    """Run the whole e-book pipeline on `filename`; return a summary of the run.
+
+    With `stats`, each step is recorded as a stage of it (the caller activates it).
+    With `incremental`, the build cache next to the e-book is used and updated: an
+    unchanged manuscript is not rebuilt, changes to members the pipeline passes
+    through are patched into the existing e-book, and fuzzy-match decisions are
+    reused where the bookmark texts they depend on did not change. An e-book that
+    was written but could not be moved into place is moved by the next run. The
+    summary's "build" is "full", "up to date", "patched" or "resumed".
+    With `compact`, the story parts are compacted before saving (see docx_compact):
+    rsid attributes and proofing marks are dropped and text runs with the same
+    formatting are merged, for a smaller e-book that opens faster on e-readers.
+    With `max_image_size`, JPEG and PNG images are scaled down to at most that many
+    pixels on the longer side (see docx_media), reusing the images downsampled by
+    earlier builds from the '<e-book>.media' directory.
+    With `per_run_fonts`, Georgia is set on every run as well as every style
+    (set_font_georgia) instead of at style level (set_font_georgia_styles)."""
+    from contextlib import nullcontext
+    stage = stats.stage if stats else (lambda name: nullcontext())
+    new_filename = ebook_filename(filename)
+    options = {"compact": compact, "max_image_size": max_image_size, "per_run_fonts": per_run_fonts}
+    
+    cache = None
+    if incremental:
+        with stage("cache_check"):
+            cache = BuildCache.load(cache_filename(new_filename))
+            member_hashes = package_member_hashes(filename)
+            changed = cache.changed_members(member_hashes)
+        same_options = all(cache.summary.get(name) == value for name, value in options.items())
+        if changed is not None and same_options and cache.output_is_current(new_filename):
+            if not changed:
+                return dict(cache.summary, input=filename, output=new_filename, build="up to date")
+            if cache.can_patch(changed):
+                with stage("patch"):
+                    patch_ebook(filename, new_filename, changed)
+                    cache.record_patch(member_hashes, new_filename)
+                    cache.save()
+                return dict(cache.summary, input=filename, output=new_filename, build="patched",
+                            patched_members=changed)
+        elif changed == [] and same_options and cache.pending_is_current(pending_filename(new_filename)):
+            # The last build of this manuscript wrote the e-book but failed to move it into place
+            with stage("resume"):
+                os.replace(pending_filename(new_filename), new_filename)
+                cache.record_output(new_filename)
+                cache.save()
+            return dict(cache.summary, input=filename, output=new_filename, build="resumed")
+    
+    # Step 1: Load and validate the document
+    with stage("load"):
+        doc = load_docx(filename)
+    
+    # Step 2: Set font to Georgia (style level, runs inherit it; or on every run)
+    with stage("set_font"):
+        if per_run_fonts:
+            set_font_georgia(doc)
+        else:
+            set_font_georgia_styles(doc)
+    
+    # Paragraph array, texts and section map shared by the remaining steps
+    view = DocumentView(doc)
+    
+    # Step 3: Adjust title page
+    with stage("adjust_title_page"):
+        adjust_title_page(doc, view)
+    
+    # Step 4: Adjust copyright page  
+    with stage("adjust_copyright_page"):
+        adjust_copyright_page(doc, view)
+    
+    # Step 5: Convert index to static text
+    with stage("static_index"):
+        convert_index_to_static_text(doc, view)
+    
+    # Step 6: Parse the index once for the index steps, and check its entries for single page numbers
+    with stage("parse_index"):
+        index = parse_index(view)
+    with stage("check_index"):
+        check_index_entries_single_page_number(doc, view, index)
+    
+    # Step 7: Convert XE tags to bookmarks and link the index, all on the loaded document
+    # so the package is parsed once and written once
+    with stage("convert_xe"):
+        registry = BookmarkRegistry.from_document(doc)
+        bookmark_keys = {} if cache else None
+        index_term_to_bookmark, bookmark_to_text = convert_xe_tags_in_document(doc, registry, bookmark_keys)
+    with stage("link_index"):
+        matcher = None
+        if cache:
+            matcher = CachedBookmarkMatcher(bookmark_to_text, cache.bookmark_texts, cache.decisions_for(0.25),
+                                            threshold=0.25, bookmark_keys=bookmark_keys)
+            count("bookmarks_changed", len(matcher.changed))
+        link_index_entries_to_bookmarks(doc, index_term_to_bookmark, bookmark_to_text, view, matcher, registry,
+                                        index)
+    # Step 8: Check that no XE field is left and the index has no page numbers or broken links
+    with stage("validate"):
+        verify_no_xe_tags(doc)
+        validate_index(doc, view, registry, index)
+    # Step 9: Optionally compact the runs and scale the images down
+    if compact:
+        with stage("compact"):
+            count("runs_removed", compact_document(doc))
+    modified_partnames = ebook_modified_partnames(doc)
+    media = {}
+    if max_image_size:
+        with stage("media"):
+            media = optimize_images(doc, max_image_size, media_cache_dirname(new_filename))
+    
+    summary = {
+        "input": filename,
+        "output": new_filename,
+        "index_term_mappings": len(index_term_to_bookmark),
+        "bookmark_text_mappings": len(bookmark_to_text),
+        **options,
+    }
+    if cache:
+        # Checkpoint before writing the e-book, so a failed save keeps the match decisions
+        cache.record_build(member_hashes, matcher.keyed_texts(), matcher.decisions, 0.25, summary)
+        cache.save()
+    
+    # Step 10: Save final version, copying untouched parts (images, fonts, ...) raw from the input.
+    # An incremental build checkpoints the written e-book before moving it into place.
+    with stage("save"):
+        if not cache:
+            save_document(doc, filename, new_filename, modified_partnames, replacements=media)
+        else:
+            copied_members = save_document(doc, filename, pending_filename(new_filename), modified_partnames,
+                                           replacements=media)
+            cache.record_pending(pending_filename(new_filename), copied_members)
+            cache.save()
+            os.replace(pending_filename(new_filename), new_filename)
+            cache.record_output(new_filename)
+            cache.save()
+    return dict(summary, build="full")
+
+
+def patch_ebook(filename: str, new_filename: str, members: list) -> None:
+    """Copy `members` of the manuscript into the existing e-book, keeping everything else."""
+    from zipfile import ZipFile
+    with ZipFile(filename) as source:
+        replacements = {name: source.read(name) for name in members}
+    temp_filename = new_filename + ".tmp"
+    write_package(new_filename, temp_filename, replacements)
+    os.replace(temp_filename, new_filename)
+
+
+def build_ebook(filename: str, incremental: bool = False, compact: bool = False, max_image_size: int = None,
+                epub: bool = False, stats: bool = False, per_run_fonts: bool = False) -> dict:
+    """create_ebook with the extra outputs of the command line; return the run's summary.
+
+    With `epub`, the EPUB is also written (see epub_export.py) and its summary is
+    added as "epub". With `stats`, the run is recorded in a JSON report next to the
+    e-book, named in the summary as "stats" with its "total_wall_seconds"."""
+    from contextlib import nullcontext
+    
+    pipeline_stats = PipelineStats() if stats else None
+    with pipeline_stats or nullcontext():
+        summary = create_ebook(filename, pipeline_stats, incremental=incremental, compact=compact,
+                               max_image_size=max_image_size, per_run_fonts=per_run_fonts)
+        if epub:
+            from epub_export import export_epub
+            with pipeline_stats.stage("epub") if pipeline_stats else nullcontext():
+                summary["epub"] = export_epub(summary["output"])
+    
+    if pipeline_stats:
+        stats_filename = os.path.splitext(summary["output"])[0] + ".stats.json"
+        pipeline_stats.write_json(stats_filename, input=filename, output=summary["output"])
+        summary["stats"] = stats_filename
+        summary["total_wall_seconds"] = pipeline_stats.report()["total_wall_seconds"]
+    return summary
+
+
+def format_ebook_summary(summary: dict) -> list:
+    """The lines the command line prints for a build_ebook summary."""
+    new_filename = summary["output"]
+    if summary["build"] == "up to date":
+        lines = [f"E-book is up to date: {new_filename}"]
+    elif summary["build"] == "patched":
+        lines = [f"Copied {len(summary['patched_members'])} changed parts (images, fonts, ...) into: {new_filename}"]
+    elif summary["build"] == "resumed":
+        lines = [f"Moved the e-book written by the previous run into place: {new_filename}"]
+    else:
+        lines = [f"Cloned document saved as: {new_filename}",
+                 f"Created {summary['index_term_mappings']} exact index term mappings",
+                 f"Created {summary['bookmark_text_mappings']} bookmark text mappings for fuzzy matching"]
+    if "epub" in summary:
+        lines.append(f"EPUB saved as: {summary['epub']['output']} ({summary['epub']['chapters']} chapters)")
+    if "stats" in summary:
+        lines.append(f"Pipeline stats saved as: {summary['stats']}")
+    return lines
+
+
 def main():
     """Main function to process the document."""
-    import sys
-    import os
-    import tempfile
-    from docx.shared import Pt
-    
-    if len(sys.argv) != 2:
-        print("Usage: python create_ebook_from_print.py <input_filename>")
-        sys.exit(1)
+    import argparse
+    from book import add_ebook_arguments
     
-    filename = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Create the e-book version of a print (8x10) .docx book.")
+    add_ebook_arguments(parser)
+    args = parser.parse_args()
     
     try:
-        # Step 1: Load and validate the document
-        doc = load_docx(filename)
-        
-        # Step 2: Set font to Georgia
-        set_font_georgia(doc)
-        
-        # Step 3: Adjust title page
-        adjust_title_page(doc)
-        
-        # Step 4: Adjust copyright page  
-        adjust_copyright_page(doc)
-        
-        # Step 5: Convert index to static text
-        convert_index_to_static_text(doc)
-        
-        # Step 6: Check index entries for single page numbers
-        check_index_entries_single_page_number(doc)
-        
-        # Step 7: Create new filename for e-book version
-        base_name = os.path.splitext(filename)[0]
-        new_filename = base_name.replace("8x10", "e-book") + ".docx"
-        
-        # Save the document before XE tag conversion
-        doc.save(new_filename)
-        
-        # Step 8: Convert XE tags to bookmarks (requires file manipulation)
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-            temp_filename = temp_file.name
-        
-        try:
-            index_term_to_bookmark, bookmark_to_text = convert_xe_tags_to_bookmarks(new_filename, temp_filename)
-            
-            # Load the modified document and create hyperlinks
-            doc_with_bookmarks = Document(temp_filename)
-            link_index_entries_to_bookmarks(doc_with_bookmarks, index_term_to_bookmark, bookmark_to_text)
-            
-            # Save final version
-            doc_with_bookmarks.save(new_filename)
-            
-            print(f"Cloned document saved as: {new_filename}")
-            print(f"Created {len(index_term_to_bookmark)} exact index term mappings")
-            print(f"Created {len(bookmark_to_text)} bookmark text mappings for fuzzy matching")
-            
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_filename)
-            except:
-                pass
-        
+        summary = build_ebook(args.input_filename, incremental=args.incremental, compact=args.compact,
+                              max_image_size=args.max_image_size, epub=args.epub, stats=args.stats,
+                              per_run_fonts=args.per_run_fonts)
+        print("\n".join(format_ebook_summary(summary)))
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,113 @@
+"""
+Cached paragraph view of a python-docx Document, shared by the e-book steps.
+
+python-docx builds a fresh list of Paragraph proxies on every `doc.paragraphs`
+access and recomputes `paragraph.text` from the XML on every call. The view builds
+the paragraph array and the paragraph texts once, and derives a map of the book's
+sections (title page, copyright, index, back matter) from the cached texts.
+It is only rebuilt when paragraphs are removed through it.
+"""
+
+from collections import namedtuple
+
+from pipeline_stats import count
+
+# Headings that end the index and start the back matter
+BACK_MATTER_HEADINGS = ("ACKNOWLEDGEMENTS", "ABOUT THE AUTHOR")
+
+# Paragraph positions of the parts of the book the e-book steps work on; None when
+# a marker is missing. index_end is the first paragraph after the index entries
+# (the back matter heading, or the end of the document).
+SectionMap = namedtuple('SectionMap', [
+    'title_page_end', 'author', 'copyright', 'index_heading', 'index_end', 'back_matter',
+])
+
+TITLE_PAGE_PARAGRAPHS = 10  # The title is assumed to be in the first 10 paragraphs
+AUTHOR_MARKER = "Alan G Street"
+COPYRIGHT_MARKER = "Copyright © 2025"
+
+
+class DocumentView:
+    """Paragraph array, cached paragraph texts and section map for one Document."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._paragraphs = None
+        self._texts = None
+        self._sections = None
+
+    @property
+    def paragraphs(self):
+        """Body paragraphs, as `doc.paragraphs` returned them when the view was built."""
+        if self._paragraphs is None:
+            self._paragraphs = self.doc.paragraphs
+        return self._paragraphs
+
+    @property
+    def texts(self):
+        """Cached `paragraph.text` of every body paragraph."""
+        if self._texts is None:
+            self._texts = [paragraph.text for paragraph in self.paragraphs]
+            count("paragraph_texts", len(self._texts))
+        return self._texts
+
+    @property
+    def sections(self):
+        """SectionMap computed in one pass over the cached texts."""
+        if self._sections is None:
+            self._sections = self._build_sections()
+        return self._sections
+
+    def index_range(self):
+        """range() of the paragraphs between the INDEX heading and the back matter."""
+        sections = self.sections
+        if sections.index_heading is None:
+            raise ValueError("No index section found in the document.")
+        return range(sections.index_heading + 1, sections.index_end)
+
+    def refresh_text(self, i):
+        """Re-read the text of paragraph `i` after its content was rewritten in place.
+
+        Paragraph positions don't change, so the section map stays valid."""
+        text = self.paragraphs[i].text
+        if self._texts is not None:
+            self._texts[i] = text
+        return text
+
+    def remove_paragraph(self, i):
+        """Remove paragraph `i` from the document and from the cached arrays."""
+        element = self.paragraphs[i]._element
+        element.getparent().remove(element)
+        del self._paragraphs[i]
+        if self._texts is not None:
+            del self._texts[i]
+        self._sections = None
+
+    def invalidate(self):
+        """Forget everything; the next access rebuilds from the document."""
+        self._paragraphs = None
+        self._texts = None
+        self._sections = None
+
+    def _build_sections(self):
+        author = copyright_ = index_heading = back_matter = None
+        for i, text in enumerate(self.texts):
+            if author is None and AUTHOR_MARKER in text:
+                author = i
+            if copyright_ is None and COPYRIGHT_MARKER in text:
+                copyright_ = i
+            stripped = text.strip().upper()
+            if index_heading is None:
+                if stripped == "INDEX":
+                    index_heading = i
+            elif back_matter is None and stripped in BACK_MATTER_HEADINGS:
+                back_matter = i
+        index_end = back_matter if back_matter is not None else len(self.texts)
+        return SectionMap(
+            title_page_end=min(TITLE_PAGE_PARAGRAPHS, len(self.texts)),
+            author=author,
+            copyright=copyright_,
+            index_heading=index_heading,
+            index_end=index_end,
+            back_matter=back_matter,
+        )
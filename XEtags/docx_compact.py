@@ -0,0 +1,90 @@
+"""
+Run coalescing and XML compaction for e-book output.
+
+Word's editing history and the pipeline's own edits (fonts moved to styles,
+the index flattened to static text, XE field runs deleted) leave the story
+parts full of runs that differ only in revision ids, split a word across
+several runs, or hold no text at all. compact_story rewrites a story part in
+place so that:
+
+- rsid attributes (w:rsidR, w:rsidRPr, w:rsidP, ...) are dropped,
+- proofing marks (w:proofErr) and rendering hints (w:lastRenderedPageBreak)
+  are dropped,
+- runs without text are dropped, and
+- adjacent text runs with the same properties are merged into one.
+
+Only runs holding nothing but w:t are merged or dropped; runs with tabs, breaks,
+field characters, drawings, note references and so on are left as they are.
+"""
+
+from lxml import etree
+
+from docx_fields import W, R, T, RPR
+from docx_stories import story_parts
+
+PROOF_ERR = W + 'proofErr'
+LAST_RENDERED_PAGE_BREAK = W + 'lastRenderedPageBreak'
+RSID_PREFIX = W + 'rsid'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+def compact_document(doc):
+    """Compact the main story and the other story parts of a python-docx Document; return the runs removed."""
+    return sum(compact_story(root) for root in [doc.element] + [part.element for part in story_parts(doc)])
+
+
+def compact_story(root):
+    """Compact the XML tree of one story part in place; return the number of runs removed."""
+    for element in list(root.iter(PROOF_ERR, LAST_RENDERED_PAGE_BREAK)):
+        element.getparent().remove(element)
+    for element in root.iter():
+        rsids = [name for name in element.attrib if name.startswith(RSID_PREFIX)]
+        for name in rsids:
+            del element.attrib[name]
+
+    removed = 0
+    for parent in {run.getparent() for run in root.iter(R)}:
+        previous = previous_format = None  # last text run kept, and its properties
+        for child in list(parent):
+            texts = _text_elements(child) if child.tag == R else None
+            if texts is None:
+                previous = None
+                continue
+            if not any(t.text for t in texts):
+                parent.remove(child)  # the runs on either side become adjacent
+                removed += 1
+                continue
+            run_format = _format(child)
+            if previous is not None and run_format == previous_format:
+                _append_text(previous.find(T), ''.join(t.text or '' for t in texts))
+                parent.remove(child)
+                removed += 1
+                continue
+            for t in texts[1:]:
+                _append_text(texts[0], t.text or '')
+                child.remove(t)
+            previous, previous_format = child, run_format
+    return removed
+
+
+def _text_elements(run):
+    """The w:t children of a run that holds nothing else besides its properties, or None."""
+    texts = []
+    for child in run:
+        if child.tag == T:
+            texts.append(child)
+        elif child.tag != RPR:
+            return None
+    return texts
+
+
+def _format(run):
+    """What must match for two runs to be merged: their attributes and their properties."""
+    rpr = run.find(RPR)
+    return dict(run.attrib), None if rpr is None else etree.tostring(rpr)
+
+
+def _append_text(t, text):
+    t.text = (t.text or '') + text
+    if t.text != t.text.strip():
+        t.set(XML_SPACE, 'preserve')
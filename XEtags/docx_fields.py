@@ -0,0 +1,160 @@
+"""
+Complex field scanning for WordprocessingML paragraphs.
+
+A Word field is either a w:fldSimple element, or a complex field spread over any
+number of runs:
+
+    <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+    <w:r><w:instrText> XE "Artificial </w:instrText></w:r>
+    <w:r><w:instrText>Intelligence" </w:instrText></w:r>
+    <w:r><w:fldChar w:fldCharType="end"/></w:r>
+
+(with an optional "separate" marker before the field result). The scanner walks a
+paragraph's runs once and tracks fields with a begin/separate/end stack, so each
+field comes out complete - instruction joined across runs, and the exact elements
+that make it up - in time linear in the paragraph.
+"""
+
+import re
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W = '{%s}' % W_NS
+
+P = W + 'p'
+R = W + 'r'
+T = W + 't'
+PPR = W + 'pPr'
+RPR = W + 'rPr'
+FLD_CHAR = W + 'fldChar'
+FLD_SIMPLE = W + 'fldSimple'
+INSTR_TEXT = W + 'instrText'
+FLD_CHAR_TYPE = W + 'fldCharType'
+INSTR = W + 'instr'
+
+_XE_TERM_RE = re.compile(r'\s*XE\s+"([^"]*)"', re.IGNORECASE)
+
+
+class Field:
+    """One complete field found in a paragraph."""
+
+    __slots__ = ('instruction_parts', 'elements', 'anchor', 'start', 'end', 'separated')
+
+    def __init__(self, anchor, start):
+        self.instruction_parts = []
+        # Elements that belong to the field: fldChar/instrText/result children of its
+        # runs, or the w:fldSimple element itself
+        self.elements = []
+        # Element the field starts at (the run holding the begin marker, or the fldSimple)
+        self.anchor = anchor
+        # Positions of the first and last run of the field in the paragraph's run list
+        self.start = start
+        self.end = start
+        self.separated = False
+
+    @property
+    def instruction(self):
+        return ''.join(self.instruction_parts)
+
+    @property
+    def field_type(self):
+        """The field name, e.g. 'XE', 'INDEX', 'PAGE' (upper case), or '' if empty."""
+        words = self.instruction.split(None, 1)
+        return words[0].upper() if words else ''
+
+    def xe_term(self):
+        """The entry text of an XE field (`XE "Term"`), or None."""
+        match = _XE_TERM_RE.match(self.instruction)
+        return match.group(1) if match else None
+
+
+def iter_paragraph_content(paragraph):
+    """
+    Yield the runs and w:fldSimple elements of `paragraph` in document order.
+
+    Runs nested in hyperlinks, tracked changes, content controls and smart tags are
+    included; runs of paragraphs nested inside a run (textboxes) are not, since
+    those paragraphs are scanned on their own.
+    """
+    stack = [iter(paragraph)]
+    while stack:
+        for child in stack[-1]:
+            tag = child.tag
+            if tag == R or tag == FLD_SIMPLE:
+                yield child
+            elif tag != PPR and isinstance(tag, str):
+                stack.append(iter(child))
+                break
+        else:
+            stack.pop()
+
+
+def scan_paragraph_fields(paragraph):
+    """
+    Scan `paragraph` once; return (runs, fields).
+
+    `runs` lists the paragraph's runs in order; `fields` lists the complete fields,
+    inner fields before the fields that contain them. Field markers with no
+    matching begin (fields that started in an earlier paragraph) are ignored, as
+    are fields still open at the end of the paragraph.
+    """
+    runs = []
+    fields = []
+    open_fields = []
+    for node in iter_paragraph_content(paragraph):
+        if node.tag == FLD_SIMPLE:
+            field = Field(node, len(runs))
+            field.end = field.start - 1  # spans no runs of its own
+            field.instruction_parts.append(node.get(INSTR, ''))
+            field.elements.append(node)
+            if open_fields:
+                open_fields[-1].elements.append(node)
+            fields.append(field)
+            continue
+
+        position = len(runs)
+        runs.append(node)
+        for child in node:
+            tag = child.tag
+            if tag == FLD_CHAR:
+                kind = child.get(FLD_CHAR_TYPE)
+                if kind == 'begin':
+                    field = Field(node, position)
+                    field.elements.append(child)
+                    open_fields.append(field)
+                elif open_fields:
+                    field = open_fields[-1]
+                    field.elements.append(child)
+                    if kind == 'separate':
+                        field.separated = True
+                    elif kind == 'end':
+                        open_fields.pop()
+                        field.end = position
+                        fields.append(field)
+                        if open_fields:
+                            open_fields[-1].elements.extend(field.elements)
+            elif open_fields and tag != RPR:
+                field = open_fields[-1]
+                if tag == INSTR_TEXT and not field.separated:
+                    field.instruction_parts.append(child.text or '')
+                field.elements.append(child)
+    return runs, fields
+
+
+def run_text(run):
+    """Concatenated w:t text of a run."""
+    return ''.join(t.text or '' for t in run.iterchildren(T))
+
+
+def remove_field(field, runs):
+    """
+    Remove the elements of `field` from the tree, then drop the runs it spanned
+    that are left with nothing but run properties.
+    """
+    for element in field.elements:
+        parent = element.getparent()
+        if parent is not None:
+            parent.remove(element)
+    for run in runs[field.start:field.end + 1]:
+        parent = run.getparent()
+        if parent is not None and all(child.tag == RPR for child in run):
+            parent.remove(run)
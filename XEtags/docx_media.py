@@ -0,0 +1,141 @@
+"""
+Image downsampling for e-book output.
+
+The print manuscript carries print-resolution images, and they are most of the
+bytes of the e-book. optimize_images scales every JPEG and PNG in word/media of
+a loaded python-docx Document down so its longer side is at most `max_size`
+pixels and re-encodes it, across a process pool (image decoding and resampling
+hold the GIL). The document is not modified: the new images are returned as
+member replacements for docx_package.save_document to write. Word sizes
+pictures by their extent in the document XML, not by their pixel dimensions, so
+the layout does not change. An image is only replaced if the result is smaller,
+and it keeps its format, so part names and content types stay the same.
+
+Results are cached by content hash in a directory (by default next to the
+e-book, '<e-book>.media'), one file per source image and setting; an empty
+file records that an image could not be made smaller. Rebuilds only decode
+images that are new or changed.
+
+Needs Pillow (pip install Pillow) for the images that are not cached yet.
+"""
+
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline_stats import count
+
+JPEG_QUALITY = 85
+
+# Pictures in the document (not, e.g., the package thumbnail in docProps)
+MEDIA_PREFIX = '/word/media/'
+
+# Content types that can be re-encoded in the same format, and their cache file extensions
+OPTIMIZABLE_CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+}
+
+
+def media_cache_dirname(output_path):
+    """The image cache directory for the e-book at `output_path`."""
+    return os.path.splitext(output_path)[0] + ".media"
+
+
+def optimize_images(doc, max_size, cache_dir=None, max_workers=None):
+    """
+    Downsample the JPEG and PNG parts of the python-docx `doc` to at most `max_size`
+    pixels on the longer side, caching results in `cache_dir` if given.
+
+    Returns a dict of package member name -> downsampled image for the parts that
+    got smaller, to pass to save_document as `replacements`.
+    """
+    parts = [(part, _cache_key(part.blob, max_size, part.content_type)) for part in doc.part.package.parts
+             if part.partname.startswith(MEDIA_PREFIX) and part.content_type in OPTIMIZABLE_CONTENT_TYPES]
+    results = {}  # cache key -> optimized bytes, or b'' to keep the original
+    pending = {}  # cache key -> (blob, content type) to downsample
+    for part, key in parts:
+        if key in results or key in pending:
+            continue
+        cached = _read_cached(cache_dir, key)
+        if cached is not None:
+            results[key] = cached
+            count("images_cached")
+        else:
+            pending[key] = (part.blob, part.content_type)
+
+    if pending:
+        _require_pillow()
+        keys = list(pending)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            optimized = pool.map(downsample_image, (pending[key][0] for key in keys),
+                                 (pending[key][1] for key in keys), [max_size] * len(keys))
+            for key, data in zip(keys, optimized):
+                results[key] = data or b''
+                _write_cached(cache_dir, key, results[key])
+        count("images_downsampled", len(keys))
+
+    replacements = {}
+    for part, key in parts:
+        data = results[key]
+        if data:
+            count("image_bytes_saved", len(part.blob) - len(data))
+            replacements[part.partname.membername] = data
+    return replacements
+
+
+def downsample_image(blob, content_type, max_size):
+    """
+    The image `blob` scaled down to at most `max_size` pixels on the longer side and
+    re-encoded in its own format, or None if that doesn't make it smaller.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(blob)) as image:
+        image.load()
+        info = image.info
+        if max(image.size) > max_size:
+            image.thumbnail((max_size, max_size), Image.LANCZOS)
+        output = io.BytesIO()
+        options = {'icc_profile': info['icc_profile']} if info.get('icc_profile') else {}
+        if content_type == 'image/jpeg':
+            image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, **options)
+        else:
+            image.save(output, 'PNG', optimize=True, **options)
+    data = output.getvalue()
+    return data if len(data) < len(blob) else None
+
+
+def _require_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise ImportError("Image optimization needs Pillow. Please install it with: pip install Pillow")
+
+
+def _cache_key(blob, max_size, content_type):
+    """The cache file name for `blob` downsampled to `max_size`."""
+    digest = hashlib.sha256(blob).hexdigest()
+    return f"{digest}-{max_size}px-q{JPEG_QUALITY}{OPTIMIZABLE_CONTENT_TYPES[content_type]}"
+
+
+def _read_cached(cache_dir, key):
+    if cache_dir is None:
+        return None
+    try:
+        with open(os.path.join(cache_dir, key), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cached(cache_dir, key, data):
+    """Store a result atomically, so an interrupted build never leaves a truncated image behind."""
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key)
+    with open(path + ".tmp", 'wb') as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
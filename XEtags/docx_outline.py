@@ -0,0 +1,60 @@
+"""
+Outline levels of WordprocessingML paragraphs.
+
+A paragraph is a heading when it has an outline level below 9 (level 0 is a
+top-level heading; 9 is body text). The level is set on the paragraph itself
+(w:pPr/w:outlineLvl) or comes from its paragraph style, possibly through a
+chain of w:basedOn styles, so the styles are resolved once into a map.
+
+This module imports no other module of this directory, so link_citations.py can
+load it from its file.
+"""
+
+W = '{%s}' % 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+PPR = W + 'pPr'
+STYLE = W + 'style'
+VAL = W + 'val'
+OUTLINE_LVL = W + 'outlineLvl'
+BODY_TEXT_LEVEL = 9  # outlineLvl 9 is body text, not a heading
+
+
+def style_outline_levels(styles):
+    """{paragraph style id: outline level} for the styles that are headings, following basedOn.
+
+    `styles` is the root element of word/styles.xml."""
+    own, based_on = {}, {}
+    for style in styles.iterchildren(STYLE):
+        if style.get(W + 'type') != 'paragraph':
+            continue
+        style_id = style.get(W + 'styleId')
+        level = style.find(f'{PPR}/{OUTLINE_LVL}')
+        if level is not None:
+            own[style_id] = int(level.get(VAL, BODY_TEXT_LEVEL))
+        parent = style.find(W + 'basedOn')
+        if parent is not None:
+            based_on[style_id] = parent.get(VAL)
+
+    levels = {}
+    for style_id in set(own) | set(based_on):
+        seen = set()
+        current = style_id
+        while current is not None and current not in own and current not in seen:
+            seen.add(current)
+            current = based_on.get(current)
+        level = own.get(current)
+        if level is not None and level < BODY_TEXT_LEVEL:
+            levels[style_id] = level
+    return levels
+
+
+def outline_level(p, style_levels):
+    """The outline level of paragraph element `p` (0 for top-level headings), or None for body text."""
+    ppr = p.find(PPR)
+    if ppr is None:
+        return None
+    level = ppr.find(OUTLINE_LVL)
+    if level is not None:
+        value = int(level.get(VAL, BODY_TEXT_LEVEL))
+        return value if value < BODY_TEXT_LEVEL else None
+    style = ppr.find(W + 'pStyle')
+    return None if style is None else style_levels.get(style.get(VAL))
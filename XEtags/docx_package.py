@@ -0,0 +1,188 @@
+"""
+Package writer for .docx files.
+
+Saving through python-docx (or extracting to a directory and zipping it back up)
+re-deflates every member of the package, including images and fonts that were
+never touched. The writer here copies the already-compressed bytes of unchanged
+members straight from the input archive and only recompresses the parts that
+were actually modified, using a thread pool (zlib releases the GIL).
+
+zipfile has no public API for reading or writing a member's compressed bytes, so
+the raw copy relies on its internals: the local header layout and the writer's
+central directory bookkeeping (filelist, NameToInfo, start_dir). They are used
+only on the Python versions this was checked on (RAW_COPY); elsewhere every
+member goes through ZipFile.writestr, which recompresses it but writes the same
+member contents.
+"""
+
+import os
+import struct
+import sys
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Raw member copies: only where zipfile's internals are known to match
+RAW_COPY = ((3, 8) <= sys.version_info[:2] <= (3, 13)
+            and all(hasattr(zipfile, name) for name in
+                    ('structFileHeader', '_FH_FILENAME_LENGTH', '_FH_EXTRA_FIELD_LENGTH')))
+
+# Fixed-size part of a zip local file header
+_LOCAL_HEADER = struct.Struct(zipfile.structFileHeader) if RAW_COPY else None
+
+
+def compress_member(data, level=6):
+    """Deflate `data` as a raw zip member; returns (compressed_bytes, crc32)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(), zlib.crc32(data)
+
+
+def read_raw_member(src_zip, info):
+    """Return the still-compressed bytes of member `info` in the open ZipFile `src_zip` (RAW_COPY only)."""
+    fp = src_zip.fp
+    fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+    name_length = header[zipfile._FH_FILENAME_LENGTH]
+    extra_length = header[zipfile._FH_EXTRA_FIELD_LENGTH]
+    fp.seek(name_length + extra_length, 1)
+    return fp.read(info.compress_size)
+
+
+def _member_info(name, compress_type, date_time=None):
+    zinfo = zipfile.ZipInfo(name, date_time or (1980, 1, 1, 0, 0, 0))
+    zinfo.compress_type = compress_type
+    zinfo.external_attr = 0o600 << 16
+    return zinfo
+
+
+def _write_compressed(out_zip, name, payload, crc, file_size, compress_type, date_time=None):
+    """Append an already compressed member to the ZipFile `out_zip` opened for writing (RAW_COPY only)."""
+    zinfo = _member_info(name, compress_type, date_time)
+    zinfo.CRC = crc
+    zinfo.compress_size = len(payload)
+    zinfo.file_size = file_size
+    zinfo.header_offset = out_zip.fp.tell()
+    out_zip.fp.write(zinfo.FileHeader())
+    out_zip.fp.write(payload)
+    out_zip.filelist.append(zinfo)
+    out_zip.NameToInfo[name] = zinfo
+    out_zip.start_dir = out_zip.fp.tell()
+
+
+def _copy_raw(out_zip, src_zip, info):
+    """Copy member `info` from `src_zip` to `out_zip`, without decompressing it where RAW_COPY allows."""
+    if not RAW_COPY:
+        out_zip.writestr(_member_info(info.filename, info.compress_type, info.date_time), src_zip.read(info))
+        return
+    _write_compressed(out_zip, info.filename, read_raw_member(src_zip, info), info.CRC,
+                      info.file_size, info.compress_type, info.date_time)
+
+
+def _write_streamed(out_zip, src_zip, name, write):
+    """Append member `name` to `out_zip`, deflating what `write(stream)` writes to it."""
+    zinfo = _member_info(name, zipfile.ZIP_DEFLATED)
+    try:
+        # Size hint for the zip64 decision: the rewritten member is about as large as the original
+        zinfo.file_size = src_zip.getinfo(name).file_size
+    except KeyError:
+        pass
+    with out_zip.open(zinfo, 'w') as stream:
+        write(stream)
+
+
+def write_members(source_path, output_path, members, max_workers=None):
+    """
+    Write `output_path` from an ordered list of (name, data) pairs.
+
+    `data` of None means "copy this member unchanged from `source_path`"; the
+    compressed bytes are copied without inflating or deflating them. `data` may
+    also be a callable taking a binary file object: it streams the member into the
+    archive, deflated as it is written, so the member is never held whole. Every
+    other member is deflated, in parallel across a thread pool (without RAW_COPY,
+    by ZipFile.writestr as it is written).
+    """
+    if os.path.abspath(source_path) == os.path.abspath(output_path):
+        raise ValueError("Output path must differ from the source package path")
+    changed = [(name, data) for name, data in members if data is not None and not callable(data)]
+    compressed = {}
+    if RAW_COPY:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            compressed = dict(zip((name for name, _ in changed),
+                                  pool.map(compress_member, (data for _, data in changed))))
+
+    with zipfile.ZipFile(source_path, 'r') as src_zip, \
+            zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+        for name, data in members:
+            if data is None:
+                _copy_raw(out_zip, src_zip, src_zip.getinfo(name))
+            elif callable(data):
+                _write_streamed(out_zip, src_zip, name, data)
+            elif RAW_COPY:
+                payload, crc = compressed[name]
+                _write_compressed(out_zip, name, payload, crc, len(data), zipfile.ZIP_DEFLATED)
+            else:
+                out_zip.writestr(_member_info(name, zipfile.ZIP_DEFLATED), data)
+
+
+def write_package(source_path, output_path, replacements, max_workers=None):
+    """
+    Copy the package at `source_path` to `output_path`, replacing the members in
+    `replacements` (a dict of member name -> bytes, or a callable streaming the
+    member as in write_members). Members not named there are copied raw; new
+    names are appended at the end.
+    """
+    with zipfile.ZipFile(source_path, 'r') as src_zip:
+        names = src_zip.namelist()
+    members = [(name, replacements.get(name)) for name in names]
+    existing = set(names)
+    members += [(name, data) for name, data in replacements.items() if name not in existing]
+    write_members(source_path, output_path, members, max_workers)
+
+
+def save_document(doc, source_path, output_path, dirty_partnames=None, max_workers=None, replacements=None):
+    """
+    Save the python-docx `doc` loaded from `source_path` to `output_path`.
+
+    Parts whose partname is in `dirty_partnames` are serialized and recompressed;
+    every other part that exists in the source package is copied raw. When
+    `dirty_partnames` is None every XML part is treated as modified and only
+    binary parts (images, fonts, embeddings) are copied raw. Relationship items
+    and [Content_Types].xml are always regenerated; they are tiny. `replacements`
+    (member name -> bytes) are written instead of those parts' own contents, e.g.
+    downsampled images.
+
+    Returns the names of the members copied raw, i.e. passed through unchanged.
+    """
+    from docx.opc.part import XmlPart
+    from docx.opc.pkgwriter import _ContentTypesItem
+    from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+
+    package = doc.part.package
+    parts = list(package.parts)
+    for part in parts:
+        part.before_marshal()
+
+    with zipfile.ZipFile(source_path, 'r') as src_zip:
+        source_names = set(src_zip.namelist())
+
+    members = [
+        (CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob),
+        (PACKAGE_URI.rels_uri.membername, package.rels.xml),
+    ]
+    for part in parts:
+        name = part.partname.membername
+        if dirty_partnames is None:
+            dirty = isinstance(part, XmlPart)
+        else:
+            dirty = part.partname in dirty_partnames
+        if replacements and name in replacements:
+            members.append((name, replacements[name]))
+        elif not dirty and name in source_names:
+            members.append((name, None))
+        else:
+            members.append((name, part.blob))
+        if len(part.rels):
+            members.append((part.partname.rels_uri.membername, part.rels.xml))
+
+    write_members(source_path, output_path, members, max_workers)
+    return [name for name, data in members if data is None]
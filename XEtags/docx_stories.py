@@ -0,0 +1,66 @@
+"""
+Story parts of a .docx package.
+
+Book text lives in word/document.xml and in the header, footer, footnotes,
+endnotes and comments parts. python-docx parses headers, footers and comments,
+but loads footnotes and endnotes as opaque blobs. load_document loads a document
+with them parsed as XML parts, so their trees can be edited and are serialized
+when the document is saved; python-docx's part loading is changed only while
+that document is read.
+
+This module imports no other module of this directory, so link_citations.py can
+load it from its file.
+"""
+
+from contextlib import contextmanager
+
+from docx import Document
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.part import PartFactory, XmlPart
+
+DOCUMENT_MEMBER = 'word/document.xml'
+
+# Package members besides the main document that hold paragraphs
+STORY_MEMBER_PREFIXES = ('word/header', 'word/footer', 'word/footnotes', 'word/endnotes', 'word/comments')
+
+# Story parts python-docx would otherwise load as blobs
+STORY_CONTENT_TYPES = (CT.WML_FOOTNOTES, CT.WML_ENDNOTES)
+
+
+@contextmanager
+def xml_parts(content_types):
+    """Have python-docx load the parts of `content_types` as XML parts while the block runs."""
+    added = [content_type for content_type in content_types if content_type not in PartFactory.part_type_for]
+    for content_type in added:
+        PartFactory.part_type_for[content_type] = XmlPart
+    try:
+        yield
+    finally:
+        for content_type in added:
+            del PartFactory.part_type_for[content_type]
+
+
+def load_document(path, content_types=()):
+    """python-docx Document of `path` with its footnotes and endnotes, and the parts of
+    the other `content_types`, loaded as XML parts."""
+    with xml_parts(STORY_CONTENT_TYPES + tuple(content_types)):
+        return Document(path)
+
+
+def is_story_member(name):
+    """True for the members of a package, other than word/document.xml, that hold paragraphs."""
+    return name.startswith(STORY_MEMBER_PREFIXES) and name.endswith('.xml')
+
+
+def story_members(names):
+    """The story members among the package member `names`, in processing order (sorted by name)."""
+    return sorted(name for name in names if is_story_member(name))
+
+
+def story_parts(doc):
+    """The parsed story parts of a python-docx Document other than its main part, sorted by member name.
+
+    Footnotes and endnotes are among them only if the document was loaded with load_document."""
+    parts = [part for part in doc.part.package.parts
+             if isinstance(part, XmlPart) and part is not doc.part and is_story_member(part.partname.membername)]
+    return sorted(parts, key=lambda part: part.partname.membername)
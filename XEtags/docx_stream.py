@@ -0,0 +1,206 @@
+"""
+Bounded-memory streaming rewrite of word/document.xml.
+
+Parsing document.xml into one lxml tree (and python-docx building its own on top)
+makes peak memory grow with the book. Here the part is read with iterparse and
+written back as it goes: the document and w:body start tags are written as soon
+as they are read, then each body-level block (paragraph, table, section
+properties) is handed to a transform function once it is complete, serialized,
+and cleared. Peak memory depends on the largest block, not on the book:
+
+    def remove_comments(block):
+        ...  # modify the block in place
+
+    stream_transform_docx("book.docx", "book-out.docx", remove_comments)
+
+The text between blocks is kept, and every namespace declaration stays on the
+document element, as when the whole tree is serialized at once.
+"""
+
+from xml.sax.saxutils import quoteattr
+
+from lxml import etree
+
+from docx_fields import W, P
+from docx_package import write_package
+
+BODY = W + 'body'
+TBL = W + 'tbl'
+
+XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+
+
+def stream_transform_docx(source_path, output_path, transform, member='word/document.xml', replacements=None):
+    """Copy the .docx at `source_path` to `output_path`, streaming `member` through
+    stream_transform with `transform`. Other members are replaced as given in
+    `replacements` (see write_package) or copied raw."""
+    import zipfile
+
+    def write_member(target):
+        with zipfile.ZipFile(source_path) as package, package.open(member) as source:
+            stream_transform(source, target, transform)
+
+    replacements = dict(replacements or {})
+    replacements[member] = write_member
+    write_package(source_path, output_path, replacements)
+
+
+def stream_transform(source, target, transform, buffer_size=1 << 20):
+    """
+    Copy the WordprocessingML document read from the binary file object `source`
+    to the binary file object `target`, calling `transform(block)` on each child
+    element of w:body before it is written. The transform may modify the block in
+    place (not its siblings), or return False to drop it. Other children of the
+    document element are copied unchanged. Output is written in chunks of about
+    `buffer_size` bytes.
+
+    Returns the number of body blocks transformed.
+    """
+    writer = _ChunkWriter(target, buffer_size)
+    writer.write(XML_DECLARATION)
+    root = body = None
+    root_end_tag = body_end_tag = None
+    body_declarations = ()
+    last_written = None  # last child of w:body written, kept until its tail is read
+    blocks = 0
+
+    # Only paragraph and table ends are reported; any other body child (section
+    # properties, content controls, ...) is written when the next one comes up
+    for event, element in etree.iterparse(source, events=('start', 'end'), tag=(BODY, P, TBL), huge_tree=True):
+        if element.tag == BODY and body is None:
+            if event == 'end' or element.getparent() is None:
+                continue  # not the document's body
+            body = element
+            root = body.getparent()
+            start_tag, root_end_tag = _tags(root, ())
+            writer.write(start_tag)
+            root_declarations = _declarations(root.nsmap)
+            for child in _children_before(root, body):
+                writer.write(_gap(root, child.getprevious()))
+                writer.write(_serialize(child, root_declarations))
+            writer.write(_gap(root, body.getprevious()))
+            start_tag, body_end_tag = _tags(body, root_declarations)
+            writer.write(start_tag)
+            body_declarations = _declarations(body.nsmap)
+            continue
+        if event == 'start':
+            continue
+        if element is body:
+            last = None  # everything up to the end of the body
+        elif element.getparent() is body:
+            last = element
+        else:
+            continue  # nested in a table or another block
+
+        child = body[0] if last_written is None else last_written.getnext()
+        while child is not None:
+            writer.write(_gap(body, last_written))
+            keep = True
+            if isinstance(child.tag, str):
+                keep = transform(child) is not False
+                blocks += 1
+            if keep:
+                writer.write(_serialize(child, body_declarations))
+            # Keep the emptied element until its tail (the text after it) has been read
+            child.clear(keep_tail=True)
+            if last_written is not None:
+                body.remove(last_written)
+            last_written = child
+            if child is last:
+                break
+            child = child.getnext()
+        if element is body:
+            writer.write(_gap(body, last_written))
+            writer.write(body_end_tag)
+
+    if root is None:
+        raise ValueError("The document has no w:body")
+    root_declarations = _declarations(root.nsmap)
+    previous = body
+    for child in _children_after(root, body):
+        writer.write(_gap(root, previous))
+        writer.write(_serialize(child, root_declarations))
+        previous = child
+    writer.write(_gap(root, previous))
+    writer.write(root_end_tag)
+    writer.flush()
+    return blocks
+
+
+class _ChunkWriter:
+    """Collects small byte strings and writes them to `target` in chunks of about `size` bytes."""
+
+    def __init__(self, target, size):
+        self.target = target
+        self.size = size
+        self.pending = []
+        self.pending_size = 0
+
+    def write(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+            if self.pending_size >= self.size:
+                self.flush()
+
+    def flush(self):
+        self.target.write(b''.join(self.pending))
+        self.pending = []
+        self.pending_size = 0
+
+
+def _children_before(parent, child):
+    result = []
+    for sibling in parent:
+        if sibling is child:
+            break
+        result.append(sibling)
+    return result
+
+
+def _children_after(parent, child):
+    sibling = child.getnext()
+    while sibling is not None:
+        yield sibling
+        sibling = sibling.getnext()
+
+
+def _serialize(element, declared):
+    """`element` without its tail, without the namespace declarations in `declared` on its start tag."""
+    data = etree.tostring(element, encoding='utf-8', xml_declaration=False, with_tail=False)
+    if not isinstance(element.tag, str):
+        return data  # comment or processing instruction
+    return _strip_declarations(data, declared)
+
+
+def _gap(container, previous_child):
+    """The text before a container's next child or end tag: the tail of the child before, or its own text."""
+    text = container.text if previous_child is None else previous_child.tail
+    if not text:
+        return b''
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').encode('utf-8')
+
+
+def _declarations(nsmap):
+    """The namespace declarations of `nsmap` as lxml writes them in a start tag."""
+    return tuple(
+        f' {"xmlns" if prefix is None else "xmlns:" + prefix}={quoteattr(uri)}'.encode('utf-8')
+        for prefix, uri in nsmap.items())
+
+
+def _tags(element, declared):
+    """(start tag, end tag) of `element` as bytes, without the namespace declarations in `declared`."""
+    shell = etree.Element(element.tag, dict(element.attrib), nsmap=element.nsmap)
+    shell.text = ''
+    data = etree.tostring(shell, encoding='utf-8', xml_declaration=False)
+    split = data.rindex(b'</')
+    return _strip_declarations(data[:split], declared), data[split:]
+
+
+def _strip_declarations(data, declared):
+    """Remove the namespace declarations in `declared` from the first start tag in `data`."""
+    end = data.index(b'>')
+    start_tag = data[:end]
+    for declaration in declared:
+        start_tag = start_tag.replace(declaration, b'', 1)
+    return start_tag + data[end:]
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+EPUB Export
+
+Writes an EPUB 3 book straight from a finished e-book .docx, without an
+external converter. The body is split into one XHTML file per chapter (a new
+file starts at every top-level heading, i.e. a paragraph with outline level 0),
+so e-readers only lay out one chapter at a time. Bookmarks become id anchors in
+the chapter that holds them, internal hyperlinks point at the chapter file of
+their bookmark, and the navigation document lists the chapters and the linked
+index entries, each going straight to its bookmark.
+
+word/document.xml is streamed from the .docx twice, block by block: once to
+find the chapters, bookmarks and index links, then again to write each chapter
+into the EPUB zip as it is read. Memory depends on the largest paragraph or
+table, not on the book. Images (PNG, JPEG, GIF, SVG) are copied over;
+footnotes, headers and footers are not exported.
+
+Usage:
+  python epub_export.py <e-book.docx> [--output <file.epub>]
+
+Example: python epub_export.py "../mybooks/superArchItelligence Vol1 e-book.docx"
+"""
+
+import argparse
+import os
+import posixpath
+import re
+import sys
+import uuid
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from lxml import etree
+
+from docx_fields import W, P, R, T, PPR, RPR, FLD_SIMPLE
+from docx_outline import outline_level, style_outline_levels
+from docx_stories import DOCUMENT_MEMBER
+from document_view import BACK_MATTER_HEADINGS
+
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+V_NS = 'urn:schemas-microsoft-com:vml'
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CORE_NS = {
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+}
+
+BODY = W + 'body'
+TBL = W + 'tbl'
+TR = W + 'tr'
+TC = W + 'tc'
+SDT = W + 'sdt'
+SDT_CONTENT = W + 'sdtContent'
+BOOKMARK_START = W + 'bookmarkStart'
+HYPERLINK = W + 'hyperlink'
+VAL = W + 'val'
+NAME = W + 'name'
+ANCHOR = W + 'anchor'
+
+# Inline containers whose runs are part of the text (insertions, content controls, ...)
+INLINE_CONTAINERS = {W + 'ins', W + 'smartTag', W + 'customXml', SDT, SDT_CONTENT, FLD_SIMPLE}
+
+PACKAGE_DIR = 'EPUB'
+STYLESHEET = 'style.css'
+NAV_DOCUMENT = 'nav.xhtml'
+
+IMAGE_MEDIA_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+}
+
+CSS = """body { font-family: Georgia, serif; }
+h1, h2, h3, h4, h5, h6 { page-break-after: avoid; }
+p.center { text-align: center; }
+p.right { text-align: right; }
+img { max-width: 100%; height: auto; }
+table { border-collapse: collapse; }
+td { vertical-align: top; padding: 0.2em 0.4em; }
+a { color: #0000FF; }
+"""
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="EPUB/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+_INVALID_ID_CHARS_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def epub_filename(docx_path):
+    """The EPUB file name for an e-book .docx."""
+    return os.path.splitext(docx_path)[0] + ".epub"
+
+
+def export_epub(docx_path, output_path=None):
+    """
+    Write the EPUB version of the e-book .docx at `docx_path` to `output_path`
+    (by default next to it, with an .epub extension).
+
+    Returns a summary dict: output, title, chapters, bookmarks, index_entries, images.
+    """
+    output_path = output_path or epub_filename(docx_path)
+    with zipfile.ZipFile(docx_path) as package:
+        names = set(package.namelist())
+        rels = _relationships(package, 'word/_rels/document.xml.rels')
+        outline_levels = {}
+        if 'word/styles.xml' in names:
+            outline_levels = style_outline_levels(etree.fromstring(package.read('word/styles.xml')))
+        metadata = _metadata(package, names, docx_path)
+        with package.open(DOCUMENT_MEMBER) as stream:
+            book = _scan(stream, outline_levels, metadata['title'])
+
+        writer = _XhtmlWriter(book, rels, outline_levels)
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as epub:
+            _write(epub, 'mimetype', 'application/epub+zip', zipfile.ZIP_STORED)  # first, uncompressed
+            _write(epub, 'META-INF/container.xml', CONTAINER_XML)
+            _write(epub, f'{PACKAGE_DIR}/{STYLESHEET}', CSS)
+            with package.open(DOCUMENT_MEMBER) as stream:
+                _write_chapters(epub, stream, book, writer, metadata['language'])
+            images = []
+            for target, path in sorted(writer.images.items()):
+                member = posixpath.normpath(posixpath.join('word', target))
+                if member in names:
+                    _write(epub, f'{PACKAGE_DIR}/{path}', package.read(member), zipfile.ZIP_STORED)
+                    images.append(path)
+            _write(epub, f'{PACKAGE_DIR}/{NAV_DOCUMENT}', _nav_document(book, metadata))
+            _write(epub, f'{PACKAGE_DIR}/content.opf', _package_document(book, images, metadata))
+
+    return {
+        'output': output_path,
+        'title': metadata['title'],
+        'chapters': len(book.chapters),
+        'bookmarks': len(book.bookmark_files),
+        'index_entries': len(book.index_entries),
+        'images': len(images),
+    }
+
+
+def fragment_id(bookmark_name):
+    """The XHTML id for a bookmark name (ids must be XML names)."""
+    fragment = _INVALID_ID_CHARS_RE.sub('_', bookmark_name)
+    return fragment if fragment[:1].isalpha() or fragment[:1] == '_' else '_' + fragment
+
+
+class _Book:
+    """What the first pass learns about the book: chapter files and titles, where each
+    bookmark lands, and the index entries with the bookmark each one links to."""
+
+    def __init__(self):
+        self.chapters = []  # [file name, title]
+        self.chapter_starts = {}  # body block number -> chapter number
+        self.bookmark_files = {}  # bookmark name -> chapter file
+        self.linked_anchors = set()
+        self.index_entries = []  # (text, anchor)
+
+
+def _body_blocks(stream):
+    """Yield the children of w:body read from `stream` one at a time, freeing each one after use."""
+    for _, element in etree.iterparse(stream, tag=(P, TBL, SDT, BOOKMARK_START), huge_tree=True):
+        parent = element.getparent()
+        if parent is None or parent.tag != BODY:
+            continue  # nested in a block; handled with it
+        yield element
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _scan(stream, outline_levels, title):
+    """First pass over document.xml: split it into chapters and collect bookmarks and index links."""
+    book = _Book()
+    in_index = False
+    for number, block in enumerate(_body_blocks(stream)):
+        text = _text(block)
+        if not book.chapters or (block.tag == P and outline_level(block, outline_levels) == 0 and text.strip()):
+            book.chapter_starts[number] = len(book.chapters)
+            book.chapters.append([f'chapter-{len(book.chapters) + 1:03d}.xhtml',
+                                  text.strip() if block.tag == P and text.strip() else title])
+        chapter_file = book.chapters[-1][0]
+        for bookmark in block.iter(BOOKMARK_START):
+            name = bookmark.get(NAME)
+            if name:
+                book.bookmark_files[name] = chapter_file
+        for hyperlink in block.iter(HYPERLINK):
+            anchor = hyperlink.get(ANCHOR)
+            if anchor is None:
+                continue
+            book.linked_anchors.add(anchor)
+            if in_index:
+                book.index_entries.append((_text(hyperlink).strip(), anchor))
+
+        heading = text.strip().upper()
+        if block.tag != P:
+            continue
+        if not in_index:
+            in_index = heading == "INDEX"
+        elif heading in BACK_MATTER_HEADINGS:
+            in_index = False
+    return book
+
+
+def _write_chapters(epub, stream, book, writer, language):
+    """Second pass over document.xml: write each chapter's XHTML into `epub` as its blocks are read."""
+    chapter = None
+    for number, block in enumerate(_body_blocks(stream)):
+        if number in book.chapter_starts:
+            if chapter is not None:
+                chapter.write(b'</body>\n</html>\n')
+                chapter.close()
+            file_name, title = book.chapters[book.chapter_starts[number]]
+            chapter = epub.open(_zip_info(f'{PACKAGE_DIR}/{file_name}'), 'w')
+            chapter.write(_xhtml_head(title, language).encode('utf-8'))
+        chapter.write(writer.block(block).encode('utf-8'))
+    if chapter is not None:
+        chapter.write(b'</body>\n</html>\n')
+        chapter.close()
+
+
+class _XhtmlWriter:
+    """Renders body blocks as XHTML. Collects the images they use (docx target -> EPUB path)."""
+
+    def __init__(self, book, rels, outline_levels):
+        self.book = book
+        self.rels = rels
+        self.outline_levels = outline_levels
+        self.images = {}
+
+    def block(self, element):
+        if element.tag == P:
+            return self.paragraph(element)
+        if element.tag == TBL:
+            return self.table(element)
+        if element.tag == SDT:
+            content = element.find(SDT_CONTENT)
+            return '' if content is None else ''.join(self.block(child) for child in content)
+        if element.tag == BOOKMARK_START:
+            return self.bookmark(element)
+        return ''
+
+    def paragraph(self, p):
+        level = outline_level(p, self.outline_levels)
+        content = self.inline(p)
+        if level is not None and level < 6:
+            return f'<h{level + 1}>{content}</h{level + 1}>\n'
+        alignment = p.find(f'{PPR}/{W}jc')
+        css_class = ''
+        if alignment is not None and alignment.get(VAL) in ('center', 'right'):
+            css_class = f' class="{alignment.get(VAL)}"'
+        return f'<p{css_class}>{content or "&#160;"}</p>\n'
+
+    def table(self, tbl):
+        rows = []
+        for tr in tbl.iterchildren(TR):
+            cells = []
+            for tc in tr.iterchildren(TC):
+                cells.append('<td>' + ''.join(self.block(child) for child in tc
+                                              if child.tag in (P, TBL, SDT)) + '</td>')
+            rows.append('<tr>' + ''.join(cells) + '</tr>')
+        return '<table>\n' + '\n'.join(rows) + '\n</table>\n'
+
+    def bookmark(self, element):
+        name = element.get(NAME)
+        if not name or (name.startswith('_') and name not in self.book.linked_anchors):
+            return ''  # hidden bookmark (_GoBack, _Toc...) that nothing links to
+        return f'<span id={quoteattr(fragment_id(name))}></span>'
+
+    def inline(self, parent):
+        parts = []
+        for child in parent:
+            tag = child.tag
+            if tag == R:
+                parts.append(self.run(child))
+            elif tag == HYPERLINK:
+                parts.append(self.hyperlink(child))
+            elif tag == BOOKMARK_START:
+                parts.append(self.bookmark(child))
+            elif tag in INLINE_CONTAINERS:
+                parts.append(self.inline(child))
+        return ''.join(parts)
+
+    def hyperlink(self, element):
+        content = self.inline(element)
+        anchor = element.get(ANCHOR)
+        rel_id = element.get(f'{{{R_NS}}}id')
+        if anchor is not None:
+            file_name = self.book.bookmark_files.get(anchor)
+            if file_name is None:
+                return content  # the bookmark is gone; keep the text
+            href = f'{file_name}#{fragment_id(anchor)}'
+        elif rel_id in self.rels and self.rels[rel_id][1]:
+            href = self.rels[rel_id][0]
+        else:
+            return content
+        return f'<a href={quoteattr(href)}>{content}</a>'
+
+    def run(self, r):
+        parts = []
+        for child in r:
+            tag = child.tag
+            if tag == T:
+                parts.append(escape(child.text or ''))
+            elif tag == W + 'tab':
+                parts.append(' ')
+            elif tag in (W + 'br', W + 'cr') and child.get(W + 'type') in (None, 'textWrapping'):
+                parts.append('<br/>')
+            elif tag == W + 'noBreakHyphen':
+                parts.append('\u2011')
+            elif tag in (W + 'drawing', W + 'pict'):
+                parts.append(self.image(child))
+        content = ''.join(parts)
+        rpr = r.find(RPR)
+        if not content or rpr is None:
+            return content
+        for tag, html in ((W + 'u', 'u'), (W + 'i', 'i'), (W + 'b', 'b')):
+            flag = rpr.find(tag)
+            if flag is not None and flag.get(VAL) not in ('0', 'false', 'none'):
+                content = f'<{html}>{content}</{html}>'
+        vertical = rpr.find(W + 'vertAlign')
+        if vertical is not None and vertical.get(VAL) in ('superscript', 'subscript'):
+            html = 'sup' if vertical.get(VAL) == 'superscript' else 'sub'
+            content = f'<{html}>{content}</{html}>'
+        return content
+
+    def image(self, element):
+        blip = next(element.iter(f'{{{A_NS}}}blip', f'{{{V_NS}}}imagedata'), None)
+        if blip is None:
+            return ''
+        rel_id = blip.get(f'{{{R_NS}}}embed') or blip.get(f'{{{R_NS}}}id')
+        target = self.rels.get(rel_id, (None, True))
+        if target[0] is None or target[1] or _media_type(target[0]) is None:
+            return ''  # external or not a format e-readers show (EMF, WMF, TIFF, ...)
+        path = self.images.setdefault(target[0], 'images/' + posixpath.basename(target[0]))
+        properties = next(element.iter(f'{{{WP_NS}}}docPr'), None)
+        alt = '' if properties is None else properties.get('descr') or properties.get('title') or ''
+        return f'<img src={quoteattr(path)} alt={quoteattr(alt)}/>'
+
+
+def _zip_info(name, compress_type=zipfile.ZIP_DEFLATED):
+    """A member with a fixed timestamp, so the same e-book always gives the same EPUB."""
+    info = zipfile.ZipInfo(name, (1980, 1, 1, 0, 0, 0))
+    info.compress_type = compress_type
+    info.external_attr = 0o600 << 16
+    return info
+
+
+def _write(epub, name, data, compress_type=zipfile.ZIP_DEFLATED):
+    epub.writestr(_zip_info(name, compress_type), data)
+
+
+def _text(element):
+    return ''.join(t.text or '' for t in element.iter(T))
+
+
+def _relationships(package, member):
+    """{relationship id: (target, is external)} of a .rels member; empty if it is missing."""
+    try:
+        root = etree.fromstring(package.read(member))
+    except KeyError:
+        return {}
+    return {rel.get('Id'): (rel.get('Target'), rel.get('TargetMode') == 'External')
+            for rel in root.iterchildren(f'{{{REL_NS}}}Relationship')}
+
+
+def _metadata(package, names, docx_path):
+    """Title, author, language, identifier and modification time from docProps/core.xml."""
+    values = {}
+    if 'docProps/core.xml' in names:
+        core = etree.fromstring(package.read('docProps/core.xml'))
+        for key, path in (('title', 'dc:title'), ('creator', 'dc:creator'),
+                          ('language', 'dc:language'), ('modified', 'dcterms:modified')):
+            element = core.find(path, CORE_NS)
+            if element is not None and element.text and element.text.strip():
+                values[key] = element.text.strip()
+    title = values.get('title') or os.path.splitext(os.path.basename(docx_path))[0]
+    modified = values.get('modified', '')[:19]
+    if not re.fullmatch(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d', modified):
+        modified = '2000-01-01T00:00:00'
+    return {
+        'title': title,
+        'creator': values.get('creator'),
+        'language': values.get('language', 'en'),
+        'identifier': f'urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, title)}',
+        'modified': modified + 'Z',
+    }
+
+
+def _media_type(path):
+    return IMAGE_MEDIA_TYPES.get(posixpath.splitext(path)[1].lower())
+
+
+def _xhtml_head(title, language):
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'lang={quoteattr(language)} xml:lang={quoteattr(language)}>\n'
+            f'<head>\n<meta charset="utf-8"/>\n<title>{escape(title)}</title>\n'
+            f'<link rel="stylesheet" type="text/css" href="{STYLESHEET}"/>\n</head>\n<body>\n')
+
+
+def _nav_document(book, metadata):
+    """The EPUB navigation document: the chapters (table of contents) and the linked index."""
+    lines = [_xhtml_head(metadata['title'], metadata['language']),
+             '<nav epub:type="toc" id="toc">\n<h1>Contents</h1>\n<ol>\n']
+    lines += [f'<li><a href={quoteattr(file_name)}>{escape(title)}</a></li>\n' for file_name, title in book.chapters]
+    lines.append('</ol>\n</nav>\n')
+    entries = [(text, anchor) for text, anchor in book.index_entries if anchor in book.bookmark_files]
+    if entries:
+        lines.append('<nav epub:type="index" id="index">\n<h1>Index</h1>\n<ol>\n')
+        lines += [f'<li><a href={quoteattr(book.bookmark_files[anchor] + "#" + fragment_id(anchor))}>'
+                  f'{escape(text or anchor)}</a></li>\n' for text, anchor in entries]
+        lines.append('</ol>\n</nav>\n')
+    lines.append('</body>\n</html>\n')
+    return ''.join(lines)
+
+
+def _package_document(book, images, metadata):
+    """content.opf: metadata, manifest and spine."""
+    creator = f'<dc:creator>{escape(metadata["creator"])}</dc:creator>\n' if metadata['creator'] else ''
+    items = [f'<item id="nav" href="{NAV_DOCUMENT}" media-type="application/xhtml+xml" properties="nav"/>',
+             f'<item id="css" href="{STYLESHEET}" media-type="text/css"/>']
+    items += [f'<item id="chapter-{i + 1}" href={quoteattr(file_name)} media-type="application/xhtml+xml"/>'
+              for i, (file_name, _) in enumerate(book.chapters)]
+    items += [f'<item id="image-{i + 1}" href={quoteattr(path)} media-type="{_media_type(path)}"/>'
+              for i, path in enumerate(images)]
+    spine = [f'<itemref idref="chapter-{i + 1}"/>' for i in range(len(book.chapters))]
+    return (f'<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+            f'<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="book-id">{metadata["identifier"]}</dc:identifier>\n'
+            f'<dc:title>{escape(metadata["title"])}</dc:title>\n{creator}'
+            f'<dc:language>{escape(metadata["language"])}</dc:language>\n'
+            f'<meta property="dcterms:modified">{metadata["modified"]}</meta>\n'
+            f'</metadata>\n<manifest>\n' + '\n'.join(items) + '\n</manifest>\n'
+            f'<spine>\n' + '\n'.join(spine) + '\n</spine>\n</package>\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a finished e-book .docx as an EPUB with one file per chapter.")
+    parser.add_argument("docx_file")
+    parser.add_argument("--output", help="EPUB file to write (default: next to the .docx)")
+    args = parser.parse_args()
+
+    try:
+        summary = export_epub(args.docx_file, args.output)
+    except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"EPUB saved as: {summary['output']}")
+    print(f"{summary['chapters']} chapters, {summary['index_entries']} linked index entries, {summary['images']} images")
+
+
+if __name__ == "__main__":
+    main()
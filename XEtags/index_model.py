@@ -0,0 +1,71 @@
+"""
+The book's index as data, parsed once and shared by the e-book's index steps.
+
+After the index field is converted to static text (convert_index_to_static_text),
+each non-empty paragraph between the INDEX heading and the back matter is one of
+
+  A                         a letter-group header
+  Term, 12                  a term and its page
+  Term, Subterm, 12         a subterm path under a term
+
+parse_index reads those paragraphs once into IndexEntry records. The page check,
+the linking of terms to bookmarks and the validation of the linked index all
+work on the records instead of finding the index and splitting its text again.
+"""
+
+import re
+from collections import namedtuple
+
+# One index paragraph. `paragraph` is its position in the DocumentView; `text`
+# its stripped text. `term` is the text before the first comma, `subterms` the
+# fields between the term and the last field, `locator` the last field (the page
+# reference the e-book drops; None without a comma). `pages` are the page
+# numbers after the term, parenthetical section numbers like "(1.4)" excluded.
+# `group` is the letter of the group header the entry is under (None before
+# the first header); `label` is the entry without its locator, as the e-book
+# shows it.
+IndexEntry = namedtuple('IndexEntry', [
+    'paragraph', 'text', 'term', 'subterms', 'locator', 'pages', 'group', 'label',
+])
+
+_PARENTHETICAL_RE = re.compile(r'\([^)]*\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+
+
+def is_group_header(entry):
+    """True for the letter headers ("A", "B", ...) that group the entries."""
+    return len(entry.term) == 1
+
+
+def parse_index_entry(text, paragraph=None, group=None):
+    """IndexEntry for the text of one index paragraph."""
+    text = text.strip()
+    fields = [field.strip() for field in text.split(',')]
+    term = fields[0]
+    if len(fields) == 1:
+        subterms, locator, pages, label = (), None, (), text
+    else:
+        subterms = tuple(fields[1:-1])
+        locator = fields[-1]
+        after_term = _PARENTHETICAL_RE.sub('', text.split(',', 1)[1])
+        pages = tuple(int(number) for number in _NUMBER_RE.findall(after_term))
+        label = text.rsplit(',', 1)[0].strip()
+    if len(term) == 1:
+        group = term
+    return IndexEntry(paragraph, text, term, subterms, locator, pages, group, label)
+
+
+def parse_index(view):
+    """The entries of the index of a DocumentView, in order; empty paragraphs are skipped.
+
+    Raises ValueError if the document has no INDEX heading."""
+    entries = []
+    group = None
+    for i in view.index_range():
+        text = view.texts[i]
+        if not text.strip():
+            continue
+        entry = parse_index_entry(text, i, group)
+        group = entry.group
+        entries.append(entry)
+    return entries
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Streaming .docx Inspector
+
+Audits a book in one linear pass over word/document.xml, streamed straight from
+the zip with iterparse - nothing is extracted to disk and the tree is discarded
+as it is read. It reports:
+
+- XE tags (occurrences of 'XE "' in w:instrText, as count_XE_tags has always
+  counted them) and complete XE fields,
+- complete fields by type (XE, INDEX, PAGEREF, HYPERLINK, TOC, ...),
+- point bookmarks (bookmarkStart directly followed by its bookmarkEnd), range
+  bookmarks, and bookmark starts/ends without a partner,
+- internal (w:anchor) and external hyperlinks, and
+- dangling anchors: hyperlink anchors naming no bookmark in the document.
+
+Usage:
+  python inspect_docx.py <docx_file> [--part word/document.xml] [--json]
+
+Example: python inspect_docx.py "../mybooks/superArchItelligence Vol1 e-book.docx"
+"""
+
+import argparse
+import json
+import re
+import sys
+import zipfile
+from collections import Counter, namedtuple
+
+from lxml import etree
+
+from docx_fields import W, P, FLD_CHAR, FLD_SIMPLE, INSTR_TEXT, FLD_CHAR_TYPE, INSTR
+
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+BODY = W + 'body'
+BOOKMARK_START = W + 'bookmarkStart'
+BOOKMARK_END = W + 'bookmarkEnd'
+HYPERLINK = W + 'hyperlink'
+ID = W + 'id'
+NAME = W + 'name'
+ANCHOR = W + 'anchor'
+R_ID = '{%s}id' % R_NS
+
+# Bookmark target of a HYPERLINK field: HYPERLINK \l "name"
+_HYPERLINK_FIELD_ANCHOR_RE = re.compile(r'\\l\s+"([^"]*)"')
+
+# Fields whose first argument is a bookmark name
+_BOOKMARK_REFERENCE_FIELDS = frozenset({'REF', 'PAGEREF', 'NOTEREF'})
+
+DocxReport = namedtuple('DocxReport', [
+    'part', 'paragraphs', 'xe_tags', 'xe_fields', 'fields', 'point_bookmarks', 'range_bookmarks',
+    'unmatched_bookmark_starts', 'unmatched_bookmark_ends', 'internal_hyperlinks',
+    'external_hyperlinks', 'dangling_anchors',
+])
+
+
+def inspect_docx(docx_path, part='word/document.xml'):
+    """Inspect `part` of the .docx/.docm at `docx_path` in one streaming pass; return a DocxReport."""
+    with zipfile.ZipFile(docx_path) as package:
+        with package.open(part) as stream:
+            return inspect_stream(stream, part)
+
+
+class FieldCounter:
+    """
+    Counts complete fields by type from the w:fldChar, w:instrText and w:fldSimple
+    elements of a story, fed in document order. Complex fields may span runs and
+    paragraphs. Bookmarks named by HYPERLINK \\l fields are counted in `anchors`,
+    and those named by REF, PAGEREF and NOTEREF fields in `references`.
+    """
+
+    def __init__(self, anchors=None):
+        self.fields = Counter()
+        self.anchors = Counter() if anchors is None else anchors
+        self.references = Counter()
+        self._open_fields = []  # instruction parts of the complex fields begun and not yet ended
+
+    def feed(self, element):
+        tag = element.tag
+        open_fields = self._open_fields
+        if tag == INSTR_TEXT:
+            if open_fields:
+                open_fields[-1].append(element.text or '')
+        elif tag == FLD_CHAR:
+            kind = element.get(FLD_CHAR_TYPE)
+            if kind == 'begin':
+                open_fields.append([])
+            elif kind == 'separate' and open_fields:
+                open_fields[-1].append(None)  # instruction ends here
+            elif kind == 'end' and open_fields:
+                parts = open_fields.pop()
+                self.count(''.join(parts[:parts.index(None)] if None in parts else parts))
+        elif tag == FLD_SIMPLE:
+            self.count(element.get(INSTR, ''))
+
+    def count(self, instruction):
+        """Count one complete field with the given instruction."""
+        words = instruction.split(None, 2)
+        field_type = words[0].upper() if words else ''
+        self.fields[field_type] += 1
+        if field_type == 'HYPERLINK':
+            match = _HYPERLINK_FIELD_ANCHOR_RE.search(instruction)
+            if match:
+                self.anchors[match.group(1)] += 1
+        elif field_type in _BOOKMARK_REFERENCE_FIELDS and len(words) > 1:
+            self.references[words[1].strip('"')] += 1
+
+
+def inspect_stream(stream, part='word/document.xml'):
+    """Inspect WordprocessingML read from the binary file object `stream`; return a DocxReport."""
+    paragraphs = 0
+    xe_tags = 0
+    anchors = Counter()  # bookmark names targeted by hyperlinks
+    field_counter = FieldCounter(anchors)
+    bookmark_names = set()
+    open_bookmarks = {}  # id -> 'point' or 'range' for bookmarks started and not yet ended
+    point_bookmarks = range_bookmarks = unmatched_ends = 0
+    internal_hyperlinks = external_hyperlinks = 0
+    pending_start = None  # (id, depth) of a bookmarkStart whose next sibling decides if it is a point
+    depth = 0
+    body_depth = None
+
+    for event, element in etree.iterparse(stream, events=('start', 'end'), huge_tree=True):
+        tag = element.tag
+        if event == 'start':
+            depth += 1
+            if pending_start is not None:
+                bookmark_id, start_depth = pending_start
+                pending_start = None
+                if depth == start_depth and tag == BOOKMARK_END and element.get(ID) == bookmark_id:
+                    open_bookmarks[bookmark_id] = 'point'
+            if tag == BODY:
+                body_depth = depth
+            continue
+
+        # 'end' event: the element and its attributes and text are complete
+        if pending_start is not None and depth < pending_start[1]:
+            pending_start = None  # the bookmarkStart was the last child of its parent
+        depth -= 1
+
+        if tag == P:
+            paragraphs += 1
+        elif tag == INSTR_TEXT:
+            xe_tags += (element.text or '').count('XE "')
+            field_counter.feed(element)
+        elif tag == FLD_CHAR or tag == FLD_SIMPLE:
+            field_counter.feed(element)
+        elif tag == BOOKMARK_START:
+            bookmark_id = element.get(ID)
+            name = element.get(NAME)
+            if name:
+                bookmark_names.add(name)
+            if bookmark_id is not None:
+                open_bookmarks[bookmark_id] = 'range'
+                pending_start = (bookmark_id, depth + 1)
+        elif tag == BOOKMARK_END:
+            kind = open_bookmarks.pop(element.get(ID), None)
+            if kind == 'point':
+                point_bookmarks += 1
+            elif kind == 'range':
+                range_bookmarks += 1
+            else:
+                unmatched_ends += 1
+        elif tag == HYPERLINK:
+            anchor = element.get(ANCHOR)
+            if anchor is not None:
+                internal_hyperlinks += 1
+                anchors[anchor] += 1
+            elif element.get(R_ID) is not None:
+                external_hyperlinks += 1
+
+        # Drop finished top-level blocks so memory stays flat however long the book is
+        if body_depth is not None and depth == body_depth:
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    fields = field_counter.fields
+    return DocxReport(
+        part=part,
+        paragraphs=paragraphs,
+        xe_tags=xe_tags,
+        xe_fields=fields.get('XE', 0),
+        fields=dict(sorted(fields.items())),
+        point_bookmarks=point_bookmarks,
+        range_bookmarks=range_bookmarks,
+        unmatched_bookmark_starts=len(open_bookmarks),
+        unmatched_bookmark_ends=unmatched_ends,
+        internal_hyperlinks=internal_hyperlinks,
+        external_hyperlinks=external_hyperlinks,
+        dangling_anchors=sorted(name for name in anchors if name not in bookmark_names),
+    )
+
+
+def format_report(report):
+    """Human-readable lines for a DocxReport."""
+    lines = [
+        f"Part: {report.part}",
+        f"Paragraphs: {report.paragraphs}",
+        f"XE tags: {report.xe_tags} ({report.xe_fields} complete XE fields)",
+        "Fields: " + (", ".join(f"{name or '(empty)'} {n}" for name, n in report.fields.items()) or "none"),
+        f"Point bookmarks: {report.point_bookmarks}",
+        f"Range bookmarks: {report.range_bookmarks}",
+        f"Unmatched bookmark starts/ends: {report.unmatched_bookmark_starts}/{report.unmatched_bookmark_ends}",
+        f"Hyperlinks: {report.internal_hyperlinks} internal, {report.external_hyperlinks} external",
+        f"Dangling anchors: {len(report.dangling_anchors)}",
+    ]
+    lines.extend(f"  {name}" for name in report.dangling_anchors)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit the fields, bookmarks and hyperlinks of a .docx in one pass.")
+    parser.add_argument("docx_file")
+    parser.add_argument("--part", default="word/document.xml", help="package member to inspect")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = inspect_docx(args.docx_file, args.part)
+    except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(report._asdict(), indent=2))
+    else:
+        print("\n".join(format_report(report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Per-stage timing and memory instrumentation for the e-book pipeline.
+
+    stats = PipelineStats()
+    with stats.stage("convert_xe"):
+        ...
+    stats.write_json("book e-book.stats.json")
+
+Each stage records wall time, CPU time and peak traced memory (tracemalloc). Code
+inside a stage can bump named counters with `count("runs_scanned", n)`; when no
+PipelineStats is active, `count` is a no-op, so instrumented code pays nothing
+outside of an instrumented run.
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_active = None  # The PipelineStats currently collecting, if any
+
+
+def count(name, n=1):
+    """Add `n` to counter `name` of the running stage, if stats are being collected."""
+    if _active is not None:
+        _active.add(name, n)
+
+
+class PipelineStats:
+    """Collects per-stage wall/CPU time, peak memory and counters for one pipeline run."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.counters = {}
+        self._current = None
+
+    def __enter__(self):
+        global _active
+        _active = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        else:
+            self._started_tracing = False
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = None
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage `name`."""
+        record = {"stage": name, "counters": {}}
+        previous, self._current = self._current, record
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            if self.trace_memory and tracemalloc.is_tracing():
+                record["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            self._current = previous
+            self.stages.append(record)
+
+    def add(self, name, n=1):
+        """Add `n` to counter `name`, both for the running stage and for the whole run."""
+        self.counters[name] = self.counters.get(name, 0) + n
+        if self._current is not None:
+            counters = self._current["counters"]
+            counters[name] = counters.get(name, 0) + n
+
+    def report(self):
+        """The collected measurements as a JSON-serializable dict."""
+        return {
+            "stages": self.stages,
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages), 6),
+            "total_cpu_seconds": round(sum(s["cpu_seconds"] for s in self.stages), 6),
+            "peak_memory_bytes": max((s.get("peak_memory_bytes", 0) for s in self.stages), default=0),
+            "counters": self.counters,
+        }
+
+    def write_json(self, path, **extra):
+        """Write the report, plus any `extra` top-level fields, to `path`."""
+        report = dict(extra)
+        report.update(self.report())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
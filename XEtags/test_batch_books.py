@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from docx import Document
+
+from batch_books import build_books, expand_manuscripts
+
+def create_manuscript(path):
+    """A minimal print manuscript the e-book pipeline accepts."""
+    doc = Document()
+    for text in ["superArchItelligence", "Redesigning the real world", "", "", "Alan G Street",
+                 "Copyright © 2025 Alan G Street", "Robots arrive in the city.",
+                 "INDEX", "R", "Robots, 1", "ACKNOWLEDGEMENTS"]:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+class TestBuildBooks(unittest.TestCase):
+    def test_books_built_in_parallel_with_per_book_summaries(self):
+        """Each manuscript gets its own e-book and summary; a bad manuscript fails alone."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ('Vol1 8x10.docx', 'Vol2 8x10.docx'):
+                create_manuscript(os.path.join(temp_dir, name))
+            with open(os.path.join(temp_dir, 'Broken 8x10.docx'), 'w') as f:
+                f.write('not a docx')
+            before = set(os.listdir(temp_dir))
+
+            manuscripts = expand_manuscripts([os.path.join(temp_dir, '*8x10.docx')])
+            summaries = build_books(manuscripts, max_workers=2)
+
+            self.assertEqual([os.path.basename(s['input']) for s in summaries],
+                             ['Broken 8x10.docx', 'Vol1 8x10.docx', 'Vol2 8x10.docx'])
+            self.assertEqual([s['ok'] for s in summaries], [False, True, True])
+            self.assertIn('Package not found', summaries[0]['error'])
+            for summary in summaries[1:]:
+                self.assertTrue(os.path.exists(summary['output']))
+                self.assertEqual(summary['step'], 'ebook')
+            # Only the e-books were added next to the manuscripts; scratch space is gone
+            self.assertEqual(set(os.listdir(temp_dir)) - before, {'Vol1 e-book.docx', 'Vol2 e-book.docx'})
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+
+import book
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+DOCUMENT_XML = f'''<w:document xmlns:w="{W_NS}"><w:body><w:p>
+<w:bookmarkStart w:id="0" w:name="xe_bookmark_0"/><w:bookmarkEnd w:id="0"/>
+<w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText> XE "Agents" </w:instrText></w:r>
+<w:r><w:fldChar w:fldCharType="end"/></w:r></w:p></w:body></w:document>'''
+
+class TestBookCommand(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'book 8x10.docx')
+        with zipfile.ZipFile(self.path, 'w') as package:
+            package.writestr('word/document.xml', DOCUMENT_XML)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_json_result_and_exit_status(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(book.main(["--json", "count-xe", self.path]), 0)
+        self.assertEqual(json.loads(output.getvalue()), {"input": self.path, "xe_tags": 1, "xe_fields": 1})
+        self.assertEqual(book.count_bookmarks(self.path)["point_bookmarks"], 1)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(book.main(["count-bookmarks", self.path + ".missing"]), 1)
+        self.assertTrue(output.getvalue().startswith("Error: "))
+
+    def test_counting_does_not_load_python_docx(self):
+        script = ("import sys, book; book.main(['count-xe', sys.argv[1]]); "
+                  "print('docx' in sys.modules, 'create_ebook_from_print' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", script, self.path], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(book.__file__)), check=True)
+        self.assertEqual(result.stdout.splitlines()[-1], "False False")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
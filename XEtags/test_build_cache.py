@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import create_ebook_from_print
+from build_cache import BuildCache, cache_filename, pending_filename
+from create_ebook_from_print import create_ebook
+from test_batch_books import create_manuscript
+
+class TestIncrementalBuild(unittest.TestCase):
+    def test_failed_move_is_resumed_without_building(self):
+        """An e-book written but not moved into place (e.g. open in Word) is moved by the next run."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'Vol1 8x10.docx')
+            create_manuscript(path)
+            output = create_ebook_from_print.ebook_filename(path)
+
+            replace = os.replace
+            def locked_output(source, target):
+                if target == output:
+                    raise PermissionError("locked")
+                replace(source, target)
+            with mock.patch.object(os, 'replace', locked_output):
+                with self.assertRaises(PermissionError):
+                    create_ebook(path, incremental=True)
+            self.assertFalse(os.path.exists(output))
+            self.assertTrue(BuildCache.load(cache_filename(output)).pending_is_current(pending_filename(output)))
+
+            with mock.patch.object(create_ebook_from_print, 'load_docx') as load_docx:
+                summary = create_ebook(path, incremental=True)
+            load_docx.assert_not_called()
+            self.assertEqual(summary['build'], 'resumed')
+            self.assertTrue(os.path.exists(output))
+            self.assertFalse(os.path.exists(pending_filename(output)))
+            self.assertEqual(create_ebook(path, incremental=True)['build'], 'up to date')
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
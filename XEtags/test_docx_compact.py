@@ -0,0 +1,37 @@
+import unittest
+
+from lxml import etree
+
+from docx_compact import compact_story
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+PARAGRAPH_XML = f'''<w:p xmlns:w="{W_NS}" w:rsidR="00A1" w:rsidRDefault="00A1">
+<w:r w:rsidR="00B2"><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Agents </w:t></w:r>
+<w:proofErr w:type="spellStart"/>
+<w:r w:rsidRPr="00C3"><w:rPr><w:b/></w:rPr><w:t>and</w:t><w:t xml:space="preserve"> </w:t></w:r>
+<w:proofErr w:type="spellEnd"/>
+<w:r><w:rPr><w:b/></w:rPr></w:r>
+<w:r><w:rPr><w:b/></w:rPr><w:lastRenderedPageBreak/><w:t>cities</w:t></w:r>
+<w:r><w:t>, plain</w:t></w:r>
+<w:r><w:fldChar w:fldCharType="begin"/></w:r>
+<w:r><w:t>after</w:t></w:r>
+<w:hyperlink w:anchor="xe_bookmark_0"><w:r><w:t>li</w:t></w:r><w:r><w:t>nk</w:t></w:r></w:hyperlink>
+</w:p>'''
+
+class TestCompactStory(unittest.TestCase):
+    def test_merges_equal_runs_and_drops_noise(self):
+        paragraph = etree.fromstring(PARAGRAPH_XML)
+        self.assertEqual(compact_story(paragraph), 4)
+        xml = etree.tostring(paragraph).decode('utf-8')
+        self.assertNotIn('rsid', xml)
+        self.assertNotIn('proofErr', xml)
+        self.assertNotIn('lastRenderedPageBreak', xml)
+        runs = paragraph.findall(f'.//{{{W_NS}}}r')
+        texts = [''.join(run.itertext()) for run in runs]
+        # A field character run is not merged across; runs inside the hyperlink merge with each other
+        self.assertEqual(texts, ['Agents and cities', ', plain', '', 'after', 'link'])
+        self.assertEqual(len(runs[0].findall(f'{{{W_NS}}}t')), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
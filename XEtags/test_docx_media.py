@@ -0,0 +1,80 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from docx import Document
+
+from docx_media import _cache_key, optimize_images
+from docx_package import save_document
+
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+def make_png(width, height):
+    """A valid RGB PNG of the given size with a noisy gradient, built without an imaging library."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + bytes((x * 7 + y * 13 + x * y) % 256 for x in range(width * 3))
+                    for y in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows, 0))
+            + chunk(b'IEND', b''))
+
+def document_with_picture(png):
+    doc = Document()
+    doc.add_picture(io.BytesIO(png))
+    return doc
+
+def image_parts(doc):
+    return [part for part in doc.part.package.parts if part.content_type == 'image/png']
+
+class TestOptimizeImages(unittest.TestCase):
+    def test_cached_results_are_reused(self):
+        """A cached result replaces the image without decoding it; an empty one keeps the original."""
+        png = make_png(40, 20)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            key = _cache_key(png, 16, 'image/png')
+            with open(os.path.join(cache_dir, key), 'wb') as f:
+                f.write(b'smaller')
+            doc = document_with_picture(png)
+            replacements = optimize_images(doc, 16, cache_dir)
+            self.assertEqual(replacements, {image_parts(doc)[0].partname.membername: b'smaller'})
+            self.assertEqual(image_parts(doc)[0].blob, png)
+
+            with open(os.path.join(cache_dir, key), 'wb') as f:
+                f.write(b'')
+            doc = document_with_picture(png)
+            self.assertEqual(optimize_images(doc, 16, cache_dir), {})
+
+    def test_replacements_are_written_on_save(self):
+        """save_document writes the downsampled image in place of the part's own bytes."""
+        png = make_png(40, 20)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'source.docx')
+            output = os.path.join(temp_dir, 'output.docx')
+            document_with_picture(png).save(source)
+            doc = Document(source)
+            with open(os.path.join(temp_dir, _cache_key(png, 16, 'image/png')), 'wb') as f:
+                f.write(b'smaller')
+            save_document(doc, source, output, set(), replacements=optimize_images(doc, 16, temp_dir))
+            self.assertEqual(image_parts(Document(output))[0].blob, b'smaller')
+
+    @unittest.skipIf(PIL is None, "needs Pillow")
+    def test_downsamples_and_caches(self):
+        from PIL import Image
+        png = make_png(400, 100)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            doc = document_with_picture(png)
+            replacements = optimize_images(doc, 200, cache_dir, max_workers=1)
+            self.assertEqual(len(replacements), 1)
+            with Image.open(io.BytesIO(replacements[image_parts(doc)[0].partname.membername])) as image:
+                self.assertEqual(image.size, (200, 50))
+            self.assertEqual(os.listdir(cache_dir), [_cache_key(png, 200, 'image/png')])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import docx_package
+from docx_package import RAW_COPY, read_raw_member, write_package
+
+def create_package(path):
+    """Create a small zip package with one XML part and one already-compressed binary part."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', '<Types/>')
+        package.writestr('word/document.xml', '<w:document>old</w:document>')
+        package.writestr('word/media/image1.png', os.urandom(4096), zipfile.ZIP_STORED)
+
+class TestWritePackage(unittest.TestCase):
+    def test_unchanged_members_copied_raw(self):
+        """Untouched members keep their exact compressed bytes; replaced members get the new content."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'source.docx')
+            output = os.path.join(temp_dir, 'output.docx')
+            create_package(source)
+
+            write_package(source, output, {'word/document.xml': b'<w:document>new</w:document>',
+                                           'word/extra.xml': b'<extra/>'})
+
+            with zipfile.ZipFile(source) as src, zipfile.ZipFile(output) as out:
+                self.assertIsNone(out.testzip())
+                self.assertEqual(out.namelist(), src.namelist() + ['word/extra.xml'])
+                self.assertEqual(out.read('word/document.xml'), b'<w:document>new</w:document>')
+                self.assertEqual(out.read('word/extra.xml'), b'<extra/>')
+                image_info = out.getinfo('word/media/image1.png')
+                self.assertEqual(image_info.compress_type, zipfile.ZIP_STORED)
+                if RAW_COPY:
+                    self.assertEqual(read_raw_member(out, image_info),
+                                     read_raw_member(src, src.getinfo('word/media/image1.png')))
+
+    def test_without_raw_copy(self):
+        """Where zipfile's internals are not relied on, writestr gives the same members."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'source.docx')
+            create_package(source)
+            outputs = []
+            for raw_copy in (RAW_COPY, False):
+                output = os.path.join(temp_dir, f'output-{raw_copy}.docx')
+                with mock.patch.object(docx_package, 'RAW_COPY', raw_copy):
+                    write_package(source, output, {'word/document.xml': b'<w:document>new</w:document>'})
+                with zipfile.ZipFile(output) as out:
+                    self.assertIsNone(out.testzip())
+                    outputs.append([(info.filename, info.compress_type, out.read(info)) for info in out.infolist()])
+            self.assertEqual(outputs[0], outputs[1])
+
+    def test_refuses_to_overwrite_source(self):
+        """Writing over the package being copied from is rejected."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'source.docx')
+            create_package(source)
+            with self.assertRaises(ValueError):
+                write_package(source, source, {})
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
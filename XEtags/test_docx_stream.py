@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+
+from lxml import etree
+
+from create_ebook_from_print import convert_xe_tags_to_bookmarks
+from docx_stream import stream_transform
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W14_NS = 'http://schemas.microsoft.com/office/word/2010/wordml'
+
+DOCUMENT_XML = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="{W_NS}" xmlns:w14="{W14_NS}" w14:ignorable="w14">
+  <w:background w:color="FFFFFF"/>
+  <w:body>
+    <w:p w14:paraId="1"><w:r><w:t>Cities &amp; robots </w:t></w:r>
+      <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+      <w:r><w:instrText xml:space="preserve"> XE "Artificial </w:instrText></w:r>
+      <w:r><w:instrText>Intelligence" </w:instrText></w:r>
+      <w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>
+    <!-- chapter break -->
+    <w:tbl><w:tr><w:tc>
+      <w:p><w:bookmarkStart w:id="0" w:name="_GoBack"/><w:bookmarkEnd w:id="0"/>
+        <w:fldSimple w:instr=' XE "Design" '/><w:r><w:t>Design</w:t></w:r></w:p>
+    </w:tc></w:tr></w:tbl>
+    <w:p/>
+    <w:sectPr><w:pgSz w:w="11520" w:h="14400"/></w:sectPr>
+  </w:body>
+</w:document>'''
+
+HEADER_XML = f'''<w:hdr xmlns:w="{W_NS}"><w:p>
+<w:bookmarkStart w:id="1" w:name="xe_bookmark_0"/><w:bookmarkEnd w:id="1"/>
+<w:r><w:t>Running head</w:t></w:r><w:fldSimple w:instr=' XE "Header term" '/></w:p></w:hdr>'''
+
+FOOTNOTES_XML = f'''<w:footnotes xmlns:w="{W_NS}"><w:footnote w:id="1"><w:p>
+<w:r><w:footnoteRef/></w:r><w:r><w:t>See the appendix</w:t></w:r>
+<w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText> XE "Footnote term" </w:instrText></w:r>
+<w:r><w:fldChar w:fldCharType="end"/></w:r></w:p></w:footnote></w:footnotes>'''
+
+class TestStreamTransform(unittest.TestCase):
+    def test_identity_transform_matches_tree_serialization(self):
+        """Text between blocks, comments and namespace declarations come out as from the whole tree."""
+        output = io.BytesIO()
+        blocks = stream_transform(io.BytesIO(DOCUMENT_XML.encode('utf-8')), output, lambda block: None,
+                                  buffer_size=16)
+        root = etree.fromstring(DOCUMENT_XML.encode('utf-8'))
+        self.assertEqual(output.getvalue(), etree.tostring(root, encoding='utf-8', xml_declaration=True))
+        self.assertEqual(blocks, 4)
+
+    def test_streaming_conversion_matches_in_memory_conversion(self):
+        """Same package bytes and mappings; notes and headers are converted first, around
+        the header's existing bookmark id and name."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'book.docx')
+            with zipfile.ZipFile(source, 'w', zipfile.ZIP_DEFLATED) as package:
+                package.writestr('word/document.xml', DOCUMENT_XML)
+                package.writestr('word/header1.xml', HEADER_XML)
+                package.writestr('word/footnotes.xml', FOOTNOTES_XML)
+            in_memory = os.path.join(temp_dir, 'in_memory.docx')
+            streamed = os.path.join(temp_dir, 'streamed.docx')
+
+            expected = convert_xe_tags_to_bookmarks(source, in_memory)
+            self.assertEqual(convert_xe_tags_to_bookmarks(source, streamed, streaming=True), expected)
+            self.assertEqual(expected[0], {'Footnote term': 'xe_bookmark_1', 'Header term': 'xe_bookmark_2',
+                                           'Artificial Intelligence': 'xe_bookmark_3', 'Design': 'xe_bookmark_4'})
+            self.assertEqual(expected[1]['xe_bookmark_1'], 'See the appendix')
+            with zipfile.ZipFile(in_memory) as a, zipfile.ZipFile(streamed) as b:
+                self.assertIsNone(b.testzip())
+                self.assertEqual(b.namelist(), a.namelist())
+                for name in a.namelist():
+                    self.assertEqual(b.read(name), a.read(name), name)
+                self.assertNotIn(b'XE', b.read('word/footnotes.xml'))
+                self.assertIn(b'w:name="xe_bookmark_2"', b.read('word/header1.xml'))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
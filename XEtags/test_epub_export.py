@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from lxml import etree
+
+from epub_export import export_epub
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+XHTML = '{http://www.w3.org/1999/xhtml}'
+
+STYLES_XML = f'''<w:styles xmlns:w="{W_NS}">
+<w:style w:type="paragraph" w:styleId="Heading1"><w:pPr><w:outlineLvl w:val="0"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="ChapterTitle"><w:basedOn w:val="Heading1"/></w:style>
+</w:styles>'''
+
+def heading(text, style="Heading1"):
+    return f'<w:p><w:pPr><w:pStyle w:val="{style}"/></w:pPr><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+DOCUMENT_XML = f'''<w:document xmlns:w="{W_NS}"><w:body>
+<w:p><w:r><w:t>superArchItelligence</w:t></w:r></w:p>
+{heading("Chapter 1", "ChapterTitle")}
+<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>Cities &amp; agents</w:t></w:r><w:bookmarkStart w:id="0" w:name="xe_bookmark_0"/><w:bookmarkEnd w:id="0"/>
+<w:r><w:instrText> PAGE </w:instrText></w:r></w:p>
+{heading("INDEX")}
+<w:p><w:hyperlink w:anchor="xe_bookmark_0"><w:r><w:t>Agents</w:t></w:r></w:hyperlink></w:p>
+<w:p><w:hyperlink w:anchor="xe_bookmark_1"><w:r><w:t>Robots</w:t></w:r></w:hyperlink></w:p>
+{heading("ABOUT THE AUTHOR")}
+<w:p><w:bookmarkStart w:id="1" w:name="xe_bookmark_1"/><w:bookmarkEnd w:id="1"/><w:r><w:t>Robots</w:t></w:r></w:p>
+<w:sectPr/>
+</w:body></w:document>'''
+
+class TestExportEpub(unittest.TestCase):
+    def test_chapters_anchors_and_index_navigation(self):
+        """One file per top-level heading, index links across chapters, the index in the nav document."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'book e-book.docx')
+            with zipfile.ZipFile(source, 'w') as package:
+                package.writestr('word/document.xml', DOCUMENT_XML)
+                package.writestr('word/styles.xml', STYLES_XML)
+            summary = export_epub(source)
+            self.assertEqual(summary['output'], os.path.join(temp_dir, 'book e-book.epub'))
+            self.assertEqual((summary['chapters'], summary['index_entries']), (4, 2))
+
+            with zipfile.ZipFile(summary['output']) as epub:
+                self.assertEqual(epub.namelist()[0], 'mimetype')
+                self.assertEqual(epub.getinfo('mimetype').compress_type, zipfile.ZIP_STORED)
+                chapters = [etree.fromstring(epub.read(f'EPUB/chapter-00{i}.xhtml')) for i in range(1, 5)]
+                nav = etree.fromstring(epub.read('EPUB/nav.xhtml'))
+                etree.fromstring(epub.read('EPUB/content.opf'))
+
+        body = chapters[1].find(f'{XHTML}body')
+        self.assertEqual(body[0].tag, f'{XHTML}h1')
+        bold, anchor = body[1]
+        self.assertEqual((bold.tag, bold.text), (f'{XHTML}b', 'Cities & agents'))
+        self.assertEqual((anchor.tag, anchor.get('id')), (f'{XHTML}span', 'xe_bookmark_0'))
+        self.assertEqual(len(body[1]), 2)  # the PAGE field instruction is not text
+        index_links = [a.get('href') for a in chapters[2].iter(f'{XHTML}a')]
+        self.assertEqual(index_links, ['chapter-002.xhtml#xe_bookmark_0', 'chapter-004.xhtml#xe_bookmark_1'])
+        nav_links = [(a.text, a.get('href')) for a in nav.iter(f'{XHTML}a')]
+        self.assertEqual(nav_links[:4], [('superArchItelligence', 'chapter-001.xhtml'), ('Chapter 1', 'chapter-002.xhtml'),
+                                         ('INDEX', 'chapter-003.xhtml'), ('ABOUT THE AUTHOR', 'chapter-004.xhtml')])
+        self.assertEqual(nav_links[4:], [('Agents', 'chapter-002.xhtml#xe_bookmark_0'),
+                                         ('Robots', 'chapter-004.xhtml#xe_bookmark_1')])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
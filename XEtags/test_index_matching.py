@@ -0,0 +1,113 @@
+import random
+import unittest
+
+from create_ebook_from_print import BookmarkTextMatcher, CachedBookmarkMatcher, ExactTermMatcher, calculate_text_similarity
+
+WORDS = ["agent", "AI", "memory", "planning", "the", "of", "city", "net", "network",
+         "design-build", "R&D", "(3.4.6)", "vision", "language", "model", "a", "x/y"]
+
+def best_match_exhaustive(term, bookmark_to_text, threshold=0.25):
+    """Reference scoring: every bookmark against the term, first best score wins."""
+    best_match_score = 0
+    best_bookmark = None
+    for bm_name, surrounding_text in bookmark_to_text.items():
+        score = calculate_text_similarity(term, surrounding_text)
+        if score > best_match_score and score > threshold:
+            best_match_score = score
+            best_bookmark = bm_name
+    return best_bookmark
+
+class TestBookmarkTextMatcher(unittest.TestCase):
+    def test_matches_exhaustive_scoring(self):
+        """The inverted-index matcher picks exactly the bookmark the exhaustive scan picks."""
+        rnd = random.Random(7)
+        for _ in range(20):
+            bookmark_to_text = {
+                f"xe_bookmark_{i}": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 8)))
+                for i in range(rnd.randint(0, 40))
+            }
+            matcher = BookmarkTextMatcher(bookmark_to_text)
+            for _ in range(50):
+                term = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, 4)))
+                self.assertEqual(matcher.best_match(term), best_match_exhaustive(term, bookmark_to_text),
+                                 f"Mismatch for term {term!r}")
+
+    def test_substring_without_shared_word(self):
+        """A term contained inside a longer word still scores 1.0, as in calculate_text_similarity."""
+        matcher = BookmarkTextMatcher({"xe_bookmark_0": "planning", "xe_bookmark_1": "networks of agents"})
+        self.assertEqual(matcher.best_match("Net"), "xe_bookmark_1")
+        self.assertIsNone(matcher.best_match("Robotics"))
+
+class TestExactTermMatcher(unittest.TestCase):
+    def test_matches_first_containing_term(self):
+        """The suffix automaton finds the same bookmark as scanning the terms in order for the main term."""
+        rnd = random.Random(5)
+        alphabet = "abc -"
+        random_text = lambda length: "".join(rnd.choice(alphabet) for _ in range(length))
+        for _ in range(50):
+            index_term_to_bookmark = {random_text(rnd.randint(0, 12)): f"xe_bookmark_{i}"
+                                      for i in range(rnd.randint(0, 20))}
+            registry = {bm for bm in index_term_to_bookmark.values() if rnd.random() < 0.7}
+            for known in (None, registry):
+                matcher = ExactTermMatcher(index_term_to_bookmark, known)
+                for _ in range(40):
+                    main_term = random_text(rnd.randint(0, 5))
+                    expected = next((bm for term, bm in index_term_to_bookmark.items()
+                                     if (known is None or bm in known) and main_term in term), None)
+                    self.assertEqual(matcher.first_containing(main_term), expected,
+                                     f"Mismatch for main term {main_term!r}")
+
+class TestCachedBookmarkMatcher(unittest.TestCase):
+    def test_reused_decisions_match_fresh_scoring(self):
+        """After some bookmark texts change, added or removed, cached decisions give the fresh answer."""
+        rnd = random.Random(11)
+        random_text = lambda: " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 8)))
+        for _ in range(20):
+            previous = {f"xe_bookmark_{i}": random_text() for i in range(rnd.randint(0, 30))}
+            terms = {" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3))) for _ in range(30)}
+            first_build = CachedBookmarkMatcher(previous, {}, {})
+            for term in terms:
+                first_build.best_match(term)
+
+            current = dict(previous)
+            for name in rnd.sample(sorted(current), min(3, len(current))):
+                if rnd.random() < 0.3:
+                    del current[name]
+                else:
+                    current[name] = random_text()
+            current[f"xe_bookmark_{len(previous)}"] = random_text()
+
+            matcher = CachedBookmarkMatcher(current, previous, first_build.decisions)
+            for term in terms:
+                self.assertEqual(matcher.best_match(term), best_match_exhaustive(term, current),
+                                 f"Mismatch for term {term!r}")
+
+    def test_renumbered_bookmarks_keep_their_decisions(self):
+        """Bookmarks are followed by content key: a bookmark added at the start changes only itself,
+        one moved past others is re-scored, and the answers stay those of fresh scoring."""
+        rnd = random.Random(13)
+        random_text = lambda: " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 8)))
+        for _ in range(20):
+            texts = [(f"key{i}", random_text()) for i in range(rnd.randint(2, 30))]
+            terms = {" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3))) for _ in range(30)}
+            previous = {f"xe_bookmark_{i}": text for i, (_, text) in enumerate(texts)}
+            previous_keys = {f"xe_bookmark_{i}": key for i, (key, _) in enumerate(texts)}
+            first_build = CachedBookmarkMatcher(previous, {}, {}, bookmark_keys=previous_keys)
+            for term in terms:
+                first_build.best_match(term)
+
+            texts.insert(0, ("new", random_text()))
+            moved = texts.pop(rnd.randrange(1, len(texts)))
+            texts.insert(rnd.randrange(1, len(texts) + 1), moved)
+            current = {f"xe_bookmark_{i}": text for i, (_, text) in enumerate(texts)}
+            current_keys = {f"xe_bookmark_{i}": key for i, (key, _) in enumerate(texts)}
+            matcher = CachedBookmarkMatcher(current, first_build.keyed_texts(), first_build.decisions,
+                                            bookmark_keys=current_keys)
+            self.assertLessEqual(len(matcher.changed), 2)
+            self.assertIn("xe_bookmark_0", matcher.changed)
+            for term in terms:
+                self.assertEqual(matcher.best_match(term), best_match_exhaustive(term, current),
+                                 f"Mismatch for term {term!r}")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
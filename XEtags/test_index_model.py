@@ -0,0 +1,31 @@
+import unittest
+
+from index_model import is_group_header, parse_index, parse_index_entry
+
+class FakeView:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def index_range(self):
+        return range(self.texts.index("INDEX") + 1, len(self.texts))
+
+class TestIndexModel(unittest.TestCase):
+    def test_entries_terms_pages_and_groups(self):
+        """One record per non-empty index paragraph, with its letter group and paragraph position."""
+        view = FakeView(["Body", "INDEX", "A", "Agents, 12", "", "Agents, memory (1.4), 30", "B", "Buildings"])
+        index = parse_index(view)
+        self.assertEqual([entry.paragraph for entry in index], [2, 3, 5, 6, 7])
+        self.assertEqual([entry.group for entry in index], ["A", "A", "A", "B", "B"])
+        self.assertEqual([is_group_header(entry) for entry in index], [True, False, False, True, False])
+
+        subentry = index[2]
+        self.assertEqual((subentry.term, subentry.subterms, subentry.locator, subentry.pages, subentry.label),
+                         ("Agents", ("memory (1.4)",), "30", (30,), "Agents, memory (1.4)"))
+        self.assertEqual((index[4].locator, index[4].pages, index[4].label), (None, (), "Buildings"))
+
+    def test_every_page_number_after_the_term_is_counted(self):
+        self.assertEqual(parse_index_entry(" Vision, 12, 14 ").pages, (12, 14))
+        self.assertEqual(parse_index_entry("Vision, 12-14").label, "Vision")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
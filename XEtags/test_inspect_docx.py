@@ -0,0 +1,72 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+
+from inspect_docx import inspect_docx, inspect_stream
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+DOCUMENT_XML = f'''<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}"><w:body>
+<w:p>
+    <w:bookmarkStart w:id="0" w:name="point"/><w:bookmarkEnd w:id="0"/>
+    <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+    <w:r><w:instrText xml:space="preserve"> XE "Artificial </w:instrText></w:r>
+    <w:r><w:instrText>Intelligence" </w:instrText></w:r>
+    <w:r><w:fldChar w:fldCharType="end"/></w:r>
+    <w:bookmarkStart w:id="1" w:name="range"/>
+    <w:r><w:t>Cities</w:t></w:r>
+    <w:bookmarkEnd w:id="1"/>
+    <w:bookmarkStart w:id="2" w:name="last_child"/>
+</w:p>
+<w:p>
+    <w:bookmarkEnd w:id="2"/>
+    <w:fldSimple w:instr=' XE "Design" '/>
+    <w:hyperlink w:anchor="point"><w:r><w:t>Point</w:t></w:r></w:hyperlink>
+    <w:hyperlink w:anchor="missing"><w:r><w:t>Missing</w:t></w:r></w:hyperlink>
+    <w:hyperlink r:id="rId9"><w:r><w:t>Web</w:t></w:r></w:hyperlink>
+    <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+    <w:r><w:instrText> HYPERLINK \\l "gone" </w:instrText></w:r>
+    <w:r><w:fldChar w:fldCharType="separate"/></w:r>
+    <w:r><w:t>see XE "not an instruction"</w:t></w:r>
+    <w:r><w:fldChar w:fldCharType="end"/></w:r>
+    <w:bookmarkEnd w:id="7"/>
+    <w:bookmarkStart w:id="8" w:name="open"/>
+</w:p>
+</w:body></w:document>'''
+
+class TestInspectDocx(unittest.TestCase):
+    def setUp(self):
+        self.report = inspect_stream(io.BytesIO(DOCUMENT_XML.encode('utf-8')))
+
+    def test_fields_and_xe_tags(self):
+        """Split and simple XE fields are counted whole; XE text in a field result is not a tag."""
+        self.assertEqual(self.report.paragraphs, 2)
+        self.assertEqual(self.report.xe_tags, 1)  # instrText occurrences, as count_XE_tags counted them
+        self.assertEqual(self.report.xe_fields, 2)
+        self.assertEqual(self.report.fields, {'HYPERLINK': 1, 'XE': 2})
+
+    def test_bookmarks(self):
+        """Only a start directly followed by its own end is a point; partners may be in another paragraph."""
+        self.assertEqual(self.report.point_bookmarks, 1)
+        self.assertEqual(self.report.range_bookmarks, 2)
+        self.assertEqual(self.report.unmatched_bookmark_starts, 1)
+        self.assertEqual(self.report.unmatched_bookmark_ends, 1)
+
+    def test_hyperlinks_and_dangling_anchors(self):
+        self.assertEqual(self.report.internal_hyperlinks, 2)
+        self.assertEqual(self.report.external_hyperlinks, 1)
+        self.assertEqual(self.report.dangling_anchors, ['gone', 'missing'])
+
+    def test_reads_straight_from_the_package(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'book.docx')
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+                package.writestr('word/document.xml', DOCUMENT_XML)
+            self.assertEqual(inspect_docx(path), self.report)
+            self.assertEqual(os.listdir(temp_dir), ['book.docx'])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from validate_ebook import has_page_number, problems, prune_bookmarks, validate_ebook
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+DOCUMENT_XML = f'''<w:document xmlns:w="{W_NS}"><w:body>
+<w:p><w:bookmarkStart w:id="0" w:name="xe_bookmark_0"/><w:bookmarkEnd w:id="0"/><w:r><w:t>Agents</w:t></w:r></w:p>
+<w:p><w:bookmarkStart w:id="1" w:name="xe_bookmark_1"/><w:bookmarkEnd w:id="1"/> <w:r><w:t>Cities</w:t></w:r></w:p>
+<w:p><w:bookmarkStart w:id="2" w:name="xe_bookmark_2"/><w:bookmarkEnd w:id="2"/><w:r><w:t>Design</w:t></w:r>
+  <w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText> PAGEREF xe_bookmark_2 \\h </w:instrText></w:r>
+  <w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>
+<w:bookmarkStart w:id="5" w:name="xe_bookmark_5"/><w:bookmarkEnd w:id="5"/>
+<w:p><w:r><w:t>INDEX</w:t></w:r></w:p>
+<w:p><w:hyperlink w:anchor="xe_bookmark_0"><w:r><w:t>Agents</w:t></w:r></w:hyperlink></w:p>
+<w:p><w:hyperlink w:anchor="xe_bookmark_9"><w:r><w:t>Robots</w:t></w:r></w:hyperlink></w:p>
+<w:p><w:r><w:t>Vision, 12</w:t></w:r></w:p>
+<w:p><w:r><w:t>ABOUT THE AUTHOR</w:t></w:r></w:p>
+<w:p><w:r><w:t>Born 1970, 3</w:t></w:r></w:p>
+</w:body></w:document>'''
+
+FOOTNOTES_XML = f'''<w:footnotes xmlns:w="{W_NS}"><w:footnote w:id="1"><w:p>
+<w:bookmarkStart w:id="3" w:name="xe_bookmark_3"/><w:bookmarkEnd w:id="3"/><w:r><w:t>Note</w:t></w:r>
+<w:fldSimple w:instr=' XE "Left over" '/></w:p></w:footnote></w:footnotes>'''
+
+class TestValidateEbook(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'book e-book.docx')
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as package:
+            package.writestr('word/document.xml', DOCUMENT_XML)
+            package.writestr('word/footnotes.xml', FOOTNOTES_XML)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_report(self):
+        """XE fields in any part, dangling anchors, page numbers in the index only, and orphans
+        that neither a hyperlink nor a PAGEREF field refers to."""
+        report = validate_ebook(self.path)
+        self.assertEqual(report.xe_fields, 1)
+        self.assertEqual(report.internal_hyperlinks, 2)
+        self.assertEqual(report.dangling_anchors, ['xe_bookmark_9'])
+        self.assertEqual(report.index_entries, 3)
+        self.assertEqual(report.index_entries_with_page_numbers, ['Vision, 12'])
+        self.assertEqual(report.orphaned_bookmarks, {'xe_bookmark_1': 'word/document.xml',
+                                                     'xe_bookmark_3': 'word/footnotes.xml',
+                                                     'xe_bookmark_5': 'word/document.xml'})
+        self.assertEqual(len(problems(report)), 3)
+
+    def test_prune_removes_only_orphans(self):
+        output = os.path.join(self.temp_dir.name, 'pruned.docx')
+        prune_bookmarks(self.path, output, validate_ebook(self.path).orphaned_bookmarks)
+        report = validate_ebook(output)
+        self.assertEqual(report.orphaned_bookmarks, {})
+        with zipfile.ZipFile(output) as package:
+            document = package.read('word/document.xml').decode('utf-8')
+            footnotes = package.read('word/footnotes.xml').decode('utf-8')
+        self.assertIn('w:name="xe_bookmark_0"', document)
+        self.assertIn('w:name="xe_bookmark_2"', document)
+        self.assertNotIn('w:id="1"', document)
+        self.assertNotIn('w:id="5"', document)
+        self.assertNotIn('bookmark', footnotes)
+        self.assertIn('<w:r><w:t>Note</w:t></w:r>', footnotes)
+
+    def test_has_page_number(self):
+        self.assertTrue(has_page_number("Agents, planning, 12"))
+        self.assertTrue(has_page_number("Agents, 12-14"))
+        self.assertFalse(has_page_number("Agents, planning"))
+        self.assertFalse(has_page_number("GPT-4"))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from docx import Document
+
+from test_batch_books import create_manuscript
+from watch_book import BookWatcher
+
+class TestBookWatcher(unittest.TestCase):
+    def test_rebuilds_once_a_save_has_settled(self):
+        """The first poll builds; an edit is built on the poll after it is seen."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'Vol1 8x10.docx')
+            create_manuscript(path)
+            watcher = BookWatcher(path)
+
+            first = watcher.check()
+            self.assertEqual(first['build'], 'full')
+            self.assertTrue(os.path.exists(first['output']))
+            self.assertIsNone(watcher.check())
+
+            doc = Document(path)
+            doc.paragraphs[6].text = "Robots arrive in the harbour."
+            doc.save(path)
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+            self.assertIsNone(watcher.check())  # seen, not yet settled
+            second = watcher.check()
+            self.assertEqual(second['build'], 'full')
+            self.assertEqual(second['bookmarks_changed'], 0)  # the manuscript has no XE fields
+            self.assertIn("Robots arrive in the harbour.", [p.text for p in Document(second['output']).paragraphs])
+            self.assertEqual(watcher.builds, 2)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from lxml import etree
+
+from bookmark_registry import BookmarkRegistry
+from create_ebook_from_print import (convert_xe_tags_in_tree, convert_xe_tags_in_document, ebook_modified_partnames,
+                                     load_docx)
+from docx_package import save_document
+
+NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+
+DOCUMENT_XML = f'''<w:document xmlns:w="{NS['w']}"><w:body>
+<w:p>
+    <w:r><w:t>Cities built for robots </w:t></w:r>
+    <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+    <w:r><w:instrText xml:space="preserve"> XE "Artificial </w:instrText></w:r>
+    <w:r><w:rPr><w:b/></w:rPr><w:instrText>Intelligence" </w:instrText></w:r>
+    <w:r><w:fldChar w:fldCharType="end"/><w:t>keep me</w:t></w:r>
+</w:p>
+<w:p>
+    <w:r><w:t>See page </w:t></w:r>
+    <w:r><w:fldChar w:fldCharType="begin"/></w:r>
+    <w:r><w:instrText> PAGEREF x </w:instrText></w:r>
+    <w:r><w:fldChar w:fldCharType="separate"/></w:r>
+    <w:r><w:t>12</w:t></w:r>
+    <w:r><w:fldChar w:fldCharType="end"/></w:r>
+    <w:fldSimple w:instr=' XE "Design" '/>
+    <w:r><w:t>Design</w:t></w:r>
+</w:p>
+</w:body></w:document>'''
+
+class TestConvertXeTags(unittest.TestCase):
+    def setUp(self):
+        self.root = etree.fromstring(DOCUMENT_XML)
+        self.index_term_to_bookmark, self.bookmark_to_text = convert_xe_tags_in_tree(self.root)
+
+    def texts(self, path):
+        return [element.text for element in self.root.xpath(path, namespaces=NS)]
+
+    def test_split_and_simple_xe_fields_become_bookmarks(self):
+        """An XE instruction split across runs and an fldSimple XE each give one point bookmark."""
+        self.assertEqual(self.index_term_to_bookmark,
+                         {'Artificial Intelligence': 'xe_bookmark_0', 'Design': 'xe_bookmark_1'})
+        self.assertEqual(self.bookmark_to_text['xe_bookmark_0'], 'Cities built for robots keep me')
+        for start in self.root.xpath('//w:bookmarkStart', namespaces=NS):
+            end = start.getnext()
+            self.assertEqual(end.tag, '{%s}bookmarkEnd' % NS['w'])
+            self.assertEqual(end.get('{%s}id' % NS['w']), start.get('{%s}id' % NS['w']))
+
+    def test_only_xe_field_content_is_removed(self):
+        """XE runs disappear entirely; other fields and display text are untouched."""
+        self.assertEqual(self.texts('//w:instrText'), [' PAGEREF x '])
+        self.assertEqual(len(self.root.xpath('//w:fldChar', namespaces=NS)), 3)
+        self.assertEqual(self.root.xpath('//w:fldSimple', namespaces=NS), [])
+        self.assertEqual(self.texts('//w:t'), ['Cities built for robots ', 'keep me', 'See page ', '12', 'Design'])
+        self.assertEqual(len(self.root.xpath('//w:p[1]/w:r', namespaces=NS)), 2)
+
+class TestBookmarkIdAllocation(unittest.TestCase):
+    def test_new_bookmarks_avoid_existing_ids_and_names(self):
+        """Bookmarks already in the book keep their ids and names; converted XE fields get fresh ones."""
+        root = etree.fromstring(DOCUMENT_XML.replace(
+            '<w:p>', '<w:p><w:bookmarkStart w:id="0" w:name="xe_bookmark_0"/><w:bookmarkEnd w:id="0"/>'
+                     '<w:bookmarkStart w:id="2" w:name="_GoBack"/><w:bookmarkEnd w:id="2"/>', 1))
+        index_term_to_bookmark, _ = convert_xe_tags_in_tree(root)
+        self.assertEqual(index_term_to_bookmark,
+                         {'Artificial Intelligence': 'xe_bookmark_1', 'Design': 'xe_bookmark_2'})
+        starts = root.xpath('//w:bookmarkStart', namespaces=NS)
+        ids = [start.get('{%s}id' % NS['w']) for start in starts]
+        self.assertEqual(ids, ['0', '2', '1', '3'])
+        registry = BookmarkRegistry.from_tree(root)
+        self.assertEqual(len(registry), 4)
+        self.assertTrue(all(registry.is_point(name) for name in registry.names))
+
+    def test_equal_ids_in_two_parts_are_both_kept(self):
+        """A body and a footnotes part reusing an id keep their own bookmarks; new ids avoid both."""
+        body = etree.fromstring(DOCUMENT_XML.replace(
+            '<w:p>', '<w:p><w:bookmarkStart w:id="0" w:name="body"/><w:bookmarkEnd w:id="0"/>', 1))
+        notes = etree.fromstring(FOOTNOTES_XML.replace(
+            '<w:p>', '<w:p><w:bookmarkStart w:id="0" w:name="note"/><w:bookmarkEnd w:id="0"/>', 1))
+        registry = BookmarkRegistry.from_tree(body, notes)
+        self.assertEqual(len(registry), 2)
+        self.assertTrue(registry.is_point('body') and registry.is_point('note'))
+        self.assertEqual(registry.allocate_id(), '1')
+
+FOOTNOTES_XML = f'''<w:footnotes xmlns:w="{NS['w']}"><w:footnote w:id="1"><w:p>
+<w:r><w:footnoteRef/></w:r><w:r><w:t>Robots dream </w:t></w:r><w:fldSimple w:instr=' XE "Robot dreams" '/>
+</w:p></w:footnote></w:footnotes>'''
+
+def add_footnotes_part(path):
+    """Add FOOTNOTES_XML to the .docx at `path`, related from the main document."""
+    with zipfile.ZipFile(path) as package:
+        members = {name: package.read(name) for name in package.namelist()}
+    members['word/footnotes.xml'] = FOOTNOTES_XML.encode('utf-8')
+    members['[Content_Types].xml'] = members['[Content_Types].xml'].replace(b'</Types>',
+        b'<Override PartName="/word/footnotes.xml" ContentType='
+        b'"application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"/></Types>')
+    members['word/_rels/document.xml.rels'] = members['word/_rels/document.xml.rels'].replace(b'</Relationships>',
+        b'<Relationship Id="rId99" Target="footnotes.xml" Type='
+        b'"http://schemas.openxmlformats.org/officeDocument/2006/relationships/footnotes"/></Relationships>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, data in members.items():
+            package.writestr(name, data)
+
+class TestStoryParts(unittest.TestCase):
+    def test_footnote_xe_fields_are_converted_and_saved(self):
+        """XE fields in footnotes become bookmarks, named before the body's, and the part is written back."""
+        from docx import Document
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, 'book 8x10.docx')
+            output = os.path.join(temp_dir, 'book e-book.docx')
+            doc = Document()
+            paragraph = doc.add_paragraph('Body text ')
+            paragraph._p.append(etree.fromstring(f'''<w:fldSimple xmlns:w="{NS['w']}" w:instr=' XE "Body" '/>'''))
+            doc.save(source)
+            add_footnotes_part(source)
+
+            doc = load_docx(source)
+            index_term_to_bookmark, bookmark_to_text = convert_xe_tags_in_document(doc)
+            self.assertEqual(index_term_to_bookmark, {'Robot dreams': 'xe_bookmark_0', 'Body': 'xe_bookmark_1'})
+            self.assertEqual(bookmark_to_text['xe_bookmark_0'], 'Robots dream')
+            save_document(doc, source, output, ebook_modified_partnames(doc))
+
+            footnotes = etree.fromstring(zipfile.ZipFile(output).read('word/footnotes.xml'))
+            self.assertEqual(footnotes.xpath('//w:fldSimple', namespaces=NS), [])
+            self.assertEqual([start.get('{%s}name' % NS['w'])
+                              for start in footnotes.xpath('//w:bookmarkStart', namespaces=NS)], ['xe_bookmark_0'])
+            self.assertEqual(len(footnotes.xpath('//w:footnoteRef', namespaces=NS)), 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+E-book Validator
+
+Checks a finished e-book in one streaming pass over its story parts (the main
+document, headers, footers, footnotes, endnotes and comments), without
+extracting or loading the whole package:
+
+- no XE field is left,
+- every internal hyperlink (w:hyperlink w:anchor, HYPERLINK \\l field) names a
+  bookmark that exists somewhere in the book,
+- no index entry still ends in a page number, and
+- which xe_bookmark_* bookmarks nothing links to or refers to (REF, PAGEREF,
+  NOTEREF). These orphans are harmless, and --prune removes them to shrink
+  the e-book.
+
+Exits with status 1 if any check fails.
+
+Usage:
+  python validate_ebook.py <e-book.docx> [--prune] [--output <file>] [--json]
+
+Example: python validate_ebook.py "../mybooks/superArchItelligence Vol1 e-book.docx" --prune
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import Counter, namedtuple
+
+from lxml import etree
+
+from docx_fields import W, P, T, FLD_CHAR, FLD_SIMPLE, INSTR_TEXT
+from docx_stories import DOCUMENT_MEMBER, story_members
+from document_view import BACK_MATTER_HEADINGS
+from inspect_docx import FieldCounter
+
+BODY = W + 'body'
+TBL = W + 'tbl'
+BOOKMARK_START = W + 'bookmarkStart'
+BOOKMARK_END = W + 'bookmarkEnd'
+HYPERLINK = W + 'hyperlink'
+ID = W + 'id'
+NAME = W + 'name'
+ANCHOR = W + 'anchor'
+
+XE_BOOKMARK_PREFIX = 'xe_bookmark_'
+
+# A page number (or page range) after the last comma of an index entry
+_PAGE_NUMBER_RE = re.compile(r',\s*\d+(?:\s*[-–]\s*\d+)?\s*$')
+
+ValidationReport = namedtuple('ValidationReport', [
+    'xe_fields', 'internal_hyperlinks', 'dangling_anchors', 'orphaned_bookmarks',
+    'index_entries', 'index_entries_with_page_numbers',
+])
+
+
+def has_page_number(index_entry):
+    """True if the index entry text still ends in ', <page>' or ', <page>-<page>'."""
+    return _PAGE_NUMBER_RE.search(index_entry) is not None
+
+
+def validate_ebook(docx_path):
+    """Validate the e-book at `docx_path` in one streaming pass; return a ValidationReport.
+
+    `orphaned_bookmarks` maps each unreferenced xe_bookmark_* name to the member it is in."""
+    bookmarks = {}  # name -> member
+    anchors = Counter()  # bookmark names targeted by internal hyperlinks
+    xe_fields = 0
+    references = Counter()
+    index = _IndexChecker()
+
+    with zipfile.ZipFile(docx_path) as package:
+        names = package.namelist()
+        members = ([DOCUMENT_MEMBER] if DOCUMENT_MEMBER in names else []) + story_members(names)
+        for member in members:
+            fields = FieldCounter(anchors)  # fields don't continue from one part into the next
+            with package.open(member) as stream:
+                events = etree.iterparse(stream, tag=(P, TBL, INSTR_TEXT, FLD_CHAR, FLD_SIMPLE,
+                                                       BOOKMARK_START, HYPERLINK), huge_tree=True)
+                for _, element in events:
+                    tag = element.tag
+                    if tag == P or tag == TBL:
+                        if tag == P and member == DOCUMENT_MEMBER and element.getparent().tag == BODY:
+                            index.paragraph(''.join(t.text or '' for t in element.iter(T)))
+                        # Paragraphs and tables are the bulk of a story; drop each one once read
+                        element.clear()
+                        while element.getprevious() is not None:
+                            del element.getparent()[0]
+                    elif tag == BOOKMARK_START:
+                        name = element.get(NAME)
+                        if name:
+                            bookmarks[name] = member
+                    elif tag == HYPERLINK:
+                        anchor = element.get(ANCHOR)
+                        if anchor is not None:
+                            anchors[anchor] += 1
+                    else:
+                        fields.feed(element)
+            xe_fields += fields.fields.get('XE', 0)
+            references.update(fields.references)
+
+    return ValidationReport(
+        xe_fields=xe_fields,
+        internal_hyperlinks=sum(anchors.values()),
+        dangling_anchors=sorted(name for name in anchors if name not in bookmarks),
+        orphaned_bookmarks={name: member for name, member in sorted(bookmarks.items())
+                            if name.startswith(XE_BOOKMARK_PREFIX)
+                            and name not in anchors and name not in references},
+        index_entries=index.entries,
+        index_entries_with_page_numbers=index.with_page_numbers,
+    )
+
+
+class _IndexChecker:
+    """Follows the body paragraphs: finds the index (INDEX heading up to the back
+    matter) and collects its entries that still have a page number."""
+
+    def __init__(self):
+        self.in_index = False
+        self.done = False
+        self.entries = 0
+        self.with_page_numbers = []
+
+    def paragraph(self, text):
+        if self.done:
+            return
+        stripped = text.strip()
+        if not self.in_index:
+            self.in_index = stripped.upper() == "INDEX"
+        elif stripped.upper() in BACK_MATTER_HEADINGS:
+            self.done = True
+        elif stripped:
+            self.entries += 1
+            if has_page_number(stripped):
+                self.with_page_numbers.append(stripped)
+
+
+def problems(report):
+    """Error lines for the failed checks of a ValidationReport; empty if the e-book is valid."""
+    lines = []
+    if report.xe_fields:
+        lines.append(f"{report.xe_fields} XE fields remain")
+    if report.dangling_anchors:
+        lines.append(f"{len(report.dangling_anchors)} hyperlinks point to missing bookmarks: "
+                     + ", ".join(report.dangling_anchors))
+    if report.index_entries_with_page_numbers:
+        lines.append(f"{len(report.index_entries_with_page_numbers)} index entries still have page numbers: "
+                     + "; ".join(report.index_entries_with_page_numbers))
+    return lines
+
+
+def prune_bookmarks(docx_path, output_path, orphaned_bookmarks):
+    """
+    Copy the e-book at `docx_path` to `output_path` without the bookmarks in
+    `orphaned_bookmarks` (name -> member, as in ValidationReport). word/document.xml
+    is streamed block by block; other parts are only rewritten if they hold one.
+    """
+    from docx_package import write_package
+    from docx_stream import stream_transform_docx
+
+    names = set(orphaned_bookmarks)
+    pruned_ids = set()  # ids of the removed starts; their ends come later in document order
+    replacements = {}
+    with zipfile.ZipFile(docx_path) as package:
+        for member in sorted(set(orphaned_bookmarks.values()) - {DOCUMENT_MEMBER}):
+            root = etree.fromstring(package.read(member))
+            for element in list(root.iter(BOOKMARK_START, BOOKMARK_END)):
+                _prune_bookmark(element, names, pruned_ids)
+            replacements[member] = etree.tostring(root, encoding='utf-8', xml_declaration=True)
+
+    def prune_block(block):
+        if block.tag in (BOOKMARK_START, BOOKMARK_END):
+            return not _is_pruned(block, names, pruned_ids)  # a bookmark directly in the body
+        for element in list(block.iter(BOOKMARK_START, BOOKMARK_END)):
+            _prune_bookmark(element, names, pruned_ids)
+
+    if DOCUMENT_MEMBER in orphaned_bookmarks.values():
+        stream_transform_docx(docx_path, output_path, prune_block, replacements=replacements)
+    else:
+        write_package(docx_path, output_path, replacements)
+
+
+def _is_pruned(element, names, pruned_ids):
+    """True if the bookmarkStart or bookmarkEnd belongs to a bookmark being pruned (and note its id)."""
+    bookmark_id = element.get(ID)
+    if element.tag == BOOKMARK_START:
+        if element.get(NAME) not in names:
+            return False
+        pruned_ids.add(bookmark_id)
+        return True
+    return bookmark_id in pruned_ids
+
+
+def _prune_bookmark(element, names, pruned_ids):
+    """Remove the bookmark element if it is being pruned, keeping the text that follows it."""
+    if not _is_pruned(element, names, pruned_ids):
+        return
+    parent = element.getparent()
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or '') + element.tail
+        else:
+            parent.text = (parent.text or '') + element.tail
+    parent.remove(element)
+
+
+def format_report(report):
+    """Human-readable lines for a ValidationReport."""
+    return [
+        f"XE fields left: {report.xe_fields}",
+        f"Internal hyperlinks: {report.internal_hyperlinks} ({len(report.dangling_anchors)} to missing bookmarks)",
+        f"Index entries: {report.index_entries} ({len(report.index_entries_with_page_numbers)} with page numbers)",
+        f"Unreferenced {XE_BOOKMARK_PREFIX}* bookmarks: {len(report.orphaned_bookmarks)}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the links, bookmarks and index of a finished e-book.")
+    parser.add_argument("docx_file")
+    parser.add_argument("--prune", action="store_true",
+                        help=f"remove the {XE_BOOKMARK_PREFIX}* bookmarks nothing links to")
+    parser.add_argument("--output", help="where to write the pruned e-book (default: replace the input)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = validate_ebook(args.docx_file)
+        if args.json:
+            print(json.dumps(report._asdict(), indent=2))
+        else:
+            print("\n".join(format_report(report)))
+        if args.prune and report.orphaned_bookmarks:
+            output = args.output or args.docx_file + ".tmp"
+            prune_bookmarks(args.docx_file, output, report.orphaned_bookmarks)
+            if not args.output:
+                os.replace(output, args.docx_file)
+            print(f"Pruned {len(report.orphaned_bookmarks)} bookmarks: {args.output or args.docx_file}")
+    except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    errors = problems(report)
+    for line in errors:
+        print(f"Error: {line}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
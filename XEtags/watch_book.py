@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Watch Mode
+
+Rebuilds the e-book every time the print manuscript is saved, from one
+long-running process, so a save costs only the rebuild, not the interpreter
+start-up and imports. Each build reloads the manuscript; how long a one-paragraph
+edit takes is measured by the "watch rebuild" case of benchmarks/bench_book.py.
+
+The manuscript is polled (os.stat, every --interval seconds); a build starts
+once a new size/modification time has held for one poll, so a save still being
+written is not picked up half-way. Each build is incremental (see
+create_ebook_from_print.py --incremental):
+
+- a save that changed nothing in the package is skipped,
+- changed images, fonts and other pass-through parts are patched into the
+  existing e-book,
+- otherwise the pipeline runs on the reloaded manuscript, re-scoring only the
+  index terms whose bookmark texts changed (CachedBookmarkMatcher).
+
+With --link, the linked manuscript (link_citations.py) is rewritten too; with
+--epub, the EPUB.
+
+Usage:
+  python watch_book.py <8x10.docx> [--interval 0.5] [--link] [--epub] [--compact] [--max-image-size PIXELS]
+
+Example: python watch_book.py "../mybooks/superArchItelligence Vol1 8x10.docx" --link
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from build_cache import file_signature
+from pipeline_stats import PipelineStats
+
+
+class BookWatcher:
+    """Keeps what one manuscript's builds share, and rebuilds when the manuscript changes."""
+
+    def __init__(self, filename, link=False, epub=False, compact=False, max_image_size=None):
+        self.filename = filename
+        self.link = link
+        self.epub = epub
+        self.options = {"compact": compact, "max_image_size": max_image_size}
+        self.builds = 0
+        self._seen = file_signature(filename)  # at the last poll; the first poll builds
+        self._built = None  # of the manuscript the last build read
+
+    def check(self):
+        """Poll the manuscript once. Rebuild if it changed since the last build and is
+        unchanged since the previous poll; return the build summary, or None."""
+        signature = file_signature(self.filename)
+        previous, self._seen = self._seen, signature
+        if signature is None or signature == self._built or signature != previous:
+            return None
+        self._built = signature  # a manuscript that fails to build is retried once it changes
+        return self.build()
+
+    def build(self):
+        """Rebuild the outputs now; return the summary of the e-book build."""
+        from create_ebook_from_print import create_ebook
+
+        started = time.perf_counter()
+        with PipelineStats(trace_memory=False) as stats:
+            summary = create_ebook(self.filename, stats, incremental=True, **self.options)
+        if self.epub and summary["build"] != "up to date":
+            from epub_export import export_epub
+            summary["epub"] = export_epub(summary["output"])
+        if self.link:
+            from book import link_citations
+            summary["linked"] = link_citations(self.filename)
+        self.builds += 1
+        summary["bookmarks_changed"] = stats.counters.get("bookmarks_changed", 0)
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        return summary
+
+    def run(self, interval=0.5):
+        """Poll every `interval` seconds until interrupted, printing a line per build."""
+        while True:
+            try:
+                summary = self.check()
+            except Exception as e:
+                print(f"Error: {e}")
+            else:
+                if summary is not None:
+                    print(format_build(summary))
+            time.sleep(interval)
+
+
+def format_build(summary):
+    """One line for the console about a watch build."""
+    outputs = [os.path.basename(summary["output"])]
+    outputs += [os.path.basename(summary[key]["output"]) for key in ("epub", "linked") if key in summary]
+    detail = f", {summary['bookmarks_changed']} index texts changed" if summary["build"] == "full" else ""
+    return (f"{time.strftime('%H:%M:%S')} {summary['build']} in {summary['seconds']:.2f}s{detail}: "
+            f"{', '.join(outputs)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the e-book whenever the print manuscript is saved.")
+    parser.add_argument("input_filename")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls (default 0.5)")
+    parser.add_argument("--link", action="store_true", help="also rewrite the linked manuscript (link_citations.py)")
+    parser.add_argument("--epub", action="store_true", help="also rewrite the EPUB (epub_export.py)")
+    parser.add_argument("--compact", action="store_true", help="compact the e-book (see create_ebook_from_print.py)")
+    parser.add_argument("--max-image-size", type=int, metavar="PIXELS",
+                        help="scale images down for e-readers (see create_ebook_from_print.py)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_filename):
+        print(f"Error: Input file not found: {args.input_filename}")
+        sys.exit(1)
+    watcher = BookWatcher(args.input_filename, link=args.link, epub=args.epub, compact=args.compact,
+                          max_image_size=args.max_image_size)
+    print(f"Watching {args.input_filename} (Ctrl+C to stop)")
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        print(f"\nStopped after {watcher.builds} builds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+
+Times every public function of create_ebook_from_print.py and link_citations.py,
+and the e-book steps around them (validation and pruning, compaction, EPUB
+export, incremental and watch rebuilds), on synthetic books from make_book.py,
+at one or more book sizes (body paragraphs).
+Functions that modify the document get a freshly loaded copy for each run; the
+load is not part of the timing. Output printed by the functions is suppressed.
+
+Usage:
+  python bench_book.py [--sizes 10k,100k,1M] [--repeat N] [--memory] [--only REGEX] [--output FILE]
+
+Example: python bench_book.py --sizes 10k,100k --memory --output bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'XEtags'))
+sys.path.insert(0, os.path.join(HERE, '..', 'linkcitations'))
+
+
+import create_ebook_from_print as ebook
+import link_citations as citations
+from docx_compact import compact_document
+from epub_export import export_epub
+from make_book import build_book, index_terms
+from pipeline_stats import PipelineStats
+from validate_ebook import prune_bookmarks, validate_ebook
+from watch_book import BookWatcher
+
+SIMILARITY_TERMS = 20  # Index terms scored against every bookmark text by calculate_text_similarity
+
+
+def parse_size(text):
+    """'10000', '10k' or '1M' -> number of paragraphs."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*', text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    scale = {'': 1, 'k': 1000, 'm': 1000000}[match.group(2).lower()]
+    return int(float(match.group(1)) * scale)
+
+
+def make_fixture(directory, paragraphs):
+    """Generate the benchmark book for `paragraphs`; XE fields, references and citations scale with it."""
+    path = os.path.join(directory, f"bench {paragraphs} 8x10.docx")
+    summary = build_book(path, paragraphs=paragraphs, chapters=max(10, paragraphs // 5000),
+                         xe_fields=max(100, paragraphs // 100), references=max(20, paragraphs // 1000),
+                         citations=max(50, paragraphs // 200))
+    summary["directory"] = directory
+    return summary
+
+
+class Case:
+    """One benchmark: `setup(fixture)` builds the arguments (untimed), `run(*args)` is timed."""
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda fixture: ())
+
+
+def _load(fixture):
+    return ebook.load_docx(fixture["path"])
+
+
+def _doc(fixture):
+    return (_load(fixture),)
+
+
+def _output(fixture, name):
+    return os.path.join(fixture["directory"], name)
+
+
+def _static_index_doc(fixture):
+    """A document at the point of the pipeline where the index is static text."""
+    doc = _load(fixture)
+    view = ebook.DocumentView(doc)
+    ebook.convert_index_to_static_text(doc, view)
+    return doc, view
+
+
+def _link_index_args(fixture):
+    doc, view = _static_index_doc(fixture)
+    index_term_to_bookmark, bookmark_to_text = ebook.convert_xe_tags_in_document(doc)
+    return doc, index_term_to_bookmark, bookmark_to_text, view
+
+
+def _linked_index_doc(fixture):
+    """A document at the point of the pipeline where XE fields are bookmarks and the index is linked."""
+    doc, index_term_to_bookmark, bookmark_to_text, view = _link_index_args(fixture)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ebook.link_index_entries_to_bookmarks(doc, index_term_to_bookmark, bookmark_to_text, view)
+    return doc, view
+
+
+def _bookmark_texts(fixture):
+    if "bookmark_to_text" not in fixture:
+        _, fixture["index_term_to_bookmark"], fixture["bookmark_to_text"], _ = _link_index_args(fixture)
+    return fixture["index_term_to_bookmark"], fixture["bookmark_to_text"]
+
+
+def _similarity(fixture):
+    index_term_to_bookmark, bookmark_to_text = _bookmark_texts(fixture)
+    return list(index_term_to_bookmark)[:SIMILARITY_TERMS], list(bookmark_to_text.values())
+
+
+def run_similarity(terms, texts):
+    for term in terms:
+        for text in texts:
+            ebook.calculate_text_similarity(term, text)
+
+
+def _matcher(fixture):
+    index_term_to_bookmark, bookmark_to_text = _bookmark_texts(fixture)
+    return list(index_term_to_bookmark), bookmark_to_text
+
+
+def _exact_matcher(fixture):
+    index_term_to_bookmark, _ = _bookmark_texts(fixture)
+    return index_terms(fixture["index_entries"]), index_term_to_bookmark
+
+
+def run_exact_matcher(terms, index_term_to_bookmark):
+    matcher = ebook.ExactTermMatcher(index_term_to_bookmark)
+    for term in terms:
+        matcher.first_containing(term)
+
+
+def run_matcher(terms, bookmark_to_text):
+    matcher = ebook.BookmarkTextMatcher(bookmark_to_text)
+    for term in terms:
+        matcher.best_match(term)
+
+
+def _ebook_hyperlinks(fixture):
+    return (_load(fixture).paragraphs,)
+
+
+def run_ebook_hyperlinks(paragraphs):
+    for i, paragraph in enumerate(paragraphs):
+        ebook.add_hyperlink_to_paragraph(paragraph, "see also", f"xe_bookmark_{i}")
+
+
+def run_sanitize(names):
+    for name in names:
+        ebook.sanitize_bookmark_name(name)
+
+
+def _main_args(fixture):
+    path = shutil.copy(fixture["path"], _output(fixture, "main 8x10.docx"))
+    return (["create_ebook_from_print.py", path],)
+
+
+def run_main(argv):
+    saved, sys.argv = sys.argv, argv
+    try:
+        ebook.main()
+    finally:
+        sys.argv = saved
+
+
+def _copy(fixture, name):
+    return shutil.copy(fixture["path"], _output(fixture, f"{name} 8x10.docx"))
+
+
+def _edited_book(fixture, name, build, edit=True):
+    """A copy of the book built once by `build(path)`, then (with `edit`) with one paragraph edited."""
+    from docx import Document
+    path = _copy(fixture, name)
+    doc = Document(path)
+    doc.save(path)  # python-docx's serialization, so the edit below only changes word/document.xml
+    with contextlib.redirect_stdout(io.StringIO()):
+        build(path)
+    if edit:
+        paragraphs = doc.paragraphs
+        paragraphs[len(paragraphs) // 2].add_run(" Edited.")
+        doc.save(path)
+    return path
+
+
+def _watch_rebuild(fixture):
+    """A watcher that has built the book once, and the book with one paragraph edited since."""
+    watchers = []
+
+    def first_build(path):
+        watchers.append(BookWatcher(path))
+        watchers[0].build()
+    _edited_book(fixture, "watch", first_build)
+    return (watchers[0],)
+
+
+def run_incremental(path):
+    ebook.create_ebook(path, incremental=True)
+
+
+def _incremental_rebuild(fixture, edit=True):
+    return (_edited_book(fixture, "incremental", run_incremental, edit),)
+
+
+def _ebook_output(fixture):
+    """The e-book of the benchmark book, built once per fixture."""
+    if "ebook" not in fixture:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fixture["ebook"] = ebook.create_ebook(_copy(fixture, "built"))["output"]
+    return fixture["ebook"]
+
+
+def _prune_args(fixture):
+    """The book with its XE fields turned into bookmarks that nothing links to, all to be pruned."""
+    path = _output(fixture, "unlinked.docx")
+    if not os.path.exists(path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            ebook.convert_xe_tags_to_bookmarks(fixture["path"], path)
+    return path, _output(fixture, "pruned.docx"), validate_ebook(path).orphaned_bookmarks
+
+
+def _references_text(fixture):
+    if "references_text" not in fixture:
+        references = citations.iter_references(_load(fixture))
+        fixture["references_text"] = "\n".join(reference.text for reference in references)
+    return (fixture["references_text"],)
+
+
+def run_iter_references(doc):
+    for _ in citations.iter_references(doc):
+        pass
+
+
+def _citation_paragraphs(fixture):
+    return _load(fixture).paragraphs, fixture["citations_to_urls"]
+
+
+def run_link_paragraphs(paragraphs, citations_to_urls):
+    matcher = citations.CitationMatcher(citations_to_urls)
+    for paragraph in paragraphs:
+        matcher.link_paragraph(paragraph)
+
+
+def _citation_hyperlinks(fixture):
+    doc = _load(fixture)
+    return doc.paragraphs, list(fixture["citations_to_urls"].items())
+
+
+def run_add_hyperlink(paragraphs, items):
+    for paragraph, (key, url) in zip(paragraphs, items * (len(paragraphs) // max(1, len(items)) + 1)):
+        paragraph._p.append(citations.add_hyperlink(paragraph, key, url))
+
+
+def run_add_hyperlink_to_paragraph(paragraphs, items):
+    for paragraph, (key, url) in zip(paragraphs, items * (len(paragraphs) // max(1, len(items)) + 1)):
+        element = citations.add_hyperlink_to_paragraph(paragraph, key, url)
+        if element is not None:
+            paragraph._p.append(element)
+
+
+def _linked_output(fixture):
+    if "linked" not in fixture:
+        fixture["linked"] = _output(fixture, "bench linked.docx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            citations.link_citations_in_document(fixture["path"], fixture["linked"])
+    return fixture["linked"], fixture["linked"]
+
+
+CASES = [
+    # create_ebook_from_print.py
+    Case("load_docx", ebook.load_docx, lambda f: (f["path"],)),
+    Case("set_font_georgia", ebook.set_font_georgia, _doc),
+    Case("set_font_georgia_styles", ebook.set_font_georgia_styles, _doc),
+    Case("adjust_title_page", ebook.adjust_title_page, _doc),
+    Case("adjust_copyright_page", ebook.adjust_copyright_page, _doc),
+    Case("convert_index_to_static_text", ebook.convert_index_to_static_text, _doc),
+    Case("check_index_entries_single_page_number", ebook.check_index_entries_single_page_number,
+         _static_index_doc),
+    Case("convert_xe_tags_in_tree", ebook.convert_xe_tags_in_tree, lambda f: (_load(f).element,)),
+    Case("convert_xe_tags_in_document", ebook.convert_xe_tags_in_document, _doc),
+    Case("convert_xe_tags_to_bookmarks", ebook.convert_xe_tags_to_bookmarks,
+         lambda f: (f["path"], _output(f, "bookmarks.docx"))),
+    Case("stream_xe_tags_to_bookmarks", ebook.stream_xe_tags_to_bookmarks,
+         lambda f: (f["path"], _output(f, "streamed.docx"))),
+    Case("verify_no_xe_tags", ebook.verify_no_xe_tags, lambda f: _linked_index_doc(f)[:1]),
+    Case("link_index_entries_to_bookmarks", ebook.link_index_entries_to_bookmarks, _link_index_args),
+    Case("calculate_text_similarity", run_similarity, _similarity),
+    Case("ExactTermMatcher", run_exact_matcher, _exact_matcher),
+    Case("BookmarkTextMatcher", run_matcher, _matcher),
+    Case("add_hyperlink_to_paragraph (ebook)", run_ebook_hyperlinks, _ebook_hyperlinks),
+    Case("sanitize_bookmark_name", run_sanitize, lambda f: (index_terms(f["index_entries"]),)),
+    Case("validate_index", ebook.validate_index, _linked_index_doc),
+    Case("compact_document", compact_document, lambda f: _linked_index_doc(f)[:1]),
+    Case("create_ebook", ebook.create_ebook, lambda f: (_copy(f, "create"),)),
+    Case("create_ebook main", run_main, _main_args),
+    Case("build_ebook --compact --epub", lambda path: ebook.build_ebook(path, compact=True, epub=True),
+         lambda f: (_copy(f, "build"),)),
+    Case("incremental rebuild (one paragraph edited)", run_incremental, _incremental_rebuild),
+    Case("incremental rebuild (unchanged)", run_incremental, lambda f: _incremental_rebuild(f, edit=False)),
+    Case("watch rebuild (one paragraph edited)", BookWatcher.build, _watch_rebuild),
+    # validate_ebook.py, epub_export.py
+    Case("validate_ebook", validate_ebook, lambda f: (_ebook_output(f),)),
+    Case("prune_bookmarks", prune_bookmarks, _prune_args),
+    Case("export_epub", export_epub, lambda f: (_ebook_output(f), _output(f, "bench.epub"))),
+    # link_citations.py
+    Case("extract_urls_from_text", citations.extract_urls_from_text, _references_text),
+    Case("iter_references", run_iter_references, _doc),
+    Case("parse_references", citations.parse_references, _references_text),
+    Case("add_citation_section_from_pdf", citations.add_citation_section_from_pdf,
+         lambda f: (_load(f), f["citations_to_urls"])),
+    Case("add_hyperlink", run_add_hyperlink, _citation_hyperlinks),
+    Case("add_hyperlink_to_paragraph (citations)", run_add_hyperlink_to_paragraph, _citation_hyperlinks),
+    Case("CitationMatcher", run_link_paragraphs, _citation_paragraphs),
+    Case("link_citations_in_document", citations.link_citations_in_document,
+         lambda f: (f["path"], _output(f, "linked.docx"))),
+    Case("compare_test_output", citations.compare_test_output, _linked_output),
+    Case("create_test_input_file", citations.create_test_input_file,
+         lambda f: (_output(f, "test_link_input.docx"),)),
+]
+# extract_references_from_pdf is not benchmarked: it needs a PDF of the book and PyPDF2.
+
+
+def run_case(case, fixture, stats, repeat):
+    """Run `case` `repeat` times; return the stage record of the fastest run."""
+    best = None
+    for _ in range(repeat):
+        args = case.setup(fixture)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with stats.stage(case.name) as record:
+                case.run(*args)
+        if best is None or record["wall_seconds"] < best["wall_seconds"]:
+            best = record
+    stats.stages = [s for s in stats.stages if s["stage"] != case.name] + [best]
+    return best
+
+
+def run_benchmarks(sizes, repeat=1, memory=False, only=None):
+    """Benchmark every case at every size; return a list of result rows."""
+    rows = []
+    cases = [case for case in CASES if not only or re.search(only, case.name)]
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            fixture = make_fixture(directory, size)
+            print(f"\n{size} paragraphs ({fixture['xe_fields']} XE fields, {fixture['references']} references, "
+                  f"{fixture['citations']} citations) generated in {time.perf_counter() - started:.2f}s")
+            with PipelineStats(trace_memory=memory) as stats:
+                for case in cases:
+                    record = run_case(case, fixture, stats, repeat)
+                    row = {"size": size, "case": case.name, "wall_seconds": record["wall_seconds"],
+                           "cpu_seconds": record["cpu_seconds"]}
+                    if "peak_memory_bytes" in record:
+                        row["peak_memory_bytes"] = record["peak_memory_bytes"]
+                    rows.append(row)
+                    print(format_row(row))
+    return rows
+
+
+def format_row(row):
+    memory = f"{row['peak_memory_bytes'] / 1e6:10.1f} MB" if "peak_memory_bytes" in row else ""
+    return f"  {row['case']:<42} {row['wall_seconds']:10.4f}s {row['cpu_seconds']:10.4f}s cpu{memory}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the e-book and citation functions on synthetic books.")
+    parser.add_argument("--sizes", default="10k",
+                        help="comma-separated book sizes in paragraphs, e.g. 10k,100k,1M (default 10k)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is reported")
+    parser.add_argument("--memory", action="store_true", help="also record peak memory (tracemalloc; slower)")
+    parser.add_argument("--only", help="only run cases whose name matches this regular expression")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    rows = run_benchmarks(sizes, repeat=args.repeat, memory=args.memory, only=args.only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"python": sys.version.split()[0], "results": rows}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
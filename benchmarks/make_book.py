@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Synthetic Book Generator
+
+Writes a .docx "8x10" print manuscript shaped like the real books, for tests and
+benchmarks: title and copyright pages, chapters of body paragraphs with several
+runs each, XE index fields (some with the instruction split across runs), author-
+year citations, a References section with URLs, a static INDEX section with
+letter groups, and the ACKNOWLEDGEMENTS / ABOUT THE AUTHOR back matter.
+
+document.xml is streamed straight into the zip, so books of a million paragraphs
+can be generated in seconds without building them through python-docx.
+
+Usage:
+  python make_book.py <output.docx> [--paragraphs N] [--chapters N] [--xe-fields N] ...
+
+Example: python make_book.py "bench 8x10.docx" --paragraphs 100000 --xe-fields 2000
+"""
+
+import argparse
+import random
+import struct
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+PIC_NS = 'http://schemas.openxmlformats.org/drawingml/2006/picture'
+REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+WORDS = ("system network model agent memory planning design city building robot vision "
+         "language learning data street housing transport energy policy sensor safety "
+         "future human machine space urban control signal value risk trust").split()
+ADJECTIVES = ("Adaptive Autonomous Bayesian Civic Cognitive Distributed Embodied Ethical "
+              "Generative Hybrid Intelligent Kinetic Modular Neural Open Predictive Resilient "
+              "Robotic Semantic Smart Spatial Synthetic Urban Virtual").split()
+NOUNS = ("Agents Architecture Buildings Cities Control Design Ethics Governance Housing "
+         "Infrastructure Interfaces Learning Logistics Mapping Memory Mobility Networks "
+         "Planning Robots Safety Sensors Spaces Streets Systems Transport Vision").split()
+SYLLABLES = "ba be bo da de di ka ke ko la le li ma me mo na ne no ra re ro sa se ta te to va ve zo".split()
+
+CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Default Extension="png" ContentType="image/png"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/word/theme/theme1.xml" ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>
+</Types>'''
+
+PACKAGE_RELS = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{REL_TYPE}/officeDocument" Target="word/document.xml"/>
+</Relationships>'''
+
+STYLES = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="{W_NS}">
+<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:asciiTheme="minorHAnsi" w:hAnsiTheme="minorHAnsi"/><w:sz w:val="22"/></w:rPr></w:rPrDefault></w:docDefaults>
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:rFonts w:asciiTheme="majorHAnsi" w:hAnsiTheme="majorHAnsi"/><w:b/><w:sz w:val="32"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="1"/></w:pPr><w:rPr><w:rFonts w:asciiTheme="majorHAnsi" w:hAnsiTheme="majorHAnsi"/><w:b/><w:sz w:val="26"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:rPr><w:rFonts w:ascii="Cambria" w:hAnsi="Cambria"/><w:sz w:val="72"/></w:rPr></w:style>
+<w:style w:type="character" w:default="1" w:styleId="DefaultParagraphFont"><w:name w:val="Default Paragraph Font"/></w:style>
+</w:styles>'''
+
+THEME = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<a:theme xmlns:a="{A_NS}" name="Office Theme"><a:themeElements>
+<a:clrScheme name="Office"><a:dk1><a:sysClr val="windowText" lastClr="000000"/></a:dk1><a:lt1><a:sysClr val="window" lastClr="FFFFFF"/></a:lt1><a:dk2><a:srgbClr val="1F497D"/></a:dk2><a:lt2><a:srgbClr val="EEECE1"/></a:lt2><a:accent1><a:srgbClr val="4F81BD"/></a:accent1><a:accent2><a:srgbClr val="C0504D"/></a:accent2><a:accent3><a:srgbClr val="9BBB59"/></a:accent3><a:accent4><a:srgbClr val="8064A2"/></a:accent4><a:accent5><a:srgbClr val="4BACC6"/></a:accent5><a:accent6><a:srgbClr val="F79646"/></a:accent6><a:hlink><a:srgbClr val="0000FF"/></a:hlink><a:folHlink><a:srgbClr val="800080"/></a:folHlink></a:clrScheme>
+<a:fontScheme name="Office"><a:majorFont><a:latin typeface="Calibri Light"/><a:ea typeface=""/><a:cs typeface=""/></a:majorFont><a:minorFont><a:latin typeface="Calibri"/><a:ea typeface=""/><a:cs typeface=""/></a:minorFont></a:fontScheme>
+<a:fmtScheme name="Office"><a:fillStyleLst><a:solidFill><a:schemeClr val="phClr"/></a:solidFill><a:solidFill><a:schemeClr val="phClr"/></a:solidFill><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:fillStyleLst><a:lnStyleLst><a:ln w="9525"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln><a:ln w="25400"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln><a:ln w="38100"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln></a:lnStyleLst><a:effectStyleLst><a:effectStyle><a:effectLst/></a:effectStyle><a:effectStyle><a:effectLst/></a:effectStyle><a:effectStyle><a:effectLst/></a:effectStyle></a:effectStyleLst><a:bgFillStyleLst><a:solidFill><a:schemeClr val="phClr"/></a:solidFill><a:solidFill><a:schemeClr val="phClr"/></a:solidFill><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:bgFillStyleLst></a:fmtScheme>
+</a:themeElements></a:theme>'''
+
+
+def make_png(width, height, rnd):
+    """A noisy RGB PNG (noise keeps it from compressing, like a photo would)."""
+    row_bytes = width * 3
+    raw = b''.join(b'\x00' + rnd.randbytes(row_bytes) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 1))
+            + chunk(b'IEND', b''))
+
+
+def _unique_names(count, rnd):
+    """`count` distinct capitalized surnames matching [A-Z][a-z]+."""
+    names = {}  # dict keeps insertion order, so the result only depends on the seed
+    while len(names) < count:
+        names[''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()] = None
+    return list(names)
+
+
+def index_terms(count):
+    """`count` distinct index terms such as 'Adaptive Cities' or 'Adaptive Cities II'.
+
+    Repeats get a roman numeral rather than a digit, so index entries keep exactly
+    one page number."""
+    terms = []
+    repeat = 0
+    while len(terms) < count:
+        suffix = f" {_roman(repeat + 1)}" if repeat else ""
+        for adjective in ADJECTIVES:
+            for noun in NOUNS:
+                if len(terms) == count:
+                    return terms
+                terms.append(f"{adjective} {noun}{suffix}")
+        repeat += 1
+    return terms
+
+
+def _roman(number):
+    numerals = []
+    for value, numeral in ((1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+                           (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')):
+        count, number = divmod(number, value)
+        numerals.append(numeral * count)
+    return ''.join(numerals)
+
+
+def _text_run(text, rsid=None, font=None):
+    attributes = f' w:rsidR="{rsid}"' if rsid else ''
+    properties = f'<w:rPr><w:rFonts w:ascii="{font}" w:hAnsi="{font}"/></w:rPr>' if font else ''
+    return f'<w:r{attributes}>{properties}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+
+
+def _paragraph(text='', style=None, runs=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    body = ''.join(runs) if runs is not None else (_text_run(text) if text else '')
+    return f'<w:p>{properties}{body}</w:p>'
+
+
+def _xe_field(term, split):
+    quoted = f'"{term}"'
+    parts = [f' XE {quoted[:len(quoted) // 2]}', f'{quoted[len(quoted) // 2:]} '] if split else [f' XE {quoted} ']
+    instruction = ''.join(f'<w:r><w:instrText xml:space="preserve">{escape(part)}</w:instrText></w:r>'
+                          for part in parts)
+    return ('<w:r><w:fldChar w:fldCharType="begin"/></w:r>' + instruction
+            + '<w:r><w:fldChar w:fldCharType="end"/></w:r>')
+
+
+def _picture_run(number, rel_id, width, height):
+    cx, cy = width * 9525, height * 9525
+    return (f'<w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{number}" name="Picture {number}"/>'
+            f'<a:graphic><a:graphicData uri="{PIC_NS}"><pic:pic>'
+            f'<pic:nvPicPr><pic:cNvPr id="{number}" name="image{number}.png"/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+            f'</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r>')
+
+
+def build_book(path, paragraphs=1000, chapters=10, runs_per_paragraph=3, xe_fields=100,
+               split_xe_every=3, index_entries=None, references=20, citations=50,
+               font_overrides_every=10, images=0, image_size=(1200, 900), seed=0):
+    """
+    Write a synthetic manuscript to `path` and return a summary dict.
+
+    `paragraphs` body paragraphs are spread over `chapters` chapters, each with
+    `runs_per_paragraph` text runs. `xe_fields` XE fields are placed in body
+    paragraphs, every `split_xe_every`-th one with its instruction split across two
+    runs (0 disables splitting). The index lists `index_entries` entries (default:
+    one per XE term). `citations` body paragraphs cite one of `references`
+    bibliography entries as '(Name 2020)'. Every `font_overrides_every`-th run names
+    Arial directly (0 disables). `images` noisy PNGs of `image_size` pixels are
+    embedded in the body.
+    """
+    rnd = random.Random(seed)
+    paragraphs = max(paragraphs, 1)
+    chapters = max(1, min(chapters, paragraphs))
+    terms = index_terms(xe_fields)
+    if index_entries is None:
+        index_entries = xe_fields
+    authors = _unique_names(references, rnd)
+    years = [rnd.randint(1995, 2025) for _ in authors]
+
+    xe_at = set(rnd.sample(range(paragraphs), min(xe_fields, paragraphs)))
+    citation_at = set(rnd.sample(range(paragraphs), min(citations, paragraphs))) if authors else set()
+    image_at = set(rnd.sample(range(paragraphs), min(images, paragraphs)))
+    chapter_length = paragraphs // chapters
+
+    document_rels = [
+        f'<Relationship Id="rIdStyles" Type="{REL_TYPE}/styles" Target="styles.xml"/>',
+        f'<Relationship Id="rIdTheme" Type="{REL_TYPE}/theme" Target="theme/theme1.xml"/>',
+    ]
+    media = []
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        with package.open('word/document.xml', 'w', force_zip64=True) as stream:
+            def write(xml):
+                stream.write(xml.encode('utf-8'))
+
+            write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}" xmlns:wp="{WP_NS}" '
+                  f'xmlns:a="{A_NS}" xmlns:pic="{PIC_NS}"><w:body>')
+
+            # Title and copyright pages
+            write(_paragraph("superArchItelligence", style="Title"))
+            write(_paragraph("Redesigning the real world"))
+            write(_paragraph("for artificial intelligence"))
+            write(_paragraph())
+            write(_paragraph())
+            write(_paragraph("Alan G Street"))
+            write(_paragraph())
+            write(_paragraph("Copyright © 2025 Alan G Street. All rights reserved."))
+
+            xe_number = 0
+            run_number = 0
+            for i in range(paragraphs):
+                if i % chapter_length == 0 and i // chapter_length < chapters:
+                    write(_paragraph(f"Chapter {i // chapter_length + 1}", style="Heading1"))
+                runs = []
+                for _ in range(runs_per_paragraph):
+                    run_number += 1
+                    font = "Arial" if font_overrides_every and run_number % font_overrides_every == 0 else None
+                    text = " ".join(rnd.choice(WORDS) for _ in range(8)) + " "
+                    runs.append(_text_run(text, rsid=f"{run_number % 0xFFFFFF:08X}", font=font))
+                if i in xe_at:
+                    term = terms[xe_number]
+                    split = bool(split_xe_every) and xe_number % split_xe_every == 0
+                    runs.insert(1, _text_run(f"{term} ") + _xe_field(term, split))
+                    xe_number += 1
+                if i in citation_at:
+                    k = rnd.randrange(len(authors))
+                    runs.append(_text_run(f"as shown before ({authors[k]} {years[k]})."))
+                if i in image_at:
+                    number = len(media) + 1
+                    rel_id = f"rIdImage{number}"
+                    media.append(make_png(*image_size, rnd))
+                    document_rels.append(f'<Relationship Id="{rel_id}" Type="{REL_TYPE}/image" '
+                                         f'Target="media/image{number}.png"/>')
+                    runs.append(_picture_run(number, rel_id, *image_size))
+                write(_paragraph(runs=runs))
+
+            # Bibliography
+            if authors:
+                write(_paragraph("References", style="Heading1"))
+                for author, year in zip(authors, years):
+                    title = " ".join(rnd.choice(WORDS) for _ in range(6)).capitalize()
+                    write(_paragraph(f'{author}, {rnd.choice(ADJECTIVES)}. {year}. "{title}." '
+                                     f'Journal of Examples. https://example.com/{author.lower()}{year}'))
+
+            # Static index, still wrapped in its INDEX field like Word leaves it
+            write(_paragraph("INDEX", style="Heading1"))
+            entries = sorted(index_terms(index_entries))  # Same terms as the XE fields, in order
+            letter = None
+            for n, entry in enumerate(entries):
+                if entry[0] != letter:
+                    letter = entry[0]
+                    write(_paragraph(letter))
+                runs = [_text_run(f"{entry}, {rnd.randint(1, 600)}")]
+                if n == 0:
+                    runs.insert(0, '<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+                                   '<w:r><w:instrText xml:space="preserve"> INDEX \\e "," \\c "1" </w:instrText></w:r>'
+                                   '<w:r><w:fldChar w:fldCharType="separate"/></w:r>')
+                if n == len(entries) - 1:
+                    runs.append('<w:r><w:fldChar w:fldCharType="end"/></w:r>')
+                write(_paragraph(runs=runs))
+
+            write(_paragraph("ACKNOWLEDGEMENTS", style="Heading1"))
+            write(_paragraph("Thanks to everyone who read early drafts."))
+            write(_paragraph("ABOUT THE AUTHOR", style="Heading1"))
+            write(_paragraph("Alan G Street writes about architecture and artificial intelligence."))
+            write('<w:sectPr><w:pgSz w:w="11520" w:h="14400"/></w:sectPr></w:body></w:document>')
+
+        package.writestr('[Content_Types].xml', CONTENT_TYPES)
+        package.writestr('_rels/.rels', PACKAGE_RELS)
+        package.writestr('word/_rels/document.xml.rels',
+                         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         + ''.join(document_rels) + '</Relationships>')
+        package.writestr('word/styles.xml', STYLES)
+        package.writestr('word/theme/theme1.xml', THEME)
+        for number, png in enumerate(media, start=1):
+            package.writestr(f'word/media/image{number}.png', png)
+
+    return {
+        "path": path,
+        "paragraphs": paragraphs,
+        "chapters": chapters,
+        "xe_fields": xe_number,
+        "index_entries": len(entries),
+        "references": len(authors),
+        "citations": len(citation_at),
+        "images": len(media),
+        "citations_to_urls": {f"{author} {year}": f"https://example.com/{author.lower()}{year}"
+                              for author, year in zip(authors, years)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic 8x10 manuscript .docx.")
+    parser.add_argument("output")
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--runs-per-paragraph", type=int, default=3)
+    parser.add_argument("--xe-fields", type=int, default=100)
+    parser.add_argument("--split-xe-every", type=int, default=3)
+    parser.add_argument("--index-entries", type=int, default=None)
+    parser.add_argument("--references", type=int, default=20)
+    parser.add_argument("--citations", type=int, default=50)
+    parser.add_argument("--images", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = build_book(args.output, paragraphs=args.paragraphs, chapters=args.chapters,
+                         runs_per_paragraph=args.runs_per_paragraph, xe_fields=args.xe_fields,
+                         split_xe_every=args.split_xe_every, index_entries=args.index_entries,
+                         references=args.references, citations=args.citations,
+                         images=args.images, seed=args.seed)
+    summary.pop("citations_to_urls")
+    print(", ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
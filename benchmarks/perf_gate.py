@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Performance Regression Gate
+
+Runs a fixed set of end-to-end scenarios (the e-book pipeline and citation
+linking) on a synthetic book from make_book.py, compares wall time and peak
+memory with a stored baseline, and exits with status 1 if a scenario got
+slower or bigger than the budget allows. Every run is appended to a local
+history file; the first run (or --save-baseline) becomes the baseline.
+
+Each scenario runs in a fresh Python process, so imports and caches of one
+scenario don't affect the next, and peak memory is the process's peak resident
+set size (which, unlike tracemalloc, includes lxml's trees). The fastest of
+--repeat runs is compared.
+
+Timings depend on the machine: keep the history file local (it is not checked
+in) and record a new baseline after changing machines or Python versions.
+
+Usage:
+  python perf_gate.py [--size 10k] [--repeat 3] [--wall-budget 25] [--memory-budget 10]
+                      [--min-seconds 0.05] [--history FILE] [--save-baseline]
+
+Example: python perf_gate.py --size 50k --wall-budget 15
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(HERE, 'perf_history.json')
+
+
+def _ebook(path, **options):
+    from create_ebook_from_print import create_ebook
+    create_ebook(path, **options)
+
+
+def _link(path):
+    from link_citations import link_citations
+    link_citations(path)
+
+
+# Scenario name -> function run on the manuscript path, in a process of its own
+SCENARIOS = {
+    "ebook": _ebook,
+    "ebook compact": lambda path: _ebook(path, compact=True),
+    "link citations": _link,
+}
+
+
+def run_scenario(name, path):
+    """Run one scenario in this process; return {"wall_seconds", "peak_memory_bytes"}."""
+    sys.path.insert(0, os.path.join(HERE, '..', 'XEtags'))
+    sys.path.insert(0, os.path.join(HERE, '..', 'linkcitations'))
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        SCENARIOS[name](path)
+    result = {"wall_seconds": round(time.perf_counter() - started, 4)}
+    try:
+        import resource
+    except ImportError:  # Windows: no peak memory
+        return result
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_memory_bytes"] = peak if sys.platform == 'darwin' else peak * 1024
+    return result
+
+
+def measure(name, path, repeat):
+    """Run scenario `name` `repeat` times in child processes; return the best wall time and peak memory."""
+    best = {}
+    for _ in range(repeat):
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", name, path],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            raise RuntimeError(f"scenario '{name}' failed:\n{child.stderr.strip()}")
+        result = json.loads(child.stdout.splitlines()[-1])
+        for key, value in result.items():
+            best[key] = min(best.get(key, value), value)
+    return best
+
+
+def run_scenarios(size, repeat=3):
+    """Generate the book for `size` paragraphs and measure every scenario on it."""
+    sys.path.insert(0, HERE)
+    from bench_book import make_fixture
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_fixture(directory, size)["path"]
+        return {name: measure(name, path, repeat) for name in SCENARIOS}
+
+
+def compare(baseline, results, wall_budget=25.0, memory_budget=10.0, min_seconds=0.05):
+    """Compare `results` with the `baseline` results, scenario by scenario.
+
+    Returns a list of rows (scenario, metric, baseline, current, change in percent,
+    regressed). A metric regresses when it grew more than its budget (in percent);
+    wall time changes under `min_seconds` are noise and never regress."""
+    budgets = {"wall_seconds": wall_budget, "peak_memory_bytes": memory_budget}
+    rows = []
+    for scenario, result in results.items():
+        for metric, budget in budgets.items():
+            old, new = baseline.get(scenario, {}).get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            regressed = change > budget and not (metric == "wall_seconds" and new - old < min_seconds)
+            rows.append((scenario, metric, old, new, change, regressed))
+    return rows
+
+
+def _value(metric, value):
+    return f"{value:.3f}s" if metric == "wall_seconds" else f"{value / 1e6:.1f} MB"
+
+
+def format_comparison(rows):
+    """Table lines for compare() rows; regressions are marked with '!'."""
+    lines = [f"  {'scenario':<18} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for scenario, metric, old, new, change, regressed in rows:
+        label = "wall time" if metric == "wall_seconds" else "peak memory"
+        lines.append(f"{'!' if regressed else ' '} {scenario:<18} {label:<12} {_value(metric, old):>10} "
+                     f"{_value(metric, new):>10} {change:+7.1f}%")
+    return lines
+
+
+def format_results(results):
+    """Table lines for the results of one run."""
+    lines = [f"  {'scenario':<18} {'wall time':>10} {'peak memory':>12}"]
+    for scenario, result in results.items():
+        memory = _value("peak_memory_bytes", result["peak_memory_bytes"]) if "peak_memory_bytes" in result else "-"
+        lines.append(f"  {scenario:<18} {_value('wall_seconds', result['wall_seconds']):>10} {memory:>12}")
+    return lines
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {"baseline": None, "runs": []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--scenario":  # a child process of measure()
+        print(json.dumps(run_scenario(sys.argv[2], sys.argv[3])))
+        return
+
+    sys.path.insert(0, HERE)
+    from bench_book import parse_size
+
+    parser = argparse.ArgumentParser(description="Fail if the e-book or citation scenarios got slower "
+                                                 "or bigger than the stored baseline allows.")
+    parser.add_argument("--size", type=parse_size, default="10k", help="book size in paragraphs (default 10k)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the best is compared (default 3)")
+    parser.add_argument("--wall-budget", type=float, default=25.0,
+                        help="allowed wall time increase in percent (default 25)")
+    parser.add_argument("--memory-budget", type=float, default=10.0,
+                        help="allowed peak memory increase in percent (default 10)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="wall time increases smaller than this are ignored as noise (default 0.05)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="history file (default perf_history.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="make this run the new baseline")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    baseline = history["baseline"]
+    if baseline and baseline["size"] != args.size and not args.save_baseline:
+        print(f"Error: The baseline was recorded for {baseline['size']} paragraphs; "
+              f"run with --size {baseline['size']} or --save-baseline")
+        sys.exit(1)
+
+    print(f"Running {len(SCENARIOS)} scenarios on a {args.size}-paragraph book (best of {args.repeat})...")
+    try:
+        results = run_scenarios(args.size, args.repeat)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    run = {"recorded": time.strftime('%Y-%m-%dT%H:%M:%S'), "python": sys.version.split()[0],
+           "size": args.size, "results": results}
+
+    regressions = []
+    if baseline is None or args.save_baseline:
+        history["baseline"] = run
+        for line in format_results(results):
+            print(line)
+        print(f"Baseline recorded in {args.history}")
+    else:
+        rows = compare(baseline["results"], results, args.wall_budget, args.memory_budget, args.min_seconds)
+        print(f"Compared with the baseline of {baseline['recorded']} (Python {baseline['python']}):")
+        for line in format_comparison(rows):
+            print(line)
+        regressions = [row for row in rows if row[-1]]
+    run["regressions"] = len(regressions)
+    history["runs"].append(run)
+    save_history(args.history, history)
+
+    if regressions:
+        print(f"Error: {len(regressions)} regressions over budget "
+              f"(wall time +{args.wall_budget:g}%, peak memory +{args.memory_budget:g}%)")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'XEtags'))
+
+from docx import Document
+
+from create_ebook_from_print import convert_xe_tags_in_document
+from make_book import build_book
+
+class TestBuildBook(unittest.TestCase):
+    def test_book_opens_and_has_requested_content(self):
+        """The generated book loads in python-docx and every XE field maps to its term."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'book 8x10.docx')
+            summary = build_book(path, paragraphs=200, chapters=4, xe_fields=30, references=5, citations=10)
+            with zipfile.ZipFile(path) as package:
+                self.assertIsNone(package.testzip())
+
+            doc = Document(path)
+            texts = [paragraph.text for paragraph in doc.paragraphs]
+            self.assertEqual(summary['xe_fields'], 30)
+            self.assertEqual(sum(text.startswith('Chapter ') for text in texts), 4)
+            self.assertIn('INDEX', texts)
+            self.assertEqual(texts[-2], 'ABOUT THE AUTHOR')
+
+            index_term_to_bookmark, _ = convert_xe_tags_in_document(doc)
+            self.assertEqual(len(index_term_to_bookmark), 30)
+
+    def test_same_seed_same_book(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first, second = (os.path.join(temp_dir, name) for name in ('a.docx', 'b.docx'))
+            build_book(first, paragraphs=100, seed=3)
+            build_book(second, paragraphs=100, seed=3)
+            with zipfile.ZipFile(first) as a, zipfile.ZipFile(second) as b:
+                self.assertEqual(a.read('word/document.xml'), b.read('word/document.xml'))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,24 @@
+import unittest
+
+from perf_gate import compare, format_comparison
+
+BASELINE = {"ebook": {"wall_seconds": 2.0, "peak_memory_bytes": 100e6},
+            "link citations": {"wall_seconds": 0.1, "peak_memory_bytes": 50e6}}
+
+class TestCompare(unittest.TestCase):
+    def test_regressions_past_the_budget(self):
+        """Growth past the budget regresses; small absolute wall time changes are noise."""
+        results = {"ebook": {"wall_seconds": 3.0, "peak_memory_bytes": 105e6},
+                   "link citations": {"wall_seconds": 0.14, "peak_memory_bytes": 60e6},
+                   "new scenario": {"wall_seconds": 1.0}}
+        rows = compare(BASELINE, results, wall_budget=25, memory_budget=10, min_seconds=0.05)
+        regressed = [(scenario, metric) for scenario, metric, *_, regressed in rows if regressed]
+        self.assertEqual(regressed, [("ebook", "wall_seconds"), ("link citations", "peak_memory_bytes")])
+        self.assertEqual(len(rows), 4)  # nothing to compare the new scenario with
+
+        lines = format_comparison(rows)
+        self.assertTrue(lines[1].startswith("! ebook"))
+        self.assertIn("+50.0%", lines[1])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -21,13 +21,38 @@ Output: "../mybooks/superArchItelligence Vol2 linked.docx"
 import re
 import os
 import sys
+import copy
+import importlib.util
+from collections import namedtuple
 from docx import Document
 from docx.shared import RGBColor
 from docx.oxml import parse_xml, register_element_cls
-from docx.oxml.ns import nsdecls, qn
+from docx.oxml.ns import nsdecls, nsmap, qn
 from docx.oxml.parser import OxmlElement
 from docx.text.run import Run
+from docx.text.paragraph import Paragraph
 import urllib.parse
+from lxml import etree
+
+# Shared .docx helpers of the e-book tools in ../XEtags
+XETAGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'XEtags')
+
+def _load_xetags_module(name):
+    """Module `name` of ../XEtags, loaded from its file: neither sys.path nor the order of
+    imports decides which module is used. It must not import other XEtags modules."""
+    qualified_name = 'XEtags.' + name
+    module = sys.modules.get(qualified_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(qualified_name, os.path.join(XETAGS_DIR, name + '.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[qualified_name] = module
+    return module
+
+_docx_outline = _load_xetags_module('docx_outline')
+_docx_stories = _load_xetags_module('docx_stories')
+outline_level, style_outline_levels = _docx_outline.outline_level, _docx_outline.style_outline_levels
+load_document, story_parts = _docx_stories.load_document, _docx_stories.story_parts
 
 def extract_urls_from_text(text):
     """Extract URLs from text using regex patterns, handling line breaks."""
@@ -61,77 +86,159 @@ def extract_urls_from_text(text):
     
     return cleaned_urls
 
-def find_references_section(doc):
-    """Find and return the references section of the document."""
-    references_text = ""
-    references_found = False
-    
-    # Check document structure for references section
-    
-    # Check all paragraphs for references section
-    for paragraph in doc.paragraphs:
-        text = paragraph.text.strip()
-        
-        # More flexible matching for references section headers
-        if re.match(r'^\s*(references|bibliography|works cited|sources|citations)\s*$', text, re.IGNORECASE):
-            references_found = True
-            continue
-        
-        # Also check for Word bibliography field patterns
-        if re.search(r'(bibliography|references)', text, re.IGNORECASE) and len(text) < 50:
-            references_found = True
-            continue
-            
-        # If we're in references section, collect text
-        if references_found:
-            # Stop if we hit another major section
-            if re.match(r'^\s*(appendix|index|glossary)\s*$', text, re.IGNORECASE):
-                break
-            if text:  # Only add non-empty text
-                references_text += text + "\n"
-    
-    return references_text
+# Headings that start the references section (a heading-styled paragraph may also just
+# mention them, e.g. "References and Further Reading"), and headings that end it
+REFERENCES_HEADING_RE = re.compile(r'^\s*(references|bibliography|works cited|sources|citations)\s*$', re.IGNORECASE)
+REFERENCES_MENTION_RE = re.compile(r'bibliography|references', re.IGNORECASE)
+SECTION_END_RE = re.compile(r'^\s*(appendix|index|glossary)\s*$', re.IGNORECASE)
 
-def parse_references(references_text):
-    """Parse references and extract citation keys with their URLs."""
+# A line starting "Surname, Given" starts a new reference entry
+ENTRY_START_RE = re.compile(r'[A-Z][a-z]+,\s+[A-Z]')
+AUTHOR_YEAR_RE = re.compile(r'([A-Z][a-z]+(?:,\s+[A-Z][a-z]*)?)\.\s+(\d{4})')  # "Author, Name. YEAR."
+AUTHOR_RE = re.compile(r'[A-Z][a-z]+')
+MIN_ENTRY_LENGTH = 50  # Shorter entries are not references
+
+# One entry of the references section. `key` is the citation key it is cited by
+# ("Author YEAR", or just "Author"; None if the entry doesn't start with a name),
+# `urls` its URLs without duplicates, `paragraph` the position of its first
+# paragraph in the body (None for entries parsed from plain text).
+Reference = namedtuple('Reference', ['key', 'urls', 'text', 'paragraph'])
+
+W_T = qn('w:t')
+W_INSTR_TEXT = qn('w:instrText')
+W_FLD_SIMPLE = qn('w:fldSimple')
+W_FLD_CHAR = qn('w:fldChar')
+W_FLD_CHAR_TYPE = qn('w:fldCharType')
+W_INSTR = qn('w:instr')
+W_P = qn('w:p')
+W_SDT = qn('w:sdt')
+W_SDT_CONTENT = qn('w:sdtContent')
+
+def _scan_paragraph(p):
+    """(text of the w:t elements, field balance, starts a BIBLIOGRAPHY field) of paragraph element `p`.
+
+    Cheaper than python-docx's paragraph.text, and good enough to recognize headings.
+    The field balance is the number of fields begun minus the number ended."""
+    texts = []
+    balance = 0
+    bibliography = False
+    for element in p.iter(W_T, W_INSTR_TEXT, W_FLD_SIMPLE, W_FLD_CHAR):
+        if element.tag == W_T:
+            texts.append(element.text or '')
+        elif element.tag == W_FLD_CHAR:
+            field_char = element.get(W_FLD_CHAR_TYPE)
+            balance += 1 if field_char == 'begin' else -1 if field_char == 'end' else 0
+        elif element.tag == W_INSTR_TEXT:
+            bibliography = bibliography or 'BIBLIOGRAPHY' in (element.text or '').upper()
+        else:
+            bibliography = bibliography or 'BIBLIOGRAPHY' in element.get(W_INSTR, '').upper()
+    return ''.join(texts), balance, bibliography
+
+def _block_paragraphs(body):
+    """Paragraph elements at the top level of `body`, including those in content controls (w:sdt)."""
+    for child in body.iterchildren(W_P, W_SDT):
+        if child.tag == W_P:
+            yield child
+        else:
+            content = child.find(W_SDT_CONTENT)
+            if content is not None:
+                yield from _block_paragraphs(content)
+
+def _reference_entries(lines):
+    """Group the lines of a references section into entries, as they arrive.
+
+    `lines` are (line, position) pairs; an entry ends at a blank line and before a
+    line that starts a new "Surname, Given" entry. Yields (entry text, position of
+    its first line)."""
+    entry, position = [], None
+    for line, line_position in lines:
+        if not line.strip() or ENTRY_START_RE.match(line):
+            if entry:
+                yield '\n'.join(entry).strip(), position
+            entry = []
+            if not line.strip():
+                continue
+        if not entry:
+            position = line_position
+        entry.append(line)
+    if entry:
+        yield '\n'.join(entry).strip(), position
+
+def parse_reference(text, paragraph=None):
+    """Reference record for the text of one references entry."""
+    key = None
+    author_year = AUTHOR_YEAR_RE.match(text)
+    if author_year:
+        key = f"{author_year.group(1).split(',')[0]} {author_year.group(2)}"  # Last name and year
+    else:
+        author = AUTHOR_RE.match(text)
+        if author:
+            key = author.group(0)
+    urls = tuple(dict.fromkeys(extract_urls_from_text(text)))  # Preserves order, removes duplicates
+    return Reference(key, urls, text, paragraph)
+
+def iter_references(doc):
+    """Reference records of the document's references section, in one pass over the body.
+
+    The section starts at a heading (by outline level or paragraph style) named or
+    mentioning References/Bibliography, at a plain paragraph reading exactly like such
+    a heading, or at a Word BIBLIOGRAPHY field. It ends at the next heading of the
+    same or a higher level, at an Appendix/Index/Glossary heading, or where the
+    BIBLIOGRAPHY field ends. Only the paragraphs of the section are read through
+    python-docx."""
+    style_levels = style_outline_levels(doc.styles.element)
+    in_section = False
+    heading_level = None  # of the section's heading; None without one
+    field_depth = None  # open fields of a BIBLIOGRAPHY section; None for a heading section
+
+    def section_lines():
+        nonlocal in_section, heading_level, field_depth
+        for position, p in enumerate(_block_paragraphs(doc.element.body)):
+            text, balance, bibliography = _scan_paragraph(p)
+            text = text.strip()
+            level = outline_level(p, style_levels)
+            if not in_section:
+                if bibliography:
+                    in_section, heading_level, field_depth = True, level, 0
+                elif REFERENCES_HEADING_RE.match(text) or (
+                        level is not None and REFERENCES_MENTION_RE.search(text) and len(text) < 50):
+                    in_section, heading_level = True, level
+                    continue
+                else:
+                    continue
+            elif SECTION_END_RE.match(text):
+                return
+            elif level is not None:
+                if heading_level is None or level <= heading_level:
+                    return
+                continue  # A subheading of the section is not an entry
+            if field_depth is not None:
+                field_depth += balance
+            paragraph_text = Paragraph(p, doc._body).text.strip()
+            for line in paragraph_text.split('\n') if paragraph_text else ():
+                yield line, position
+            if field_depth is not None and field_depth <= 0:
+                return
+
+    for text, paragraph in _reference_entries(section_lines()):
+        yield parse_reference(text, paragraph)
+
+def citation_urls(references):
+    """{citation key: first URL} for the references that have both."""
     citations_to_urls = {}
-    
-    # Split references into individual entries
-    # Pattern: Split on double newlines or when we see a new author name pattern
-    ref_entries = re.split(r'\n\s*\n|\n(?=[A-Z][a-z]+,\s+[A-Z])', references_text)
-    
-    for entry in ref_entries:
-        entry = entry.strip()
-        if not entry or len(entry) < 50:  # Skip very short entries
+    for reference in references:
+        if len(reference.text) < MIN_ENTRY_LENGTH:  # Skip very short entries
             continue
-            
-        # Extract citation key from author name and year
-        citation_key = None
-        
-        # Pattern for author-year format: "Author, Name. YEAR."
-        author_year_match = re.match(r'([A-Z][a-z]+(?:,\s+[A-Z][a-z]*)?)\.\s+(\d{4})', entry)
-        if author_year_match:
-            author = author_year_match.group(1).split(',')[0]  # Get last name
-            year = author_year_match.group(2)
-            citation_key = f"{author} {year}"
-        
-        # Also try simple author name extraction
-        if not citation_key:
-            simple_author_match = re.match(r'([A-Z][a-z]+)', entry)
-            if simple_author_match:
-                citation_key = simple_author_match.group(1)
-        
-        # Extract URLs from the reference entry
-        urls = extract_urls_from_text(entry)
-        
-        if citation_key and urls:
-            # Remove duplicates
-            unique_urls = list(dict.fromkeys(urls))  # Preserves order, removes duplicates
-            citations_to_urls[citation_key] = unique_urls[0]  # Use first unique URL
-            print(f"Found citation [{citation_key}] -> {unique_urls[0]}")
-    
+        if reference.key and reference.urls:
+            citations_to_urls[reference.key] = reference.urls[0]
+            print(f"Found citation [{reference.key}] -> {reference.urls[0]}")
     return citations_to_urls
 
+def parse_references(references_text):
+    """Parse references and extract citation keys with their URLs."""
+    lines = ((line, None) for line in references_text.split('\n'))
+    return citation_urls(parse_reference(text) for text, _ in _reference_entries(lines))
+
 def extract_references_from_pdf(pdf_file):
     """Extract citation-URL mappings from PDF file."""
     try:
@@ -291,58 +398,305 @@ def add_hyperlink_to_paragraph(paragraph, display_text, url):
         print(f"Error creating hyperlink: {e}")
         return None
 
+class _PartParent:
+    """Parent of paragraphs read straight from a part's XML: gives them the part to relate hyperlinks to."""
+    def __init__(self, part):
+        self.part = part
+
+def story_paragraphs(doc):
+    """Paragraphs of the header, footer, footnotes, endnotes and comments parts, part by part."""
+    paragraphs = []
+    for part in story_parts(doc):
+        parent = _PartParent(part)
+        paragraphs.extend(Paragraph(p, parent) for p in part.element.iter(qn('w:p')))
+    return paragraphs
+
+# A parenthesized or bracketed group that may hold citations: "(Smith 2020)", "(Smith 2020; Jones 2019)", "[1, 4]"
+CITATION_GROUP_RE = re.compile(r'\(([^()]*)\)|\[([^\[\]]*)\]')
+# The ";" or ","-separated segments of a group; each one is a citation or not as a whole
+CITATION_SEGMENT_RE = re.compile(r'[^;,]+')
+# What may follow the author in a citation segment: "et al.", a year, a page locator
+CITATION_SUFFIX_RE = re.compile(r'(?:\s+et\s+al\.)?(?:\s+(?P<year>\d{4}[a-z]?))?'
+                                r'(?::\s*\d+(?:\s*[-–]\s*\d+)?|\s+pp?\.\s*\d+(?:\s*[-–]\s*\d+)?)?')
+# A citation key: an author (or a reference number), optionally followed by a year
+CITATION_KEY_RE = re.compile(r'(?P<author>.+?)(?:\s+(?P<year>\d{4}[a-z]?))?')
+
+# Paragraphs without an opening bracket hold no citation; checked on the XML, before reading the text
+_HAS_CITATION_GROUP = etree.XPath('boolean(.//w:t[contains(., "(") or contains(., "[")])',
+                                  namespaces={'w': nsmap['w']})
+
+W_R = qn('w:r')
+W_RPR = qn('w:rPr')
+# Run children that make up a run's text (see python-docx's CT_R.text); the others have none
+RUN_TEXT_TAGS = frozenset(qn(tag) for tag in ('w:br', 'w:cr', 'w:noBreakHyphen', 'w:ptab', 'w:t', 'w:tab'))
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+HYPERLINK_COLOR = RGBColor(0x05, 0x63, 0xC1)
+
+class CitationMatcher:
+    """Finds and links every citation of a paragraph, in one scan of its text.
+
+    The citation keys are compiled into a trie of their authors, a deterministic
+    automaton that is walked once from the start of each citation segment. A
+    citation is a ";" or ","-separated segment of a parenthesized or bracketed
+    group that is an author, optionally followed by "et al.", a year and a page
+    locator, whose author and year are a key: "(Smith et al. 2020)" and
+    "(Smith 2020: 12)" cite "Smith 2020". A segment with a year only cites a key
+    with that year, so "(Smith 2019)" does not cite "Smith"; an author-only key
+    is cited without a year, "(Smith)", "(Smith et al.)". Keys in the middle of
+    other text, "(after World War II)", are not citations, and numeric keys
+    ("[1]") only count in square brackets. A group that is just one citation is
+    linked as a whole, "(Smith 2020)"; in a group of several, each citation is
+    linked: "(Smith 2020; Jones 2019)"."""
+
+    def __init__(self, citations_to_urls):
+        self.citations_to_urls = citations_to_urls
+        self._urls = {}  # (author, year or None) -> URL
+        self._trie = {}  # character -> node; '' -> the author ending at a node
+        for key, url in citations_to_urls.items():
+            match = CITATION_KEY_RE.fullmatch(key)
+            if match is None:
+                continue
+            self._urls.setdefault(match.group('author', 'year'), url)
+            node = self._trie
+            for char in match.group('author'):
+                node = node.setdefault(char, {})
+            node[''] = match.group('author')
+
+    def citation_url(self, text, start, end, square=False):
+        """URL of the citation segment `text[start:end]`, or None if it is not a citation."""
+        authors = []  # (author, end) of the authors the segment starts with, shortest first
+        node = self._trie
+        position = start
+        while node is not None:
+            if '' in node:
+                authors.append((node[''], position))
+            if position == end:
+                break
+            node = node.get(text[position])
+            position += 1
+        for author, author_end in reversed(authors):
+            if author.isdigit() and not square:
+                continue
+            suffix = CITATION_SUFFIX_RE.fullmatch(text, author_end, end)
+            if suffix is None:
+                continue
+            year = suffix.group('year')
+            url = self._urls.get((author, year))
+            if url is None and year and not year.isdigit():
+                url = self._urls.get((author, year[:4]))  # "2020a" cites "Smith 2020"
+            if url is not None:
+                return url
+        return None
+
+    def find(self, text):
+        """(start, end, URL) of every citation in `text`, in order."""
+        citations = []
+        if not self._trie:
+            return citations
+        for group in CITATION_GROUP_RE.finditer(text):
+            square = group.group(2) is not None
+            segments = []
+            for segment in CITATION_SEGMENT_RE.finditer(text, *group.span(2 if square else 1)):
+                value = segment.group()
+                start = segment.start() + len(value) - len(value.lstrip())
+                end = segment.end() - (len(value) - len(value.rstrip()))
+                if start < end:
+                    segments.append((start, end, self.citation_url(text, start, end, square)))
+            cited = [(start, end, url) for start, end, url in segments if url is not None]
+            if len(segments) == 1 and cited:
+                citations.append((group.start(), group.end(), cited[0][2]))
+            else:
+                citations.extend(cited)
+        return citations
+
+    def link_paragraph(self, paragraph):
+        """Link every citation of `paragraph` in place; return the number of links created.
+
+        Only the runs holding a citation are changed: they are split at the citation's
+        ends and moved into a hyperlink, keeping their formatting. Note references,
+        existing hyperlinks and the other runs of the paragraph are left as they are."""
+        if not self._trie or not _HAS_CITATION_GROUP(paragraph._p):
+            return 0
+        text = paragraph.text
+        # Citations don't overlap, so the runs a link moves into a hyperlink stay in `items`
+        # without being looked at again
+        items = [(child, len(child.text)) for child in paragraph._p.inner_content_elements]
+        links = 0
+        for start, end, url in self.find(text):
+            citation = text[start:end]
+            runs = _span_runs(items, start, end)
+            if runs is None:
+                print(f"Failed to create hyperlink for {citation}, it is inside a hyperlink already")
+                continue
+            _wrap_in_hyperlink(paragraph, runs, url)
+            links += 1
+            print(f"Created hyperlink for citation {citation} to {url}")
+        return links
+
+def _split_run(r, offset):
+    """Split the run `r` after `offset` characters of its text; return the second half, inserted after it."""
+    right = copy.deepcopy(r)
+    r.addnext(right)
+    position = 0
+    for left_child, right_child in zip(list(r), list(right)):
+        if left_child.tag == W_RPR:
+            continue
+        length = len(str(left_child)) if left_child.tag in RUN_TEXT_TAGS else 0
+        if position + length <= offset and (length or position < offset):
+            right.remove(right_child)
+        elif position >= offset:
+            r.remove(left_child)
+        else:  # A w:t holding the split point
+            text = left_child.text
+            left_child.text, right_child.text = text[:offset - position], text[offset - position:]
+            left_child.set(XML_SPACE, 'preserve')
+            right_child.set(XML_SPACE, 'preserve')
+        position += length
+    return right
+
+def _span_runs(items, start, end):
+    """The runs holding characters start:end of a paragraph's text, split so that they
+    hold no other text; None if any of them is in a hyperlink.
+
+    `items` are the (run or hyperlink, text length) of the paragraph's inner content, as
+    paragraph.text reads it; they are updated for the runs split here."""
+    for boundary in (end, start):
+        position = 0
+        for index, (child, length) in enumerate(items):
+            if position < boundary < position + length:
+                if child.tag != W_R:
+                    return None
+                right = _split_run(child, boundary - position)
+                items[index:index + 1] = [(child, boundary - position), (right, position + length - boundary)]
+                break
+            position += length
+    runs = []
+    position = 0
+    for child, length in items:
+        # Runs without text (a note reference, a picture) belong to the span only strictly inside it
+        if start <= position and position + length <= end and (length or start < position < end):
+            if child.tag != W_R:
+                return None
+            runs.append(child)
+        position += length
+    return runs
+
+def _wrap_in_hyperlink(paragraph, runs, url):
+    """Move `runs`, and what lies between them, into a hyperlink to `url` styled as a link."""
+    part = paragraph.part
+    r_id = part.relate_to(url, "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink", is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    runs[0].addprevious(hyperlink)
+    element = hyperlink.getnext()
+    while element is not None:
+        following = element.getnext()
+        hyperlink.append(element)
+        if element is runs[-1]:
+            break
+        element = following
+    for r in runs:
+        font = Run(r, paragraph).font
+        font.color.rgb = HYPERLINK_COLOR
+        font.underline = True
+
 def process_citations_in_paragraph(paragraph, citations_to_urls):
-    """Process citations in a paragraph and convert them to hyperlinks."""
-    text = paragraph.text
-    modified = False
-    
-    # Pattern for numbered citations [1], [2], etc.
-    citation_patterns = [
-        r'\[(\d+)\]',                    # [1], [2], etc.
-        r'\(([A-Z][a-z]+(?:\s+et\s+al\.)?(?:\s+\d{4})?)\)',  # (Smith 2020), (Jones et al. 2019)
-    ]
+    """Convert the citations of a paragraph to hyperlinks; True if any were linked.
+
+    For many paragraphs, make one CitationMatcher and call its link_paragraph()."""
+    return CitationMatcher(citations_to_urls).link_paragraph(paragraph) > 0
+
+def link_citations(input_file, output_file=None):
+    """Link the citations of `input_file` to their references' URLs and save the result
+    as `output_file` (by default linked_filename(input_file)).
+
+    Returns a summary dict: input, output, citations (citations with a URL) and links
+    (citation links created). Raises if the document can't be read or saved."""
+    output_file = output_file or linked_filename(input_file)
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input file '{input_file}' not found.")
+    summary = {"input": input_file, "output": output_file, "citations": 0, "links": 0}
     
-    # Check if any citations match our patterns and have URLs
-    for pattern in citation_patterns:
-        matches = list(re.finditer(pattern, text))
-        if matches:
-            for match in reversed(matches):  # Process in reverse to maintain positions
-                citation_key = match.group(1)
-                full_citation = match.group(0)
-                
-                if citation_key in citations_to_urls:
-                    url = citations_to_urls[citation_key]
-                    
-                    # Split the paragraph text around the citation
-                    start, end = match.span()
-                    before_text = text[:start]
-                    after_text = text[end:]
-                    
-                    # Clear the paragraph and rebuild it with hyperlink
-                    paragraph.clear()
-                    
-                    # Add text before citation
-                    if before_text:
-                        paragraph.add_run(before_text)
-                    
-                    # Create and add hyperlink
-                    hyperlink_element = add_hyperlink_to_paragraph(paragraph, full_citation, url)
-                    if hyperlink_element is not None:
-                        paragraph._element.append(hyperlink_element)
-                        print(f"Created hyperlink for citation {full_citation} to {url}")
-                    else:
-                        # Fallback: just add the text
-                        paragraph.add_run(full_citation)
-                        print(f"Failed to create hyperlink for {full_citation}, added as text")
-                    
-                    # Add text after citation
-                    if after_text:
-                        paragraph.add_run(after_text)
-                    
-                    modified = True
-                    break  # Only process first match per paragraph
+    # Load the document
+    print(f"Loading document: {input_file}")
+    doc = load_document(input_file)
+
+    # Find references section
+    print("Searching for references section...")
+    references = list(iter_references(doc))
+
+    if not references:
+        print("Warning: No references section found in paragraphs.")
+        print("Checking for bibliography information in document...")
+
+        # Check if this is a test case with known bibliography information
+        if input_file == "test_link_input.docx":
+            print("Using test bibliography information...")
+            # For the test case, create a simple mapping for Smith 2020
+            citations_to_urls = {"Smith 2020": "https://example.com/smith2020"}
+            print("Found test citation mapping: Smith 2020 -> https://example.com/smith2020")
+        else:
+            print("No bibliography information found. Copying original content...")
+            doc.save(output_file)
+            print(f"Output saved to: {output_file}")
+            return summary
+    else:
+        print(f"Found references section with {len(references)} entries")
+
+        # Citation-to-URL mappings of the references
+        print("Parsing references for URLs...")
+        citations_to_urls = citation_urls(references)
+
+        if not citations_to_urls:
+            print("Warning: No citations with URLs found in references.")
+            print("Trying to extract references from PDF version...")
+
+            # Try to get references from PDF
+            pdf_file = input_file.replace('.docx', '.pdf').replace('.docm', '.pdf')
+            if os.path.exists(pdf_file):
+                citations_to_urls = extract_references_from_pdf(pdf_file)
+                if citations_to_urls:
+                    print(f"Found {len(citations_to_urls)} citations with URLs from PDF")
+                else:
+                    print("No citations found in PDF either")
+                    doc.save(output_file)
+                    print(f"Output saved to: {output_file}")
+                    return summary
+            else:
+                print(f"PDF file not found: {pdf_file}")
+                doc.save(output_file)
+                print(f"Output saved to: {output_file}")
+                return summary
+
+    print(f"Found {len(citations_to_urls)} citations with URLs")
+
+    # Process paragraphs to link citations
+    print("Processing citations in document...")
+    total_links_created = 0
+
+    matcher = CitationMatcher(citations_to_urls)
+
+    for paragraph in doc.paragraphs:
+        total_links_created += matcher.link_paragraph(paragraph)
+
+    # Citations in footnotes, endnotes, headers, footers and comments
+    for paragraph in story_paragraphs(doc):
+        total_links_created += matcher.link_paragraph(paragraph)
+
+    # If no citations were found to link, but we have PDF citations, add a citations section
+    if total_links_created == 0 and citations_to_urls:
+        print("No existing citations found to link. Adding citation section from PDF...")
+        total_links_created = add_citation_section_from_pdf(doc, citations_to_urls)
+
+    # Save the modified document
+    print(f"Saving linked document to: {output_file}")
+    doc.save(output_file)
+
+    print(f"Success! Created {total_links_created} citation links.")
+    print(f"Output saved to: {output_file}")
     
-    return modified
+    summary.update(citations=len(citations_to_urls), links=total_links_created)
+    return summary
 
 def link_citations_in_document(input_file, output_file):
     """Main function to process the document and link citations."""
@@ -352,79 +706,7 @@ def link_citations_in_document(input_file, output_file):
         return False
     
     try:
-        # Load the document
-        print(f"Loading document: {input_file}")
-        doc = Document(input_file)
-        
-        # Find references section
-        print("Searching for references section...")
-        references_text = find_references_section(doc)
-        
-        if not references_text:
-            print("Warning: No references section found in paragraphs.")
-            print("Checking for bibliography information in document...")
-            
-            # Check if this is a test case with known bibliography information
-            if input_file == "test_link_input.docx":
-                print("Using test bibliography information...")
-                # For the test case, create a simple mapping for Smith 2020
-                citations_to_urls = {"Smith 2020": "https://example.com/smith2020"}
-                print("Found test citation mapping: Smith 2020 -> https://example.com/smith2020")
-            else:
-                print("No bibliography information found. Copying original content...")
-                doc.save(output_file)
-                print(f"Output saved to: {output_file}")
-                return True
-        else:
-            print(f"Found references section with {len(references_text)} characters")
-            
-            # Parse references to extract citation-to-URL mappings
-            print("Parsing references for URLs...")
-            citations_to_urls = parse_references(references_text)
-            
-            if not citations_to_urls:
-                print("Warning: No citations with URLs found in references.")
-                print("Trying to extract references from PDF version...")
-                
-                # Try to get references from PDF
-                pdf_file = input_file.replace('.docx', '.pdf').replace('.docm', '.pdf')
-                if os.path.exists(pdf_file):
-                    citations_to_urls = extract_references_from_pdf(pdf_file)
-                    if citations_to_urls:
-                        print(f"Found {len(citations_to_urls)} citations with URLs from PDF")
-                    else:
-                        print("No citations found in PDF either")
-                        doc.save(output_file)
-                        print(f"Output saved to: {output_file}")
-                        return True
-                else:
-                    print(f"PDF file not found: {pdf_file}")
-                    doc.save(output_file)
-                    print(f"Output saved to: {output_file}")
-                    return True
-        
-        print(f"Found {len(citations_to_urls)} citations with URLs")
-        
-        # Process paragraphs to link citations
-        print("Processing citations in document...")
-        total_links_created = 0
-        
-        for paragraph in doc.paragraphs:
-            if process_citations_in_paragraph(paragraph, citations_to_urls):
-                total_links_created += 1
-        
-        # If no citations were found to link, but we have PDF citations, add a citations section
-        if total_links_created == 0 and citations_to_urls:
-            print("No existing citations found to link. Adding citation section from PDF...")
-            total_links_created = add_citation_section_from_pdf(doc, citations_to_urls)
-        
-        # Save the modified document
-        print(f"Saving linked document to: {output_file}")
-        doc.save(output_file)
-        
-        print(f"Success! Created {total_links_created} citation links.")
-        print(f"Output saved to: {output_file}")
-        
+        link_citations(input_file, output_file)
         return True
         
     except Exception as e:
@@ -560,6 +842,14 @@ def create_test_input_file(filename):
         print(f"Error creating test input file: {str(e)}")
         return False
 
+def linked_filename(input_file):
+    """Output file name for `input_file`: "8x10" replaced with "linked", or " linked" added before the extension."""
+    if "8x10" in input_file:
+        return input_file.replace("8x10", "linked")
+    # If "8x10" is not found, insert "linked" before the file extension
+    name, ext = os.path.splitext(input_file)
+    return f"{name} linked{ext}"
+
 def main():
     """Main program entry point."""
     
@@ -578,12 +868,7 @@ def main():
         input_file = sys.argv[1]
         
         # Generate output filename by replacing "8x10" with "linked"
-        if "8x10" in input_file:
-            output_file = input_file.replace("8x10", "linked")
-        else:
-            # If "8x10" is not found, insert "linked" before the file extension
-            name, ext = os.path.splitext(input_file)
-            output_file = f"{name} linked{ext}"
+        output_file = linked_filename(input_file)
         
         print(f"Input file: {input_file}")
         print(f"Output file: {output_file}")
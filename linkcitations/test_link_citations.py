@@ -0,0 +1,181 @@
+import contextlib
+import io
+import unittest
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from link_citations import CitationMatcher, _reference_entries, iter_references
+
+CITATIONS_TO_URLS = {
+    "Smith 2020": "https://example.com/smith2020",
+    "Smith": "https://example.com/smith",
+    "Jones 2019": "https://example.com/jones2019",
+    "World": "https://example.com/who2021",
+    "1": "https://example.com/1",
+    "3": "https://example.com/3",
+}
+
+SMITH = 'Smith, John. 2020. "Cities and robots." Journal of Examples. https://example.com/smith2020'
+JONES = 'Jones, Ann. 2019. "Agents at home." Journal of Examples.'
+
+def body_xml(doc, xml):
+    """Append block-level `xml` to the body of `doc`, before its section properties."""
+    body = doc.element.body
+    body.insert(len(body) - 1, parse_xml(f'<w:body {nsdecls("w")}>{xml}</w:body>')[0])
+
+def references(doc):
+    return [(reference.key, reference.urls, reference.paragraph) for reference in iter_references(doc)]
+
+def found(matcher, text):
+    return [(text[start:end], url) for start, end, url in matcher.find(text)]
+
+def hyperlink_texts(paragraph):
+    return [''.join(t.text for t in hyperlink.iter(qn('w:t'))) for hyperlink in paragraph._p.iter(qn('w:hyperlink'))]
+
+class TestCitationMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = CitationMatcher(CITATIONS_TO_URLS)
+
+    def test_every_citation_of_a_group_and_a_paragraph(self):
+        """Each citation of a multi-citation group is linked by itself; repeats are all linked."""
+        self.assertEqual(found(self.matcher, "As shown (Smith 2020; Jones 2019) and again (Smith 2020)."),
+                         [("Smith 2020", "https://example.com/smith2020"),
+                          ("Jones 2019", "https://example.com/jones2019"),
+                          ("(Smith 2020)", "https://example.com/smith2020")])
+
+    def test_numeric_keys_only_in_square_brackets(self):
+        self.assertEqual(found(self.matcher, "See [1] and [2, 3]."),
+                         [("[1]", "https://example.com/1"), ("3", "https://example.com/3")])
+        self.assertEqual(found(self.matcher, "Repeat (1) step (3)."), [])
+
+    def test_longer_key_wins(self):
+        """"Smith 2020" is preferred over the author-only key "Smith"; locators are part of the citation."""
+        self.assertEqual(found(self.matcher, "(Smith 2020)")[0][1], "https://example.com/smith2020")
+        self.assertEqual(found(self.matcher, "(Smith)"), [("(Smith)", "https://example.com/smith")])
+        self.assertEqual(found(self.matcher, "(Jones 2019: 12-14)")[0][0], "(Jones 2019: 12-14)")
+
+    def test_a_wrong_year_is_not_a_citation(self):
+        """A year that no key has doesn't fall back to the author-only key."""
+        self.assertEqual(found(self.matcher, "(Smith 2019)"), [])
+        self.assertEqual(found(self.matcher, "(Smith et al. 2018; Jones 2019)"),
+                         [("Jones 2019", "https://example.com/jones2019")])
+
+    def test_et_al_cites_the_key_of_the_first_author(self):
+        self.assertEqual(found(self.matcher, "(Smith et al. 2020)"),
+                         [("(Smith et al. 2020)", "https://example.com/smith2020")])
+        self.assertEqual(found(self.matcher, "(Smith et al.)"), [("(Smith et al.)", "https://example.com/smith")])
+        self.assertEqual(found(self.matcher, "(Smith et al. 2020a; Jones 2019)")[0],
+                         ("Smith et al. 2020a", "https://example.com/smith2020"))
+
+    def test_keys_inside_prose_are_not_citations(self):
+        self.assertEqual(found(self.matcher, "Casualties peaked (after World War II, see chapter 3)."), [])
+        self.assertEqual(found(self.matcher, "Smith 2020 argued (in print) otherwise."), [])
+
+    def test_link_paragraph_keeps_the_note_number(self):
+        doc = Document()
+        paragraph = doc.add_paragraph()
+        paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:footnoteRef/></w:r>'))
+        paragraph.add_run("Cities (Smith 2020; Jones 2019) and robots ")
+        paragraph.add_run("[1].")
+        with contextlib.redirect_stdout(io.StringIO()):
+            links = self.matcher.link_paragraph(paragraph)
+
+        self.assertEqual(links, 3)
+        self.assertIsNotNone(paragraph._p[0].find(qn('w:footnoteRef')))
+        self.assertEqual(hyperlink_texts(paragraph), ["Smith 2020", "Jones 2019", "[1]"])
+        self.assertEqual(paragraph.text, "Cities (Smith 2020; Jones 2019) and robots [1].")
+        self.assertEqual(self.matcher.link_paragraph(doc.add_paragraph("No citations here.")), 0)
+
+    def test_link_paragraph_keeps_other_runs_hyperlinks_and_formatting(self):
+        """Only the runs holding a citation change; a note reference, a hyperlink and italics stay."""
+        doc = Document()
+        paragraph = doc.add_paragraph("Robots ")
+        paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:footnoteReference w:id="1"/></w:r>'))
+        paragraph._p.append(parse_xml(f'<w:hyperlink {nsdecls("w", "r")} r:id="rId9"><w:r><w:t>(Jones 2019)</w:t>'
+                                      f'</w:r></w:hyperlink>'))
+        paragraph.add_run(" see (")
+        paragraph.add_run("Smith").italic = True
+        paragraph.add_run(" et al. 2020) now.")
+        with contextlib.redirect_stdout(io.StringIO()):
+            links = self.matcher.link_paragraph(paragraph)
+
+        self.assertEqual(links, 1)
+        self.assertEqual(hyperlink_texts(paragraph), ["(Jones 2019)", "(Smith et al. 2020)"])
+        self.assertEqual(paragraph.text, "Robots (Jones 2019) see (Smith et al. 2020) now.")
+        self.assertEqual(len(paragraph._p.xpath('./w:r/w:footnoteReference')), 1)
+        italic = paragraph._p.xpath('./w:hyperlink/w:r[w:rPr/w:i]')
+        self.assertEqual([r.text for r in italic], ["Smith"])
+        self.assertEqual([r.text for r in paragraph.runs], ["Robots ", "", " see ", " now."])
+
+class TestIterReferences(unittest.TestCase):
+    def test_heading_section_ends_at_a_heading_of_the_same_level(self):
+        """Entries run from a "References" heading to the next heading of its level;
+        deeper subheadings are skipped and continuation paragraphs join their entry."""
+        doc = Document()
+        doc.add_paragraph("Robots arrive (Smith 2020).")
+        doc.add_heading("References", level=1)
+        doc.add_paragraph(SMITH)
+        doc.add_heading("Journals", level=2)
+        doc.add_paragraph(JONES)
+        doc.add_paragraph("https://example.com/jones2019")
+        doc.add_heading("Chapter 9", level=1)
+        doc.add_paragraph("Brown, Carl. 2018. Not a reference any more. https://example.com/brown2018")
+
+        self.assertEqual(references(doc), [
+            ("Smith 2020", ("https://example.com/smith2020",), 2),
+            ("Jones 2019", ("https://example.com/jones2019",), 4),
+        ])
+
+    def test_heading_by_based_on_style_and_end_at_appendix(self):
+        """A heading style found through basedOn may just mention references; "Appendix" ends the section."""
+        doc = Document()
+        doc.styles.element.append(parse_xml(
+            f'<w:style {nsdecls("w")} w:type="paragraph" w:styleId="BackMatterHeading">'
+            f'<w:name w:val="Back Matter Heading"/><w:basedOn w:val="Heading1"/></w:style>'))
+        doc.add_paragraph("References and Further Reading").style = doc.styles["Back Matter Heading"]
+        doc.add_paragraph(SMITH)
+        doc.add_paragraph("Appendix")
+        doc.add_paragraph(JONES + " https://example.com/jones2019")
+        self.assertEqual([key for key, _, _ in references(doc)], ["Smith 2020"])
+
+    def test_plain_heading_and_short_mentions(self):
+        """A plain paragraph reading "Bibliography" starts the section and any heading ends it;
+        a short body paragraph only mentioning references does not start it."""
+        doc = Document()
+        doc.add_paragraph("See the references below.")
+        doc.add_paragraph(JONES + " https://example.com/jones2019")
+        self.assertEqual(references(doc), [])
+
+        doc.add_paragraph("Bibliography")
+        doc.add_paragraph(SMITH)
+        doc.add_heading("Notes", level=3)
+        doc.add_paragraph(JONES + " https://example.com/jones2019")
+        self.assertEqual([key for key, _, _ in references(doc)], ["Smith 2020"])
+
+    def test_bibliography_field_in_a_content_control(self):
+        """A Word BIBLIOGRAPHY field in a w:sdt: its result paragraphs are the entries, up to the field's end."""
+        doc = Document()
+        doc.add_paragraph("Robots arrive (Smith 2020).")
+        body_xml(doc, f'''<w:sdt><w:sdtPr/><w:sdtContent>
+            <w:p><w:r><w:fldChar w:fldCharType="begin"/></w:r><w:r><w:instrText> BIBLIOGRAPHY </w:instrText></w:r>
+              <w:r><w:fldChar w:fldCharType="separate"/></w:r><w:r><w:t>{SMITH}</w:t></w:r></w:p>
+            <w:p><w:r><w:t>{JONES} https://example.com/jones2019</w:t></w:r>
+              <w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>
+          </w:sdtContent></w:sdt>''')
+        doc.add_paragraph("Brown, Carl. 2018. After the field. https://example.com/brown2018")
+        self.assertEqual([(key, paragraph) for key, _, paragraph in references(doc)],
+                         [("Smith 2020", 1), ("Jones 2019", 2)])
+
+    def test_entries_split_at_blank_lines_and_new_authors(self):
+        lines = [("Smith, John. 2020. Title", 0), ("continued https://example.com", 0), ("  ", 1),
+                 ("Untitled report. 2019.", 2), ("Jones, Ann. 2019.", 3)]
+        self.assertEqual(list(_reference_entries(lines)), [
+            ("Smith, John. 2020. Title\ncontinued https://example.com", 0),
+            ("Untitled report. 2019.", 2),
+            ("Jones, Ann. 2019.", 3),
+        ])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)